@@ -4,19 +4,39 @@ import os
 # Add parent directory to Python path to allow imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, make_response
 from flask_cors import CORS
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 from datetime import datetime, timedelta
 from math import sqrt, cos
-import json
-from backend.database import get_db, init_db, SessionLocal
-from backend.models import Firefighter, Position, Vitals, Alert, Beacon
+from functools import wraps
+import io
+import time
+import zipfile
+from backend.database import get_db, init_db, SessionLocal, begin_read
+from backend.models import Firefighter, Position, Vitals, Alert, AlertArchive, Beacon
 from backend.data_retriever import DataRetriever
+from backend.alert_archive import query_alert_history, page_token, parse_page_token, ANY_FIREFIGHTER
+from backend.blackbox import BlackboxExport, EXPORT_MIMETYPES
+from backend.blackbox_npz import write_npz
+from backend.downsample import lttb_select, rdp_select, MIN_POINTS
+from backend.fieldsets import parse_fields
+from backend.replay import ReplayManager, ReplaySession
+from backend.history import query_history_batch, HISTORY_CHANNELS, MAX_FIREFIGHTERS, MAX_ROWS, DEFAULT_WINDOW_SECONDS
+from backend.event_bus import StreamLimit, parse_last_event_id, MAX_STREAMS
+from backend.serializers import alert_to_dict, beacon_to_dict, firefighter_to_dict, position_to_dict, vitals_to_dict
+from backend.data_version import data_versions, conditional_stats
+from backend.serialization import FastJSONProvider, wants_msgpack
+from backend.building_cache import BuildingCache
+from backend.compression import init_compression
+from backend.profiling import init_profiling, route_stats
 
 app = Flask(__name__)
-CORS(app)
+app.json = FastJSONProvider(app)  # orjson, MessagePack for `Accept: application/msgpack`
+init_profiling(app)  # Server-Timing header and per-route timings in /api/metrics (first, so compression is timed)
+init_compression(app)  # gzip / brotli above 1 KiB, streamed responses included
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Next-Page', 'ETag', 'Server-Timing', 'X-Profile-Dump'])
 
 # Initialize database
 init_db()
@@ -25,15 +45,89 @@ init_db()
 retriever = DataRetriever()
 retriever.start()
 
+# Open SSE streams each hold a server thread - capped below the pool size (serve.py sets the limit)
+stream_limit = StreamLimit(int(os.environ.get('MAX_STREAMS', MAX_STREAMS)))
+
+# Black-box replay sessions (backend/replay.py)
+replays = ReplayManager()
+
+# Building geometry from the simulator API, served from memory/disk and refreshed in the background
+building_cache = BuildingCache(on_change=lambda: data_versions.bump('building'))
+
+
+# Bucket of the current time added to the ETag of responses that change with the clock
+CLOCK_ETAG_SECONDS = 1
+
+
+def conditional(*resources, clock=False):
+    """Serve a GET endpoint with an ETag derived from the data versions of `resources`.
+    
+    A matching If-None-Match is answered with 304 before the view runs, so
+    unchanged polls cost no database queries. The version is read before the
+    view queries, so a change committed meanwhile only causes one extra 200.
+    
+    `clock` (True, or a function telling whether the current request does)
+    marks responses holding values that change with time alone (seconds since
+    contact, time stationary, SCBA minutes left); their ETag also changes
+    every CLOCK_ETAG_SECONDS, so they don't freeze while no data arrives.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = data_versions.etag(resources)
+            if clock is True or (callable(clock) and clock()):
+                etag += f'-t{int(time.time()) // CLOCK_ETAG_SECONDS}'
+            if wants_msgpack():
+                etag += '-msgpack'  # Each representation has its own ETag
+            # Weak comparison - compressed responses carry the ETag as W/"..."
+            not_modified = request.if_none_match.contains_weak(etag)
+            conditional_stats.record(request.endpoint, not_modified)
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'  # Browsers revalidate on every request
+            return response
+        return wrapper
+    return decorator
+
+
+def roster_uses_clock():
+    """Whether /api/firefighters includes the SCBA predictions (all fields or `fields` naming them)"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError:
+        return False  # Answered with 400
+    return fields is None or 'scba_prediction' in fields.firefighter
+
 
 @app.route('/api/firefighters', methods=['GET'])
+@conditional('firefighters', clock=roster_uses_clock)
 def get_firefighters():
-    """Get all firefighters with latest position and vitals"""
+    """Get all firefighters with latest position and vitals.
+    
+    `fields` (e.g. `id,name,vitals.battery_level`) limits the response to
+    those fields; only their columns are queried.
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     db = SessionLocal()
     try:
+        if fields is not None:
+            return jsonify(query_roster_fields(db, fields))
+        
         firefighters = db.query(Firefighter).all()
         result = []
         
+        # Predicted SCBA air remaining for the whole roster (one vectorized pass)
+        scba_predictions = retriever.scba_predictor.predictions()
+        
         for ff in firefighters:
             # Get latest position
             latest_pos = db.query(Position).filter(
@@ -45,48 +139,12 @@ def get_firefighters():
                 Vitals.firefighter_id == ff.id
             ).order_by(desc(Vitals.timestamp)).first()
             
-            # Get on_mission value - ensure it's a boolean
-            on_mission_value = getattr(ff, 'on_mission', None)
-            if on_mission_value is None:
-                on_mission_value = False
-            else:
-                # Convert to boolean if it's stored as string or int
-                on_mission_value = bool(on_mission_value) if on_mission_value not in (True, False) else on_mission_value
+            # on_mission is converted to a boolean by the serializer
+            ff_data = firefighter_to_dict(ff, latest_pos, latest_vitals, scba_predictions.get(ff.id))
             
             # Debug: Log first few firefighters to verify on_mission values
             if len(result) < 3:
-                print(f"API: Firefighter {ff.badge_number} ({ff.name}): on_mission = {on_mission_value} (type: {type(on_mission_value).__name__})")
-            
-            ff_data = {
-                'id': ff.id,
-                'name': ff.name,
-                'badge_number': ff.badge_number,
-                'team': getattr(ff, 'team', None) or '',
-                'on_mission': on_mission_value,
-            }
-            
-            if latest_pos:
-                ff_data['position'] = {
-                    'latitude': latest_pos.latitude,
-                    'longitude': latest_pos.longitude,
-                    'floor': latest_pos.floor,
-                    'timestamp': latest_pos.timestamp.isoformat()
-                }
-            else:
-                ff_data['position'] = None
-                
-            if latest_vitals:
-                ff_data['vitals'] = {
-                    'heart_rate': latest_vitals.heart_rate,
-                    'temperature': latest_vitals.temperature,
-                    'oxygen_level': latest_vitals.oxygen_level,
-                    'co_level': latest_vitals.co_level,
-                    'battery_level': latest_vitals.battery_level,
-                    'scba_pressure': latest_vitals.scba_pressure,
-                    'timestamp': latest_vitals.timestamp.isoformat()
-                }
-            else:
-                ff_data['vitals'] = None
+                print(f"API: Firefighter {ff.badge_number} ({ff.name}): on_mission = {ff_data['on_mission']}")
                 
             result.append(ff_data)
             
@@ -95,79 +153,317 @@ def get_firefighters():
         db.close()
 
 
+def event_stream(make_stream):
+    """Server-Sent Events response of `make_stream()`, holding a stream slot until the client disconnects.
+
+    Answers 503 while `stream_limit` streams are open; EventSource does not retry
+    a failed connection by itself, the client retries after Retry-After.
+    """
+    if not stream_limit.acquire():
+        response = jsonify({'error': 'Too many open streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '10'
+        return response
+    response = Response(
+        make_stream(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        }
+    )
+    response.call_on_close(stream_limit.release)
+    return response
+
+
+@app.route('/api/firefighters/stream', methods=['GET'])
+def stream_firefighters():
+    """Server-Sent Events stream of the roster: a snapshot on connect, then per-firefighter field deltas"""
+    floor = request.args.get('floor', type=int)
+    team = request.args.get('team') or None
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    return event_stream(lambda: retriever.roster.stream(last_event_id, floor=floor, team=team))
+
+
+def parse_cursor_args():
+    """Read `cursor` (last row id the client has) and `since` (ISO timestamp) query parameters.
+    
+    A cursor only covers inserted rows: alerts updated in place keep their id
+    (aggregate member changes, acknowledgements) and reach clients as
+    alert-updated / alert-acknowledged events of /api/alerts/stream instead.
+    Raises ValueError for an invalid value.
+    """
+    cursor = request.args.get('cursor')
+    since = request.args.get('since')
+    if cursor is not None:
+        cursor = int(cursor)
+    if since:
+        since = datetime.fromisoformat(since.rstrip('Z'))
+    return cursor, since or None
+
+
+def with_next_cursor(result, rows, cursor=None):
+    """JSON response with the id of the newest returned row in the X-Next-Cursor header"""
+    response = jsonify(result)
+    next_cursor = max((row.id for row in rows), default=cursor)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+
+def parse_points_arg():
+    """Read the `points` query parameter (target number of samples after downsampling).
+    
+    Raises ValueError for an invalid value.
+    """
+    points = request.args.get('points')
+    if points is None:
+        return None
+    points = int(points)
+    if points < MIN_POINTS:
+        raise ValueError(f"points must be at least {MIN_POINTS}")
+    return points
+
+
+def query_downsampled(db, model, firefighter_id, points, columns, select=lttb_select):
+    """History rows downsampled to `points` by `select` over the (x, y) `columns`.
+    
+    Rows after `cursor` / `since` are read, by default those of the last
+    DEFAULT_WINDOW_SECONDS, and at most the newest MAX_ROWS (or `limit`) of them.
+    Only id, x and y are read for the window; full rows only for the kept samples.
+    """
+    limit = min(max(request.args.get('limit', MAX_ROWS, type=int), 1), MAX_ROWS)
+    cursor, since = parse_cursor_args()
+    
+    query = db.query(model.id, *columns).filter(model.firefighter_id == firefighter_id)
+    if cursor is not None:
+        query = query.filter(model.id > cursor)
+    else:
+        since = since or datetime.utcnow() - timedelta(seconds=DEFAULT_WINDOW_SECONDS)
+        query = query.filter(model.timestamp > since)
+    samples = query.order_by(desc(model.timestamp), desc(model.id)).limit(limit).all()
+    ids = select(list(reversed(samples)), points)
+    return db.query(model).filter(model.id.in_(ids)).order_by(model.timestamp, model.id).all()
+
+
+def query_history(db, model, firefighter_id, columns=None, limit=100):
+    """Rows of a per-firefighter history table in chronological order.
+    
+    Without `cursor`/`since` the last `limit` rows are returned; with them only
+    newer rows (oldest first, up to `limit`), so polling clients fetch each row once.
+    With `columns` only those columns are loaded instead of ORM objects.
+    """
+    limit = request.args.get('limit', limit, type=int)
+    cursor, since = parse_cursor_args()
+    
+    query = db.query(*columns) if columns else db.query(model)
+    query = query.filter(model.firefighter_id == firefighter_id)
+    if cursor is not None:
+        return query.filter(model.id > cursor).order_by(model.id).limit(limit).all()
+    if since is not None:
+        return query.filter(model.timestamp > since).order_by(model.timestamp).limit(limit).all()
+    
+    rows = query.order_by(desc(model.timestamp)).limit(limit).all()
+    return list(reversed(rows))  # Reverse to get chronological order
+
+
+# Vitals fields `points` downsampling can follow (`field` parameter)
+DOWNSAMPLE_VITALS_FIELDS = ('heart_rate', 'temperature', 'oxygen_level', 'co_level', 'battery_level', 'scba_pressure')
+
+
 @app.route('/api/firefighters/<int:firefighter_id>/positions', methods=['GET'])
+@conditional('firefighters')
 def get_firefighter_positions(firefighter_id):
-    """Get position history for a firefighter"""
+    """Get position history for a firefighter (`cursor`/`since` return only newer rows, `points` downsamples)"""
     db = SessionLocal()
     try:
-        limit = request.args.get('limit', 100, type=int)
-        
-        positions = db.query(Position).filter(
-            Position.firefighter_id == firefighter_id
-        ).order_by(desc(Position.timestamp)).limit(limit).all()
+        try:
+            points = parse_points_arg()
+            if points is not None:
+                # Simplify the trail as a path on the map (corners are kept)
+                positions = query_downsampled(
+                    db, Position, firefighter_id, points, (Position.longitude, Position.latitude), select=rdp_select
+                )
+            else:
+                positions = query_history(db, Position, firefighter_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor, since or points parameter'}), 400
         
-        result = [{
-            'latitude': pos.latitude,
-            'longitude': pos.longitude,
-            'floor': pos.floor,
-            'timestamp': pos.timestamp.isoformat()
-        } for pos in reversed(positions)]  # Reverse to get chronological order
+        result = [position_to_dict(pos) for pos in positions]
         
-        return jsonify(result)
+        return with_next_cursor(result, positions, request.args.get('cursor'))
     finally:
         db.close()
 
 
 @app.route('/api/firefighters/<int:firefighter_id>/vitals', methods=['GET'])
+@conditional('firefighters')
 def get_firefighter_vitals(firefighter_id):
-    """Get vitals history for a firefighter"""
+    """Get vitals history for a firefighter (`cursor`/`since` return only newer rows, `points` downsamples)"""
     db = SessionLocal()
     try:
-        limit = request.args.get('limit', 100, type=int)
+        try:
+            points = parse_points_arg()
+            field = request.args.get('field', 'heart_rate')
+            if field not in DOWNSAMPLE_VITALS_FIELDS:
+                raise ValueError(field)
+            if points is not None:
+                # Points are chosen so the chart of `field` keeps its shape (peaks included)
+                vitals = query_downsampled(
+                    db, Vitals, firefighter_id, points, (func.julianday(Vitals.timestamp), getattr(Vitals, field))
+                )
+            else:
+                vitals = query_history(db, Vitals, firefighter_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor, since, points or field parameter'}), 400
         
-        vitals = db.query(Vitals).filter(
-            Vitals.firefighter_id == firefighter_id
-        ).order_by(desc(Vitals.timestamp)).limit(limit).all()
-        
-        result = [{
-            'heart_rate': v.heart_rate,
-            'temperature': v.temperature,
-            'oxygen_level': v.oxygen_level,
-            'co_level': v.co_level,
-            'battery_level': v.battery_level,
-            'scba_pressure': v.scba_pressure,
-            'timestamp': v.timestamp.isoformat()
-        } for v in reversed(vitals)]  # Reverse to get chronological order
+        result = [vitals_to_dict(v) for v in vitals]
         
+        return with_next_cursor(result, vitals, request.args.get('cursor'))
+    finally:
+        db.close()
+
+
+@app.route('/api/history', methods=['GET'])
+@conditional('firefighters')
+def get_history_batch():
+    """History of several firefighters in one request, as arrays per field.
+    
+    Query parameters: `ids` (comma separated firefighter ids), `since` / `until`
+    (ISO timestamps, default: the last 10 minutes) and `channels` (comma
+    separated, default: all - see backend/history.py).
+    """
+    try:
+        firefighter_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        until = request.args.get('until')
+        until = datetime.fromisoformat(until.rstrip('Z')) if until else datetime.utcnow()
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since.rstrip('Z')) if since else until - timedelta(seconds=DEFAULT_WINDOW_SECONDS)
+    except ValueError:
+        return jsonify({'error': 'Invalid ids, since or until parameter'}), 400
+    
+    channels = [channel for channel in request.args.get('channels', '').split(',') if channel] or list(HISTORY_CHANNELS)
+    if not firefighter_ids:
+        return jsonify({'error': 'No firefighter ids given'}), 400
+    if len(firefighter_ids) > MAX_FIREFIGHTERS:
+        return jsonify({'error': f'At most {MAX_FIREFIGHTERS} firefighter ids per request'}), 400
+    
+    db = SessionLocal()
+    try:
+        try:
+            result = query_history_batch(db, firefighter_ids, since, until, channels)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        result['since'] = since.isoformat()
+        result['until'] = until.isoformat()
         return jsonify(result)
     finally:
         db.close()
 
 
 @app.route('/api/alerts', methods=['GET'])
+@conditional('alerts')
 def get_alerts():
-    """Get all unacknowledged alerts"""
+    """Get all unacknowledged alerts (`cursor`/`since` return only newly inserted ones, not updates)"""
+    db = SessionLocal()
+    try:
+        try:
+            cursor, since = parse_cursor_args()
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor or since parameter'}), 400
+        
+        query = db.query(Alert).filter(Alert.acknowledged == False)
+        if cursor is not None:
+            query = query.filter(Alert.id > cursor)
+        if since is not None:
+            query = query.filter(Alert.timestamp > since)
+        alerts = query.order_by(desc(Alert.timestamp)).all()
+        
+        result = [alert_to_dict(alert) for alert in alerts]
+        
+        return with_next_cursor(result, alerts, cursor)
+    finally:
+        db.close()
+
+
+@app.route('/api/alerts/stream', methods=['GET'])
+def stream_alerts():
+    """Server-Sent Events stream of alert-created, alert-updated and alert-acknowledged events"""
+    # Browsers send Last-Event-ID on reconnect; the query parameter allows resuming a fresh EventSource
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    return event_stream(lambda: retriever.alert_events.stream(last_event_id))
+
+
+@app.route('/api/alerts/<int:alert_id>/acknowledge', methods=['POST'])
+def acknowledge_alert(alert_id):
+    """Acknowledge an alert"""
     db = SessionLocal()
     try:
-        alerts = db.query(Alert).filter(
-            Alert.acknowledged == False
-        ).order_by(desc(Alert.timestamp)).all()
+        alert = db.query(Alert).filter(Alert.id == alert_id).first()
+        
+        if not alert:
+            if db.query(AlertArchive.id).filter(AlertArchive.id == alert_id).first():
+                return jsonify({'error': 'Alert is archived'}), 409
+            return jsonify({'error': 'Alert not found'}), 404
         
-        result = [{
+        if not alert.acknowledged:
+            alert.acknowledged = True
+            db.commit()
+            # Keep the in-memory dedup index in sync and notify stream subscribers
+            retriever.acknowledge_alert(alert)
+        
+        return jsonify({
             'id': alert.id,
             'firefighter_id': alert.firefighter_id,
             'alert_type': alert.alert_type,
-            'severity': alert.severity,
-            'message': alert.message,
-            'timestamp': alert.timestamp.isoformat()
-        } for alert in alerts]
-        
-        return jsonify(result)
+            'acknowledged': True,
+            'message': 'Alert acknowledged'
+        })
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
     finally:
         db.close()
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Server metrics: conditional GETs and the share answered with 304, per-route timings, SQL statements,
+    open streams and upstream alerts ingested without an id"""
+    return jsonify({
+        'alert_ingest': {'unkeyed_alerts': retriever.unkeyed_alerts},
+        'conditional_requests': conditional_stats.to_dict(),
+        'data_versions': dict(data_versions.versions),
+        'routes': route_stats.to_dict(),
+        'streams': stream_limit.to_dict()
+    })
+
+
+@app.route('/api/alert-rules', methods=['GET'])
+def get_alert_rules():
+    """Get the active alert threshold rules"""
+    return jsonify(retriever.alert_engine.rule_table.to_dict())
+
+
+@app.route('/api/alert-rules/reload', methods=['POST'])
+def reload_alert_rules():
+    """Reload alert threshold rules from the rule file"""
+    rule_table = retriever.alert_engine.rule_table
+    try:
+        rule_table.load()
+        retriever.stationary_tracker.configure(**rule_table.stationary)
+        return jsonify(rule_table.to_dict())
+    except (OSError, ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid rule file: {e}'}), 400
+
+
 @app.route('/api/beacons', methods=['GET'])
+@conditional('beacons')
 def get_beacons():
     """Get all beacons"""
     db = SessionLocal()
@@ -180,37 +476,38 @@ def get_beacons():
             
         beacons = query.all()
         
-        result = [{
-            'id': beacon.id,
-            'beacon_id': beacon.beacon_id,
-            'name': beacon.name,
-            'latitude': beacon.latitude,
-            'longitude': beacon.longitude,
-            'floor': beacon.floor,
-            'battery_percent': beacon.battery_percent,
-            'signal_quality': beacon.signal_quality,
-            'tags_in_range': beacon.tags_in_range,
-            'last_seen': beacon.last_seen.isoformat(),
-            'is_online': beacon.is_online,
-            'status': 'active' if beacon.is_online else 'inactive'
-        } for beacon in beacons]
+        result = [beacon_to_dict(beacon) for beacon in beacons]
         
         return jsonify(result)
     finally:
         db.close()
 
 
-@app.route('/api/building', methods=['GET'])
-def get_building():
-    """Get building information from simulator API"""
-    import requests
+def latest_rows(db, model, columns=None):
+    """Newest row of a per-firefighter history table for each firefighter, keyed by firefighter id.
     
+    With `columns` only those columns (and firefighter_id) are selected.
+    """
+    newest_ids = db.query(func.max(model.id)).group_by(model.firefighter_id).scalar_subquery()
+    entities = [model] if columns is None else [model.firefighter_id] + [getattr(model, column) for column in columns]
+    return {row.firefighter_id: row for row in db.query(*entities).filter(model.id.in_(newest_ids))}
+
+
+def query_roster_fields(db, fields):
+    """Roster limited to a FieldSet: only the needed columns and tables are queried"""
+    begin_read(db)
+    positions = latest_rows(db, Position, fields.position) if fields.position is not None else {}
+    vitals = latest_rows(db, Vitals, fields.vitals) if fields.vitals is not None else {}
+    scba_predictions = retriever.scba_predictor.predictions() if 'scba_prediction' in fields.firefighter else {}
+    columns = [getattr(Firefighter, column) for column in fields.columns]
+    return [fields.to_dict(ff, positions.get(ff.id), vitals.get(ff.id), scba_predictions.get(ff.id))
+            for ff in db.query(*columns).order_by(Firefighter.id)]
+
+
+def building_to_dict(sim_building):
+    """Building (name, floors, center) from the simulator building JSON; defaults if it is unavailable"""
     try:
-        # Get building from simulator API
-        response = requests.get('https://niesmiertelnik.replit.app/api/v1/building', timeout=5)
-        if response.status_code == 200:
-            sim_building = response.json()
-            
+        if sim_building is not None:
             # Extract floors
             floors_data = sim_building.get('floors', [])
             floors = []
@@ -237,7 +534,7 @@ def get_building():
                 'longitude': origin.get('lon', 21.0122)
             }
             
-            return jsonify({
+            return {
                 'name': sim_building.get('name', 'Locero Building'),
                 'floors': floors if floors else [
                     {'index': 0, 'name': 'Ground Floor'},
@@ -245,25 +542,79 @@ def get_building():
                     {'index': 2, 'name': 'Second Floor'}
                 ],
                 'center': center
-            })
+            }
     except Exception as e:
-        print(f"Error fetching building from simulator: {e}")
-        # Return default building on error
+        print(f"Error reading building from simulator data: {e}")
+    
+    # Return default building if no copy of the simulator building is available
+    return {
+        'name': 'Locero Building',
+        'floors': [
+            {'index': 0, 'name': 'Ground Floor'},
+            {'index': 1, 'name': 'First Floor'},
+            {'index': 2, 'name': 'Second Floor'}
+        ],
+        'center': {
+            'latitude': 52.2297,
+            'longitude': 21.0122
+        }
+    }
+
+
+@app.route('/api/building', methods=['GET'])
+@conditional('building')
+def get_building():
+    """Get building information from simulator API (cached, refreshed in the background)"""
+    return jsonify(building_to_dict(building_cache.get()))
+
+
+@app.route('/api/snapshot', methods=['GET'])
+@conditional('firefighters', 'alerts', 'beacons', 'building', clock=True)
+def get_snapshot():
+    """Everything the map view needs (firefighters, active alerts, beacons, building) in one response.
+    
+    Read in one transaction, so all parts are consistent with each other.
+    With `floor` only firefighters on that floor, their alerts, the floor's
+    aggregate alerts and its beacons are returned (the building is always complete).
+    """
+    floor = request.args.get('floor', type=int)
+    db = SessionLocal()
+    try:
+        begin_read(db)
+        
+        # Latest position and vitals of every firefighter in one query per table
+        latest_positions = latest_rows(db, Position)
+        latest_vitals = latest_rows(db, Vitals)
+        scba_predictions = retriever.scba_predictor.predictions()
+        
+        firefighters = []
+        for ff in db.query(Firefighter).all():
+            position = latest_positions.get(ff.id)
+            if floor is not None and (position is None or position.floor != floor):
+                continue
+            firefighters.append(firefighter_to_dict(ff, position, latest_vitals.get(ff.id), scba_predictions.get(ff.id)))
+        
+        visible_ids = {ff['id'] for ff in firefighters}
+        alerts = db.query(Alert).filter(Alert.acknowledged == False).order_by(desc(Alert.timestamp)).all()
+        if floor is not None:
+            alerts = [alert for alert in alerts if alert.floor == floor or alert.firefighter_id in visible_ids]
+        
+        beacons = db.query(Beacon)
+        if floor is not None:
+            beacons = beacons.filter(Beacon.floor == floor)
+        
         return jsonify({
-            'name': 'Locero Building',
-            'floors': [
-                {'index': 0, 'name': 'Ground Floor'},
-                {'index': 1, 'name': 'First Floor'},
-                {'index': 2, 'name': 'Second Floor'}
-            ],
-            'center': {
-                'latitude': 52.2297,
-                'longitude': 21.0122
-            }
+            'firefighters': firefighters,
+            'alerts': [alert_to_dict(alert) for alert in alerts],
+            'beacons': [beacon_to_dict(beacon) for beacon in beacons.all()],
+            'building': building_to_dict(building_cache.get())
         })
+    finally:
+        db.close()
 
 
 @app.route('/api/firefighters/<int:firefighter_id>/beacon', methods=['GET'])
+@conditional('firefighters', 'beacons', clock=True)
 def get_firefighter_beacon(firefighter_id):
     """Get the last beacon that detected this firefighter"""
     db = SessionLocal()
@@ -297,31 +648,12 @@ def get_firefighter_beacon(firefighter_id):
             Vitals.firefighter_id == firefighter_id
         ).order_by(desc(Vitals.timestamp)).first()
         
-        # Calculate time stationary
-        positions = db.query(Position).filter(
-            Position.firefighter_id == firefighter_id
-        ).order_by(desc(Position.timestamp)).limit(100).all()
-        
-        time_stationary = 0  # seconds
-        if len(positions) > 1:
-            # Check if position hasn't changed significantly
-            first_pos = positions[0]
-            stationary_since = first_pos.timestamp
-            
-            for pos in positions[1:]:
-                # Check if position changed (more than 5 meters)
-                lat_diff = abs(pos.latitude - first_pos.latitude) * 111000
-                lon_diff = abs(pos.longitude - first_pos.longitude) * 111000 * cos(first_pos.latitude * 3.14159 / 180)
-                distance = sqrt(lat_diff**2 + lon_diff**2)
-                
-                if distance > 5:  # Moved more than 5 meters
-                    break
-                stationary_since = pos.timestamp
-            
-            time_stationary = (datetime.utcnow() - stationary_since).total_seconds()
+        # Time stationary is tracked incrementally by the data retriever
+        stationary_tracker = retriever.stationary_tracker
+        time_stationary = stationary_tracker.time_stationary(firefighter_id)  # seconds
         
         # Determine movement status
-        movement_status = 'ruch' if time_stationary < 30 else 'bezruch'
+        movement_status = 'bezruch' if stationary_tracker.is_stationary(firefighter_id) else 'ruch'
         
         # Calculate time since last contact (most recent of position or vitals)
         last_contact_time = None
@@ -366,6 +698,7 @@ def get_firefighter_beacon(firefighter_id):
 
 
 @app.route('/api/beacons/<int:beacon_id>', methods=['GET'])
+@conditional('beacons')
 def get_beacon(beacon_id):
     """Get beacon details"""
     db = SessionLocal()
@@ -392,6 +725,7 @@ def get_beacon(beacon_id):
 
 
 @app.route('/api/beacons/<int:beacon_id>/firefighters', methods=['GET'])
+@conditional('firefighters', 'beacons')
 def get_beacon_firefighters(beacon_id):
     """Get all firefighters currently in range of this beacon"""
     db = SessionLocal()
@@ -447,12 +781,14 @@ def get_beacon_firefighters(beacon_id):
 
 
 @app.route('/api/firefighters/all', methods=['GET'])
+@conditional('firefighters', clock=True)
 def get_all_firefighters():
     """Get all firefighters with mission status"""
     db = SessionLocal()
     try:
         firefighters = db.query(Firefighter).all()
         result = []
+        scba_predictions = retriever.scba_predictor.predictions()
         
         for ff in firefighters:
             latest_pos = db.query(Position).filter(
@@ -463,26 +799,8 @@ def get_all_firefighters():
                 Vitals.firefighter_id == ff.id
             ).order_by(desc(Vitals.timestamp)).first()
             
-            # Calculate time stationary
-            positions = db.query(Position).filter(
-                Position.firefighter_id == ff.id
-            ).order_by(desc(Position.timestamp)).limit(100).all()
-            
-            time_stationary = 0
-            if len(positions) > 1:
-                first_pos = positions[0]
-                stationary_since = first_pos.timestamp
-                
-                for pos in positions[1:]:
-                    lat_diff = abs(pos.latitude - first_pos.latitude) * 111000
-                    lon_diff = abs(pos.longitude - first_pos.longitude) * 111000 * cos(first_pos.latitude * 3.14159 / 180)
-                    distance = sqrt(lat_diff**2 + lon_diff**2)
-                    
-                    if distance > 5:
-                        break
-                    stationary_since = pos.timestamp
-                
-                time_stationary = (datetime.utcnow() - stationary_since).total_seconds() / 60
+            # Time stationary in minutes, tracked incrementally by the data retriever
+            time_stationary = retriever.stationary_tracker.time_stationary(ff.id) / 60
             
             result.append({
                 'id': ff.id,
@@ -500,7 +818,8 @@ def get_all_firefighters():
                     'heart_rate': latest_vitals.heart_rate,
                     'battery_level': latest_vitals.battery_level
                 } if latest_vitals else None,
-                'time_stationary': round(time_stationary, 1)
+                'time_stationary': round(time_stationary, 1),
+                'scba_prediction': scba_predictions.get(ff.id)
             })
         
         return jsonify(result)
@@ -508,161 +827,223 @@ def get_all_firefighters():
         db.close()
 
 
+# Page size of /api/alerts/all (default and maximum `limit`)
+ALERT_PAGE_SIZE = 100
+MAX_ALERT_PAGE_SIZE = 1000
+
+
 @app.route('/api/alerts/all', methods=['GET'])
+@conditional('alerts')
 def get_all_alerts():
-    """Get all alerts (including acknowledged) with filtering"""
+    """Get all alerts (including acknowledged) with filtering, newest first in pages.
+    
+    Filters: `severity`, `acknowledged`, `firefighter_id`, `alert_type`, `since` / `until`.
+    At most `limit` alerts are returned; if there are more, the `X-Next-Page`
+    header holds the token to pass as `page` for the next (older) page.
+    """
     db = SessionLocal()
     try:
         severity_filter = request.args.get('severity')
         acknowledged_filter = request.args.get('acknowledged', 'false')
+        alert_type = request.args.get('alert_type')
+        try:
+            cursor, since = parse_cursor_args()
+            until = request.args.get('until')
+            until = datetime.fromisoformat(until.rstrip('Z')) if until else None
+            page = request.args.get('page')
+            before = parse_page_token(page) if page else None
+            firefighter_id = request.args.get('firefighter_id', ANY_FIREFIGHTER, type=int)
+            limit = max(1, min(request.args.get('limit', ALERT_PAGE_SIZE, type=int), MAX_ALERT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor, since, until or page parameter'}), 400
         
-        query = db.query(Alert)
-        
-        if severity_filter:
-            query = query.filter(Alert.severity == severity_filter)
-        
-        if acknowledged_filter.lower() == 'false':
-            query = query.filter(Alert.acknowledged == False)
+        # Active (unacknowledged) alerts live in the bounded alerts table, the full history also in the archive
+        active_only = acknowledged_filter.lower() == 'false'
+        alerts = query_alert_history(
+            db,
+            firefighter_id=firefighter_id,
+            severity=severity_filter,
+            acknowledged=False if active_only else None,
+            after_id=cursor,
+            since=since,
+            alert_type=alert_type,
+            until=until,
+            before=before,
+            limit=limit + 1,  # One extra row tells whether another page exists
+            active_only=active_only
+        )
+        has_more = len(alerts) > limit
+        alerts = alerts[:limit]
         
-        alerts = query.order_by(desc(Alert.timestamp)).all()
+        result = [dict(alert_to_dict(alert), acknowledged=alert.acknowledged) for alert in alerts]
         
-        result = [{
-            'id': alert.id,
-            'firefighter_id': alert.firefighter_id,
-            'alert_type': alert.alert_type,
-            'severity': alert.severity,
-            'message': alert.message,
-            'timestamp': alert.timestamp.isoformat(),
-            'acknowledged': alert.acknowledged
-        } for alert in alerts]
-        
-        return jsonify(result)
+        response = with_next_cursor(result, alerts, cursor)
+        if has_more:
+            response.headers['X-Next-Page'] = page_token(alerts[-1])
+        return response
     finally:
         db.close()
 
 
 @app.route('/api/export/blackbox', methods=['GET'])
 def export_blackbox():
-    """Export all database data as JSON (black box data)"""
+    """Export all database data (black box data).
+    
+    `format=json` (default) streams one JSON document, `format=ndjson` one
+    record per line, `format=npz` gives a compressed columnar archive (see
+    backend/blackbox_npz.py). `ids` (comma separated firefighter ids) and
+    `since` / `until` (ISO timestamps) limit the export.
+    """
+    export_format = request.args.get('format', 'json')
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({'error': f'Unknown format: {export_format}'}), 400
+    try:
+        ids = request.args.get('ids')
+        firefighter_ids = [int(value) for value in ids.split(',') if value.strip()] if ids else None
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since.rstrip('Z')) if since else None
+        until = request.args.get('until')
+        until = datetime.fromisoformat(until.rstrip('Z')) if until else None
+    except ValueError:
+        return jsonify({'error': 'Invalid ids, since or until parameter'}), 400
+    
     db = SessionLocal()
     try:
-        export_timestamp = datetime.utcnow().isoformat()
-        
-        # Get all firefighters
-        firefighters = db.query(Firefighter).all()
-        firefighters_data = []
-        for ff in firefighters:
-            # Get all positions for this firefighter
-            positions = db.query(Position).filter(
-                Position.firefighter_id == ff.id
-            ).order_by(desc(Position.timestamp)).all()
-            
-            # Get all vitals for this firefighter
-            vitals = db.query(Vitals).filter(
-                Vitals.firefighter_id == ff.id
-            ).order_by(desc(Vitals.timestamp)).all()
-            
-            # Get all alerts for this firefighter
-            alerts = db.query(Alert).filter(
-                Alert.firefighter_id == ff.id
-            ).order_by(desc(Alert.timestamp)).all()
-            
-            firefighters_data.append({
-                'id': ff.id,
-                'name': ff.name,
-                'badge_number': ff.badge_number,
-                'team': getattr(ff, 'team', None),
-                'on_mission': getattr(ff, 'on_mission', False),
-                'created_at': ff.created_at.isoformat() if ff.created_at else None,
-                'positions': [{
-                    'id': pos.id,
-                    'latitude': pos.latitude,
-                    'longitude': pos.longitude,
-                    'floor': pos.floor,
-                    'timestamp': pos.timestamp.isoformat()
-                } for pos in positions],
-                'vitals': [{
-                    'id': vit.id,
-                    'heart_rate': vit.heart_rate,
-                    'temperature': vit.temperature,
-                    'oxygen_level': vit.oxygen_level,
-                    'co_level': vit.co_level,
-                    'battery_level': vit.battery_level,
-                    'scba_pressure': vit.scba_pressure,
-                    'timestamp': vit.timestamp.isoformat()
-                } for vit in vitals],
-                'alerts': [{
-                    'id': alert.id,
-                    'alert_type': alert.alert_type,
-                    'severity': alert.severity,
-                    'message': alert.message,
-                    'timestamp': alert.timestamp.isoformat(),
-                    'acknowledged': alert.acknowledged
-                } for alert in alerts]
-            })
-        
-        # Get all beacons
-        beacons = db.query(Beacon).all()
-        beacons_data = [{
-            'id': beacon.id,
-            'beacon_id': beacon.beacon_id,
-            'name': beacon.name,
-            'latitude': beacon.latitude,
-            'longitude': beacon.longitude,
-            'floor': beacon.floor,
-            'battery_percent': beacon.battery_percent,
-            'signal_quality': beacon.signal_quality,
-            'tags_in_range': beacon.tags_in_range,
-            'last_seen': beacon.last_seen.isoformat() if beacon.last_seen else None,
-            'is_online': beacon.is_online
-        } for beacon in beacons]
-        
-        # Get all system alerts (alerts without firefighter_id)
-        system_alerts = db.query(Alert).filter(
-            Alert.firefighter_id == None
-        ).order_by(desc(Alert.timestamp)).all()
-        
-        blackbox_data = {
-            'export_timestamp': export_timestamp,
-            'export_type': 'blackbox',
-            'version': '1.0',
-            'data': {
-                'firefighters': firefighters_data,
-                'beacons': beacons_data,
-                'system_alerts': [{
-                    'id': alert.id,
-                    'alert_type': alert.alert_type,
-                    'severity': alert.severity,
-                    'message': alert.message,
-                    'timestamp': alert.timestamp.isoformat(),
-                    'acknowledged': alert.acknowledged
-                } for alert in system_alerts]
-            },
-            'statistics': {
-                'total_firefighters': len(firefighters_data),
-                'total_beacons': len(beacons_data),
-                'total_positions': sum(len(ff['positions']) for ff in firefighters_data),
-                'total_vitals': sum(len(ff['vitals']) for ff in firefighters_data),
-                'total_alerts': sum(len(ff['alerts']) for ff in firefighters_data) + len(system_alerts)
-            }
+        export = BlackboxExport(db, firefighter_ids, since, until)
+        if export_format == 'npz':
+            # Columnar arrays need all rows of a table - built in memory, compact
+            buffer = io.BytesIO()
+            write_npz(export, buffer)
+            stream = buffer.getvalue()
+        else:
+            stream = export.stream_json() if export_format == 'json' else export.stream_ndjson()
+    except Exception as e:
+        db.close()
+        return jsonify({'error': str(e)}), 500
+    
+    response = Response(
+        stream,
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{export.filename}.{export_format}"'
         }
-        
-        # Return as JSON with proper headers for download
-        json_str = json.dumps(blackbox_data, indent=2, ensure_ascii=False)
-        filename = f'blackbox_export_{export_timestamp.replace(":", "-").split(".")[0]}.json'
-        
-        response = Response(
-            json_str,
-            mimetype='application/json',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"'
-            }
-        )
-        return response
+    )
+    response.call_on_close(db.close)  # A streamed export uses the session until the last chunk is sent
+    return response
+
+
+def parse_replay_time(value):
+    """ISO timestamp of a replay parameter (None if absent); raises ValueError"""
+    return datetime.fromisoformat(value.rstrip('Z')) if value else None
+
+
+@app.route('/api/replay', methods=['POST'])
+def create_replay():
+    """Load a time range for replay: from the database (JSON body with optional `ids`,
+    `since`, `until`) or from an uploaded `format=npz` export (multipart field `file`)"""
+    upload = request.files.get('file')
+    if upload is not None:
+        try:
+            session = ReplaySession.from_file(upload.stream)
+        except (ValueError, KeyError, IndexError, EOFError, OSError, zipfile.BadZipFile) as e:
+            print(f"Error loading black-box export for replay: {e!r}")
+            return jsonify({'error': 'Invalid black-box export (expected format=npz)'}), 400
+        return jsonify(replays.add(session).to_dict()), 201
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        ids = data.get('ids')
+        firefighter_ids = [int(value) for value in ids] if ids else None
+        since = parse_replay_time(data.get('since'))
+        until = parse_replay_time(data.get('until'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid ids, since or until'}), 400
+    
+    db = SessionLocal()
+    try:
+        session = ReplaySession.from_database(db, firefighter_ids, since, until)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         db.close()
+    return jsonify(replays.add(session).to_dict()), 201
+
+
+def get_replay_or_404(session_id):
+    session = replays.get(session_id)
+    if session is None:
+        return None, (jsonify({'error': 'Replay not found'}), 404)
+    return session, None
+
+
+@app.route('/api/replay/<session_id>', methods=['GET', 'DELETE'])
+def replay_session(session_id):
+    """Replay clock and statistics; DELETE closes the replay"""
+    if request.method == 'DELETE':
+        if replays.remove(session_id) is None:
+            return jsonify({'error': 'Replay not found'}), 404
+        return jsonify({'id': session_id, 'message': 'Replay closed'})
+    session, error = get_replay_or_404(session_id)
+    return error or jsonify(session.to_dict())
+
+
+@app.route('/api/replay/<session_id>/<action>', methods=['POST'])
+def control_replay(session_id, action):
+    """play, pause, seek (`time`: ISO timestamp) or speed (`speed`: 1-50); returns the new frame"""
+    session, error = get_replay_or_404(session_id)
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    try:
+        at = parse_replay_time(data.get('time'))
+        speed = float(data['speed']) if data.get('speed') is not None else None
+        session.control(action, at, speed)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(session.frame())
+
+
+@app.route('/api/replay/<session_id>/firefighters', methods=['GET'])
+def get_replay_firefighters(session_id):
+    """Roster as of the replay clock (or `time`), same shape as /api/firefighters"""
+    session, error = get_replay_or_404(session_id)
+    if error:
+        return error
+    try:
+        at = parse_replay_time(request.args.get('time'))
+    except ValueError:
+        return jsonify({'error': 'Invalid time parameter'}), 400
+    return jsonify(session.roster_at(at or session.time()))
+
+
+@app.route('/api/replay/<session_id>/alerts', methods=['GET'])
+def get_replay_alerts(session_id):
+    """Alerts raised up to the replay clock (or `time`), newest first"""
+    session, error = get_replay_or_404(session_id)
+    if error:
+        return error
+    try:
+        at = parse_replay_time(request.args.get('time'))
+    except ValueError:
+        return jsonify({'error': 'Invalid time parameter'}), 400
+    return jsonify(session.alerts_at(at or session.time()))
+
+
+@app.route('/api/replay/<session_id>/stream', methods=['GET'])
+def stream_replay(session_id):
+    """Server-Sent Events stream of replay frames (clock, roster, alerts)"""
+    session, error = get_replay_or_404(session_id)
+    if error:
+        return error
+    return event_stream(session.stream)
+
+
+def shutdown():
+    """Stop the data retriever and end all streams (used by serve.py)"""
+    retriever.stop()
+    replays.close()
 
 
 @app.route('/api/firefighters/by-badge/<badge_number>', methods=['GET'])
@@ -702,6 +1083,7 @@ def add_firefighter_to_mission(firefighter_id):
         
         firefighter.on_mission = True
         db.commit()
+        retriever.set_on_mission(firefighter.id, True)
         
         return jsonify({
             'id': firefighter.id,
@@ -731,6 +1113,7 @@ def add_firefighter_to_mission_by_badge(badge_number):
         
         firefighter.on_mission = True
         db.commit()
+        retriever.set_on_mission(firefighter.id, True)
         
         return jsonify({
             'id': firefighter.id,
@@ -807,6 +1190,7 @@ def scan_rfid():
                 # Add to mission
                 firefighter.on_mission = True
                 db.commit()
+                retriever.set_on_mission(firefighter.id, True)
                 
                 return jsonify({
                     'badge_number': badge_number,
@@ -849,5 +1233,5 @@ def close_serial_port(port):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    app.run(debug=True, port=5000, use_reloader=False)  # The reloader would start a second data retriever
 
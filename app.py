@@ -5,9 +5,13 @@ import time
 from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
 from typing import Dict, List, Tuple, Optional
+from backend.building_cache import BuildingCache
+from backend.compression import init_compression, serve_precompressed_static
 
 
 app = Flask(__name__)
+init_compression(app)  # Rendered templates and JSON
+serve_precompressed_static(app)  # static/*.js precompressed, cached for a year
 # Enable CORS for all routes with more permissive settings
 CORS(app, resources={
     r"/api/*": {
@@ -20,6 +24,9 @@ CORS(app, resources={
 MAPS_URL = "https://staticmap.openstreetmap.de/staticmap.php?center={lon},{lat}&zoom=19&size=800x600&markers={lon},{lat},red"
 API_BASE_URL = "https://niesmiertelnik.replit.app/api/v1/"
 
+# Building geometry rarely changes - serve it from the cache, refreshed in the background
+building_cache = BuildingCache(API_BASE_URL + "building", timeout=10)
+
 
 def get_map_url(lon: float, lat: float) -> str:
     """Generate static map URL for given coordinates."""
@@ -28,12 +35,9 @@ def get_map_url(lon: float, lat: float) -> str:
 
 
 def get_building_info() -> Tuple[Dict, Dict[str, float], List[Dict], List[Dict], List[Dict]]:
-    """Fetch complete building information from API."""
-    try:
-        res = requests.get(API_BASE_URL + "building", timeout=10)
-        res.raise_for_status()
-        data = res.json()
-        
+    """Get complete building information from the cached API response."""
+    data = building_cache.get()
+    if data is not None:
         # Get building info
         building_info = {
             "id": data.get("id", ""),
@@ -66,17 +70,16 @@ def get_building_info() -> Tuple[Dict, Dict[str, float], List[Dict], List[Dict],
         }
         
         return building_info, cords, floors, entry_points, hazard_zones
-    except requests.RequestException as e:
-        print(f"Error fetching building info: {e}")
-        # Return default values on error
-        default_building = {
-            "id": "",
-            "name": "Brak danych",
-            "address": "",
-            "type": "",
-            "dimensions": {}
-        }
-        return default_building, {"lat": 52.2297, "lon": 21.0122, "altitude_m": 110, "rotation_deg": 0, "scale_lat_m_per_deg": 111320, "scale_lon_m_per_deg": 71695}, [], [], []
+    
+    # Return default values if the building was never fetched
+    default_building = {
+        "id": "",
+        "name": "Brak danych",
+        "address": "",
+        "type": "",
+        "dimensions": {}
+    }
+    return default_building, {"lat": 52.2297, "lon": 21.0122, "altitude_m": 110, "rotation_deg": 0, "scale_lat_m_per_deg": 111320, "scale_lon_m_per_deg": 71695}, [], [], []
 
 
 def convert_local_to_gps(x: float, y: float, cords: Dict, floor_height: float = 0) -> List[float]:
@@ -191,24 +194,11 @@ def get_story(story_id: int):
 
 @app.route("/api/building")
 def api_building():
-    """Proxy endpoint to fetch building data from original API."""
-    try:
-        res = requests.get(API_BASE_URL + "building", timeout=10)
-        res.raise_for_status()
-        try:
-            return jsonify(res.json())
-        except (ValueError, json.JSONDecodeError) as e:
-            print(f"Error parsing building response as JSON: {e}")
-            return jsonify({"error": "Invalid JSON response"}), 500
-    except requests.exceptions.Timeout:
-        return jsonify({"error": "Request timeout"}), 500
-    except requests.exceptions.ConnectionError:
-        return jsonify({"error": "Connection error"}), 500
-    except requests.RequestException as e:
-        return jsonify({"error": str(e)}), 500
-    except Exception as e:
-        print(f"Unexpected error in api_building: {type(e).__name__}: {e}")
-        return jsonify({"error": "Internal server error"}), 500
+    """Proxy endpoint for building data from original API (cached copy)."""
+    data = building_cache.get()
+    if data is None:
+        return jsonify({"error": "Building data unavailable"}), 500
+    return jsonify(data)
 
 
 @app.route("/api/alerts")
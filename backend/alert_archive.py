@@ -0,0 +1,148 @@
+"""
+Alert archive tier.
+
+The `alerts` table only holds the active set: the newest unacknowledged
+alerts (bounded by ACTIVE_ALERTS_LIMIT). Everything else - acknowledged
+alerts and overflow - is moved in small batches into the append-only
+`alerts_archive` table instead of being deleted, so incident history is kept
+while the active set stays small. History reads go through
+`query_alert_history`, which combines both tables with indexed range queries.
+"""
+from datetime import datetime
+from sqlalchemy import and_, desc, func, insert, literal, or_, select, union_all
+from backend.models import Alert, AlertArchive
+
+ACTIVE_ALERTS_LIMIT = 20  # Unacknowledged alerts kept in the active table
+ARCHIVE_BATCH_SIZE = 200  # Rows moved per statement
+ARCHIVE_MAX_BATCHES = 5  # Batches per call, so a backlog is drained over several cycles
+
+ALERT_COLUMNS = (
+    'id', 'firefighter_id', 'alert_type', 'severity', 'message', 'timestamp', 'acknowledged',
+    'source', 'remote_id', 'floor', 'member_count', 'affected_ids'
+)
+
+# Marker for "no firefighter filter" (None means system alerts)
+ANY_FIREFIGHTER = object()
+
+
+def archive_alerts(db, keep=ACTIVE_ALERTS_LIMIT, batch_size=ARCHIVE_BATCH_SIZE, max_batches=ARCHIVE_MAX_BATCHES):
+    """Move acknowledged and overflow alerts into the archive.
+
+    Returns (moved, moved_unacknowledged).
+    """
+    # Oldest (timestamp, id) still kept among the newest `keep` unacknowledged alerts
+    cutoff = db.query(Alert.timestamp, Alert.id).filter(
+        Alert.acknowledged == False
+    ).order_by(desc(Alert.timestamp), desc(Alert.id)).offset(keep - 1).limit(1).first()
+
+    condition = Alert.acknowledged == True
+    if cutoff is not None:
+        condition = or_(
+            condition,
+            Alert.timestamp < cutoff.timestamp,
+            and_(Alert.timestamp == cutoff.timestamp, Alert.id < cutoff.id)
+        )
+
+    # The row with the highest id always stays, so SQLite never reuses an archived id
+    max_id = db.query(func.max(Alert.id)).scalar()
+    if max_id is None:
+        return 0, 0
+
+    moved = 0
+    moved_unacknowledged = 0
+    for _ in range(max_batches):
+        batch = db.query(Alert.id, Alert.acknowledged).filter(
+            condition,
+            Alert.id < max_id
+        ).order_by(Alert.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        ids = [row.id for row in batch]
+        columns = [getattr(Alert, name) for name in ALERT_COLUMNS]
+        db.execute(insert(AlertArchive).from_select(
+            list(ALERT_COLUMNS) + ['archived_at'],
+            select(*columns, literal(datetime.utcnow()).label('archived_at')).where(Alert.id.in_(ids))
+        ))
+        db.query(Alert).filter(Alert.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+        moved += len(ids)
+        moved_unacknowledged += sum(1 for row in batch if not row.acknowledged)
+        if len(batch) < batch_size:
+            break
+
+    return moved, moved_unacknowledged
+
+
+def archived_remote_ids(db, source, remote_ids):
+    """Return the subset of upstream alert ids that were already archived"""
+    if not remote_ids:
+        return set()
+    rows = db.query(AlertArchive.remote_id).filter(
+        AlertArchive.source == source,
+        AlertArchive.remote_id.in_(list(remote_ids))
+    ).all()
+    return {row.remote_id for row in rows}
+
+
+def page_token(alert):
+    """Keyset page token ("<ISO timestamp>_<alert id>") of the page following `alert`"""
+    return f"{alert.timestamp.isoformat()}_{alert.id}"
+
+
+def parse_page_token(token):
+    """Parse a page token into the (timestamp, id) `before` position of query_alert_history.
+
+    Raises ValueError for an invalid token.
+    """
+    timestamp, alert_id = token.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(alert_id)
+
+
+def query_alert_history(db, firefighter_id=ANY_FIREFIGHTER, severity=None, acknowledged=None, after_id=None, since=None,
+                        alert_type=None, until=None, before=None, limit=None, active_only=False, max_id=None):
+    """Alerts from both the active table and the archive, newest first.
+
+    `firefighter_id=None` selects system alerts (without a firefighter).
+    `after_id` / `since` keep only alerts newer than a cursor (alert id) or a timestamp,
+    `until` only alerts up to a timestamp, `max_id` only alerts up to an id (a snapshot).
+    `before` is a keyset page position (timestamp, id): only alerts ordered after it
+    (older) are returned, at most `limit`. `active_only` skips the archive.
+    """
+    selects = []
+    for table in (Alert,) if active_only else (Alert, AlertArchive):
+        stmt = select(*[getattr(table, name) for name in ALERT_COLUMNS])
+        if firefighter_id is not ANY_FIREFIGHTER:
+            stmt = stmt.where(table.firefighter_id == firefighter_id)
+        if alert_type:
+            stmt = stmt.where(table.alert_type == alert_type)
+        if severity:
+            stmt = stmt.where(table.severity == severity)
+        if acknowledged is not None:
+            stmt = stmt.where(table.acknowledged == acknowledged)
+        if after_id is not None:
+            stmt = stmt.where(table.id > after_id)  # Archived alerts keep their ids
+        if max_id is not None:
+            stmt = stmt.where(table.id <= max_id)
+        if since is not None:
+            stmt = stmt.where(table.timestamp > since)
+        if until is not None:
+            stmt = stmt.where(table.timestamp <= until)
+        if before is not None:
+            before_timestamp, before_id = before
+            # The plain range on timestamp lets SQLite seek in the (..., timestamp) index
+            stmt = stmt.where(
+                table.timestamp <= before_timestamp,
+                or_(table.timestamp < before_timestamp, table.id < before_id)
+            )
+        if limit is not None:
+            # Each table contributes at most one page, read in index order
+            stmt = select(stmt.order_by(desc(table.timestamp), desc(table.id)).limit(limit).subquery())
+        selects.append(stmt)
+
+    history = union_all(*selects).subquery() if len(selects) > 1 else selects[0].subquery()
+    stmt = select(history).order_by(desc(history.c.timestamp), desc(history.c.id))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).all()
@@ -0,0 +1,138 @@
+"""
+Alert storm correlation.
+
+Alerts of correlated types (configured in the `correlation` section of the
+rule file, e.g. beacon_offline) are grouped by type and floor into a single
+aggregate alert carrying a member count and the affected ids. While members
+keep arriving within the correlation window the aggregate row is updated in
+place - and only when its membership changes - instead of inserting one
+near-identical alert per beacon and cycle. Each pass reports the full
+current member set, so members that recovered drop out of the aggregate and
+an aggregate whose set became empty is closed (marked acknowledged). An
+aggregate whose window expired is closed as well before its replacement is
+opened, so each key has at most one open aggregate.
+"""
+import json
+from datetime import datetime
+from backend.models import Alert
+
+
+class AlertGroup:
+    """Open aggregate alert for one (alert_type, floor)"""
+    __slots__ = ('alert_id', 'last_seen', 'members')
+
+    def __init__(self, alert_id, last_seen, members):
+        self.alert_id = alert_id
+        self.last_seen = last_seen
+        self.members = members
+
+
+def aggregate_message(description, floor, count):
+    return f"{description} - piętro {floor}: {count}"
+
+
+def parse_affected_ids(value):
+    """Decode the stored affected_ids JSON (None for regular alerts)"""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+class AlertCorrelator:
+    def __init__(self, rule_table, alert_types):
+        self.rule_table = rule_table  # Source of correlation windows
+        self.alert_types = alert_types  # alert_type -> {'severity', 'description'}
+        self.groups = {}  # (alert_type, floor) -> AlertGroup
+
+    def correlates(self, alert_type):
+        return self.rule_table.correlation_window(alert_type) is not None
+
+    def rebuild(self, db, now=None):
+        """Re-open unacknowledged aggregates stored in the database (e.g. at startup)"""
+        now = now or datetime.utcnow()
+        self.groups = {}
+        alerts = db.query(Alert).filter(
+            Alert.acknowledged == False,
+            Alert.floor != None,
+            Alert.affected_ids != None
+        ).order_by(Alert.timestamp).all()
+        for alert in alerts:
+            if self.correlates(alert.alert_type):
+                # Newest aggregate per key wins; the window restarts from now
+                members = set(parse_affected_ids(alert.affected_ids) or [])
+                self.groups[(alert.alert_type, alert.floor)] = AlertGroup(alert.id, now, members)
+
+    def apply(self, db, hits, create_alert, now=None):
+        """Persist grouped rule hits.
+
+        `hits` maps (alert_type, floor) to the current set of member ids; an
+        empty set closes the open aggregate of that key, keys left out keep
+        theirs. Open aggregates are updated in place; otherwise
+        `create_alert(db, None, alert_type, floor=..., members=...)` is called
+        and must return the new Alert (or None if it was suppressed). Returns
+        ids of the aggregates updated in place and the Alerts closed.
+        """
+        now = now or datetime.utcnow()
+        updated_ids = []
+        closed = []
+        for (alert_type, floor), members in hits.items():
+            key = (alert_type, floor)
+            if not members:
+                group = self.groups.pop(key, None)
+                if group is not None:
+                    self._close(db, group, closed)
+                continue
+            window = self.rule_table.correlation_window(alert_type)
+            if window is None:
+                # Type is no longer correlated - fall back to plain alerts
+                for _ in members:
+                    create_alert(db, None, alert_type)
+                continue
+
+            group = self.groups.get(key)
+            if group is not None and (now - group.last_seen).total_seconds() < window:
+                group.last_seen = now
+                if members == group.members:
+                    continue  # Nothing changed - no write
+
+                updated = db.query(Alert).filter(
+                    Alert.id == group.alert_id,
+                    Alert.acknowledged == False
+                ).update({
+                    'member_count': len(members),
+                    'affected_ids': json.dumps(sorted(members)),
+                    'message': aggregate_message(self._description(alert_type), floor, len(members)),
+                }, synchronize_session=False)
+                if updated:
+                    group.members = set(members)
+                    updated_ids.append(group.alert_id)
+                    continue
+                # Aggregate was acknowledged or archived - open a new one below
+            elif group is not None:
+                # Window expired - close the stale aggregate before opening a new one
+                self.groups.pop(key)
+                self._close(db, group, closed)
+
+            alert = create_alert(db, None, alert_type, floor=floor, members=members)
+            if alert is None:
+                self.groups.pop(key, None)
+                continue
+            db.flush()  # Assigns the id used for in-place updates
+            self.groups[key] = AlertGroup(alert.id, now, set(members))
+        return updated_ids, closed
+
+    def _close(self, db, group, closed):
+        """Mark the group's aggregate acknowledged, collecting it in `closed` if it was still open"""
+        alert = db.query(Alert).filter(
+            Alert.id == group.alert_id,
+            Alert.acknowledged == False
+        ).first()
+        if alert is not None:
+            alert.acknowledged = True
+            closed.append(alert)
+
+    def _description(self, alert_type):
+        return self.alert_types.get(alert_type, {}).get('description', alert_type)
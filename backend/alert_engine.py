@@ -0,0 +1,89 @@
+"""
+Event-driven alert rule engine.
+
+Rules are evaluated as each sample is ingested, against in-memory state kept
+per firefighter, so the cost of a sample does not depend on how much history
+is stored in the database. Vitals thresholds come from the declarative
+RuleTable and are evaluated over the whole roster snapshot in one vectorized
+pass when queued hits are drained; MAN-DOWN is checked for every firefighter
+against the current time on each pass, so a tag that went silent still
+raises it. Rule hits are persisted by the retriever
+through its usual `_create_alert` path; beacon hits are grouped per floor
+and handed to the AlertCorrelator instead.
+"""
+from datetime import datetime
+from backend.alert_rules import RuleTable, RosterSnapshot
+from backend.stationary_tracker import StationaryTracker
+from backend.scba_predictor import ScbaPredictor, LOW_AIR_MINUTES
+
+
+class AlertEngine:
+    def __init__(self, rule_table=None, stationary_tracker=None, scba_predictor=None):
+        self.rule_table = rule_table or RuleTable()
+        self.stationary_tracker = stationary_tracker or StationaryTracker()
+        self.scba_predictor = scba_predictor or ScbaPredictor()
+        self.snapshot = RosterSnapshot()  # Latest vitals of all firefighters (struct of arrays)
+        self.pending = {}  # (firefighter_id, alert_type) -> None, insertion ordered
+        self.pending_groups = {}  # (alert_type, floor) -> set of member ids, for correlation
+
+    def _emit(self, firefighter_id, alert_type):
+        self.pending[(firefighter_id, alert_type)] = None
+
+    def on_position(self, firefighter_id, latitude, longitude, timestamp=None):
+        """Update the stationary tracker with a new position sample (MAN-DOWN is checked by `sweep`)"""
+        self.stationary_tracker.update(firefighter_id, latitude, longitude, timestamp or datetime.utcnow())
+
+    def sweep(self, firefighter_ids, now=None):
+        """Check MAN-DOWN for every firefighter against the current time.
+
+        Runs on every alert pass, not per position sample: a tag that stops
+        reporting (a downed firefighter's, typically) sends no more samples
+        but still has to raise MAN-DOWN.
+        """
+        now = now or datetime.utcnow()
+        for firefighter_id in firefighter_ids:
+            if self.stationary_tracker.is_stationary(firefighter_id, now):
+                self._emit(firefighter_id, 'man_down')
+
+    def set_attributes(self, firefighter_id, team=None, role=None):
+        """Record team and role used for per-team/per-role threshold overrides"""
+        self.snapshot.set_attributes(firefighter_id, team=team, role=role)
+
+    def on_vitals(self, firefighter_id, vitals, timestamp=None):
+        """Store a new vitals sample for rule evaluation.
+
+        `vitals` is a dict with heart_rate, temperature, oxygen_level, co_level,
+        battery_level and scba_pressure keys (missing values may be None).
+        """
+        timestamp = timestamp or datetime.utcnow()
+        self.snapshot.set_vitals(firefighter_id, vitals)
+        self.scba_predictor.update(firefighter_id, vitals.get('scba_pressure'), timestamp)
+
+    def evaluate(self):
+        """Evaluate threshold rules for every firefighter with new vitals and SCBA predictions"""
+        rows = self.snapshot.take_dirty()
+        for firefighter_id, alert_type in self.rule_table.evaluate(self.snapshot, rows):
+            self._emit(firefighter_id, alert_type)
+        # Predicted air remaining, for the whole roster at once
+        for firefighter_id in self.scba_predictor.low_air(LOW_AIR_MINUTES):
+            self._emit(firefighter_id, 'scba_time_low')
+
+    def on_beacon(self, beacon_id, floor, is_online):
+        """Evaluate beacon rules for a beacon status update"""
+        # Every reported floor gets an entry, so an empty set closes its aggregate
+        offline = self.pending_groups.setdefault(('beacon_offline', floor), set())
+        if not is_online:
+            offline.add(beacon_id)
+
+    def drain(self):
+        """Return and clear the queued (firefighter_id, alert_type) rule hits"""
+        self.evaluate()
+        pending = list(self.pending)
+        self.pending.clear()
+        return pending
+
+    def drain_groups(self):
+        """Return and clear the queued {(alert_type, floor): member_ids} hits (current sets per floor)"""
+        pending_groups = self.pending_groups
+        self.pending_groups = {}
+        return pending_groups
@@ -0,0 +1,96 @@
+"""
+In-memory index of unacknowledged alerts used for deduplication.
+
+Holds the timestamps of unacknowledged alerts per (firefighter, alert_type)
+and per alert_type, the newest one of each, and a live count of unacknowledged
+alerts, so deciding whether to create an alert needs no database queries.
+The index is rebuilt from the database at startup and updated on every
+create, acknowledgement and cleanup.
+"""
+import threading
+from datetime import datetime
+from backend.models import Alert
+
+
+class AlertIndex:
+    def __init__(self, rule_table):
+        self.rule_table = rule_table  # Source of per-type cooldowns
+        self.fired = {}  # (firefighter_id, alert_type) -> timestamps of unacknowledged alerts
+        self.fired_by_type = {}  # alert_type -> timestamps of unacknowledged alerts
+        self.last_fired = {}  # (firefighter_id, alert_type) -> timestamp of newest unacknowledged alert
+        self.last_fired_by_type = {}  # alert_type -> timestamp of newest unacknowledged alert
+        self.unacknowledged = 0
+        self.acknowledged_since_archive = True  # Acknowledged alerts are waiting to be archived
+        self.lock = threading.Lock()  # Acknowledgements arrive from API threads
+
+    def rebuild(self, db):
+        """Reload the index from unacknowledged alerts stored in the database"""
+        rows = db.query(
+            Alert.firefighter_id, Alert.alert_type, Alert.timestamp
+        ).filter(
+            Alert.acknowledged == False
+        ).all()
+
+        with self.lock:
+            self.fired = {}
+            self.fired_by_type = {}
+            self.last_fired = {}
+            self.last_fired_by_type = {}
+            self.unacknowledged = 0
+            for firefighter_id, alert_type, timestamp in rows:
+                self._add(firefighter_id, alert_type, timestamp)
+
+    def fired_within(self, firefighter_id, alert_type, seconds, now=None):
+        """True if an unacknowledged alert of this type fired for the firefighter in the last `seconds`"""
+        last = self.last_fired.get((firefighter_id, alert_type))
+        return last is not None and ((now or datetime.utcnow()) - last).total_seconds() < seconds
+
+    def allows(self, firefighter_id, alert_type, now=None):
+        """Check per-firefighter and global same-type cooldowns for a candidate alert"""
+        now = now or datetime.utcnow()
+        firefighter_cooldown, type_cooldown = self.rule_table.cooldowns_for(alert_type)
+
+        if self.fired_within(firefighter_id, alert_type, firefighter_cooldown, now):
+            return False  # Don't create duplicate alert for same firefighter
+
+        last = self.last_fired_by_type.get(alert_type)
+        if last is not None and (now - last).total_seconds() < type_cooldown:
+            return False  # Don't create same alert type too frequently (diversity)
+
+        return True
+
+    def record(self, alert):
+        """Register a newly created, unacknowledged alert"""
+        with self.lock:
+            self._add(alert.firefighter_id, alert.alert_type, alert.timestamp)
+
+    def acknowledge(self, alert):
+        """Update the index after an alert was acknowledged"""
+        with self.lock:
+            # Other unacknowledged alerts of the same key or type keep their cooldowns running
+            self._discard(self.fired, self.last_fired, (alert.firefighter_id, alert.alert_type), alert.timestamp)
+            self._discard(self.fired_by_type, self.last_fired_by_type, alert.alert_type, alert.timestamp)
+            self.unacknowledged = max(0, self.unacknowledged - 1)
+            self.acknowledged_since_archive = True
+
+    def _add(self, firefighter_id, alert_type, timestamp):
+        """Add an unacknowledged alert (caller holds the lock)"""
+        for timestamps, last, key in ((self.fired, self.last_fired, (firefighter_id, alert_type)),
+                                      (self.fired_by_type, self.last_fired_by_type, alert_type)):
+            timestamps.setdefault(key, []).append(timestamp)
+            if timestamp > last.get(key, datetime.min):
+                last[key] = timestamp
+        self.unacknowledged += 1
+
+    @staticmethod
+    def _discard(timestamps, last, key, timestamp):
+        """Remove one alert timestamp under `key` and recompute the newest one"""
+        remaining = timestamps.get(key)
+        if not remaining or timestamp not in remaining:
+            return
+        remaining.remove(timestamp)
+        if remaining:
+            last[key] = max(remaining)
+        else:
+            del timestamps[key]
+            last.pop(key, None)
@@ -0,0 +1,297 @@
+"""
+Declarative threshold rules for vitals alerts.
+
+Rules are loaded from a JSON (or YAML) file and evaluated with NumPy over a
+struct-of-arrays snapshot of every firefighter's latest vitals, so a whole
+roster is checked in one vectorized pass. Thresholds can be overridden per
+team or per role; the file is re-read at runtime when it changes. The same
+file holds per-alert-type deduplication cooldowns and the alert types that
+are correlated (grouped per floor) into aggregate alerts, and the MAN-DOWN
+(stationary) thresholds.
+"""
+import os
+import json
+import numpy as np
+from backend.stationary_tracker import MOTION_THRESHOLD_M, MAN_DOWN_SECONDS
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alert_rules.json')
+
+# Vitals fields available to rules (columns of RosterSnapshot)
+VITALS_FIELDS = ('heart_rate', 'temperature', 'oxygen_level', 'co_level', 'battery_level', 'scba_pressure')
+
+OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+# Seconds before the same alert may fire again for one firefighter ('firefighter')
+# and before the same alert type may fire again for anyone ('global')
+DEFAULT_COOLDOWNS = {'firefighter': 180, 'global': 30}
+
+# Alert types grouped per floor into one aggregate alert, with the window (seconds)
+# after the last member during which new members join the same aggregate
+DEFAULT_CORRELATION = {'beacon_offline': {'window': 300}}
+
+# Movement below `motion_threshold_m` meters counts as no movement; MAN-DOWN after `man_down_seconds`
+DEFAULT_STATIONARY = {'motion_threshold_m': MOTION_THRESHOLD_M, 'man_down_seconds': MAN_DOWN_SECONDS}
+
+
+class RosterSnapshot:
+    """Latest vitals of all firefighters stored as one array per field.
+
+    Each firefighter owns a row (slot); writing a sample is O(1). Missing
+    values are stored as NaN, which never satisfies a threshold comparison.
+    """
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.slots = {}  # firefighter_id -> row
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.columns = {field: np.full(capacity, np.nan) for field in VITALS_FIELDS}
+        self.teams = np.empty(capacity, dtype=object)
+        self.roles = np.empty(capacity, dtype=object)
+        self.dirty = np.zeros(capacity, dtype=bool)
+        self.attributes_version = 0  # Bumped when team/role assignments change
+        self.compiled = {}  # id(RuleTable) -> (key, thresholds) cache kept by RuleTable
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        self.ids = np.resize(self.ids, capacity)
+        for field, column in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:len(column)] = column
+            self.columns[field] = grown
+        for name in ('teams', 'roles'):
+            grown = np.empty(capacity, dtype=object)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+        dirty = np.zeros(capacity, dtype=bool)
+        dirty[:self.size] = self.dirty[:self.size]
+        self.dirty = dirty
+
+    def slot(self, firefighter_id):
+        """Return the row of a firefighter, allocating one if needed"""
+        row = self.slots.get(firefighter_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.slots[firefighter_id] = row
+            self.ids[row] = firefighter_id
+            self.attributes_version += 1
+        return row
+
+    def set_attributes(self, firefighter_id, team=None, role=None):
+        """Set team and role used for threshold overrides"""
+        row = self.slot(firefighter_id)
+        team = team or None
+        role = role or None
+        if self.teams[row] != team or self.roles[row] != role:
+            self.teams[row] = team
+            self.roles[row] = role
+            self.attributes_version += 1
+
+    def set_vitals(self, firefighter_id, vitals):
+        """Store the latest vitals of a firefighter and mark the row for evaluation"""
+        row = self.slot(firefighter_id)
+        for field in VITALS_FIELDS:
+            value = vitals.get(field)
+            try:
+                self.columns[field][row] = np.nan if value is None else float(value)
+            except (ValueError, TypeError):
+                self.columns[field][row] = np.nan
+        self.dirty[row] = True
+
+    def take_dirty(self):
+        """Return rows updated since the last call and clear their flags"""
+        rows = np.flatnonzero(self.dirty[:self.size])
+        self.dirty[rows] = False
+        return rows
+
+
+class AlertRule:
+    """Single threshold rule: `field <op> value` raises `alert_type`"""
+    __slots__ = ('alert_type', 'field', 'op', 'value', 'unless')
+
+    def __init__(self, alert_type, field, op, value, unless=None):
+        if field not in VITALS_FIELDS:
+            raise ValueError(f"Unknown field '{field}' in rule '{alert_type}'")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}' in rule '{alert_type}'")
+        self.alert_type = alert_type
+        self.field = field
+        self.op = op
+        self.value = float(value)
+        self.unless = unless  # Suppressed when this other alert type fires for the same row
+
+    def to_dict(self):
+        data = {'alert_type': self.alert_type, 'field': self.field, 'op': self.op, 'value': self.value}
+        if self.unless:
+            data['unless'] = self.unless
+        return data
+
+
+class RuleTable:
+    def __init__(self, path=DEFAULT_RULES_PATH):
+        self.path = path
+        self.rules = []
+        self.overrides = {'team': {}, 'role': {}}
+        self.cooldowns = {'default': dict(DEFAULT_COOLDOWNS), 'types': {}}
+        self.correlation = dict(DEFAULT_CORRELATION)
+        self.stationary = dict(DEFAULT_STATIONARY)
+        self.version = 0
+        self._mtime = None
+        self.load()
+
+    def load(self):
+        """Load rules from the file, replacing the current table"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if self.path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ValueError('PyYAML not installed - cannot load YAML rule file')
+                data = yaml.safe_load(f) or {}
+            else:
+                data = json.load(f)
+
+        rules = [AlertRule(**rule) for rule in data.get('rules', [])]
+        known_types = {rule.alert_type for rule in rules}
+        for rule in rules:
+            if rule.unless and rule.unless not in known_types:
+                raise ValueError(f"Rule '{rule.alert_type}' references unknown rule '{rule.unless}'")
+
+        overrides = data.get('overrides') or {}
+        unknown = set(overrides) - {'team', 'role'}
+        if unknown:
+            raise ValueError(f"Unknown override kinds {sorted(unknown)}")
+        for kind, groups in overrides.items():
+            for name, values in (groups or {}).items():
+                if not isinstance(values, dict):
+                    raise ValueError(f"Overrides for {kind} '{name}' must map alert types to thresholds")
+                for alert_type, value in values.items():
+                    if alert_type not in known_types:
+                        raise ValueError(f"Override for {kind} '{name}' references unknown rule '{alert_type}'")
+                    if not isinstance(value, (int, float)):
+                        raise ValueError(f"Override of '{alert_type}' for {kind} '{name}' must be a number")
+        cooldowns = data.get('cooldowns') or {}
+        default_cooldowns = dict(DEFAULT_COOLDOWNS, **(cooldowns.get('default') or {}))
+        type_cooldowns = cooldowns.get('types') or {}
+        for alert_type, values in type_cooldowns.items():
+            unknown = set(values) - set(DEFAULT_COOLDOWNS)
+            if unknown:
+                raise ValueError(f"Unknown cooldown keys {sorted(unknown)} for '{alert_type}'")
+
+        correlation = data.get('correlation')
+        if correlation is None:
+            correlation = DEFAULT_CORRELATION
+        for alert_type, values in correlation.items():
+            window = (values or {}).get('window')
+            if not isinstance(window, (int, float)) or window <= 0:
+                raise ValueError(f"Correlation window for '{alert_type}' must be a positive number of seconds")
+
+        stationary = dict(DEFAULT_STATIONARY, **(data.get('stationary') or {}))
+        unknown = set(stationary) - set(DEFAULT_STATIONARY)
+        if unknown:
+            raise ValueError(f"Unknown stationary keys {sorted(unknown)}")
+        for key, value in stationary.items():
+            if not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(f"Stationary '{key}' must be a positive number")
+
+        self.rules = rules
+        self.overrides = {
+            'team': overrides.get('team') or {},
+            'role': overrides.get('role') or {},
+        }
+        self.cooldowns = {'default': default_cooldowns, 'types': type_cooldowns}
+        self.correlation = correlation
+        self.stationary = stationary
+        self._mtime = os.path.getmtime(self.path)
+        self.version += 1
+
+    def reload_if_changed(self):
+        """Reload the rule file if it was modified; keep the current table on errors"""
+        try:
+            if os.path.getmtime(self.path) == self._mtime:
+                return False
+            self.load()
+            print(f"Reloaded alert rules from {self.path} ({len(self.rules)} rules)")
+            return True
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error reloading alert rules, keeping previous table: {e}")
+            return False
+
+    def cooldowns_for(self, alert_type):
+        """Return (firefighter_cooldown, global_cooldown) in seconds for an alert type"""
+        values = self.cooldowns['types'].get(alert_type) or {}
+        default = self.cooldowns['default']
+        return (
+            values.get('firefighter', default['firefighter']),
+            values.get('global', default['global']),
+        )
+
+    def correlation_window(self, alert_type):
+        """Return the correlation window in seconds, or None if the type is not correlated"""
+        values = self.correlation.get(alert_type)
+        return values['window'] if values else None
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'rules': [rule.to_dict() for rule in self.rules],
+            'overrides': self.overrides,
+            'cooldowns': self.cooldowns,
+            'correlation': self.correlation,
+            'stationary': self.stationary,
+        }
+
+    def _thresholds(self, snapshot):
+        """Per-row threshold array for every rule, cached until rules or attributes change"""
+        key = (self.version, snapshot.attributes_version, len(snapshot.ids))
+        cached = snapshot.compiled.get(id(self))
+        if cached and cached[0] == key:
+            return cached[1]
+
+        thresholds = {}
+        for rule in self.rules:
+            values = np.full(len(snapshot.ids), rule.value)
+            # Role overrides are more specific than team overrides and are applied last
+            for kind, attribute in (('team', snapshot.teams), ('role', snapshot.roles)):
+                for name, rule_overrides in self.overrides[kind].items():
+                    if rule.alert_type in rule_overrides:
+                        values[attribute == name] = float(rule_overrides[rule.alert_type])
+            thresholds[rule.alert_type] = values
+
+        snapshot.compiled[id(self)] = (key, thresholds)
+        return thresholds
+
+    def evaluate(self, snapshot, rows=None):
+        """Evaluate all rules over the snapshot in one vectorized pass.
+
+        Returns a list of (firefighter_id, alert_type). If `rows` is given,
+        only those rows are evaluated.
+        """
+        if rows is None:
+            rows = np.arange(snapshot.size)
+        if len(rows) == 0:
+            return []
+
+        thresholds = self._thresholds(snapshot)
+        masks = {}
+        for rule in self.rules:
+            values = snapshot.columns[rule.field][rows]
+            masks[rule.alert_type] = OPERATORS[rule.op](values, thresholds[rule.alert_type][rows])
+
+        hits = []
+        ids = snapshot.ids[rows]
+        for rule in self.rules:
+            mask = masks[rule.alert_type]
+            if rule.unless:
+                mask = mask & ~masks[rule.unless]
+            for firefighter_id in ids[mask]:
+                hits.append((int(firefighter_id), rule.alert_type))
+        return hits
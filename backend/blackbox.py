@@ -0,0 +1,209 @@
+"""
+Streaming black-box export.
+
+`BlackboxExport` reads the incident history one firefighter and one chunk
+of rows at a time and yields serialized bytes - as one JSON document
+(`stream_json`, same layout as the former in-memory export) or as NDJSON
+(`stream_ndjson`, one record per line) - so memory use stays flat however
+long the incident was.
+
+Chunks are read with keyset queries on (timestamp, id) using the
+(firefighter_id, timestamp) indexes. Each query is fully consumed before its
+chunk is yielded, so a slow download never holds a SQLite read lock that
+would block the data retriever's writes. Rows committed after the export
+started are left out (ids are capped at the maxima read at the start).
+"""
+from datetime import datetime
+from sqlalchemy import desc, func, or_, select
+from backend.alert_archive import query_alert_history
+from backend.alert_correlator import parse_affected_ids
+from backend.models import Firefighter, Position, Vitals, Alert, AlertArchive, Beacon
+from backend.serialization import dumps
+
+EXPORT_VERSION = '1.0'
+EXPORT_MIMETYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson', 'npz': 'application/octet-stream'}
+CHUNK_ROWS = 2000  # Rows per query and per yielded piece of output
+
+POSITION_COLUMNS = ('id', 'latitude', 'longitude', 'floor', 'timestamp')
+VITALS_COLUMNS = (
+    'id', 'heart_rate', 'temperature', 'oxygen_level', 'co_level', 'battery_level', 'scba_pressure', 'timestamp'
+)
+NDJSON_TYPES = {'positions': 'position', 'vitals': 'vitals', 'alerts': 'alert'}  # Record type per history section
+BEACON_COLUMNS = (
+    'id', 'beacon_id', 'name', 'latitude', 'longitude', 'floor', 'battery_percent', 'signal_quality',
+    'tags_in_range', 'last_seen', 'is_online'
+)
+
+
+def history_rows(db, model, columns, firefighter_id, max_id, since=None, until=None, chunk_rows=CHUNK_ROWS):
+    """Rows of a per-firefighter history table with since < timestamp <= until, newest first,
+    in lists of at most `chunk_rows` result rows"""
+    stmt = select(*[getattr(model, column) for column in columns]).where(
+        model.firefighter_id == firefighter_id, model.id <= max_id
+    )
+    if since is not None:
+        stmt = stmt.where(model.timestamp > since)
+    if until is not None:
+        stmt = stmt.where(model.timestamp <= until)
+    before = None
+    while True:
+        page = stmt
+        if before is not None:
+            before_timestamp, before_id = before
+            page = page.where(
+                model.timestamp <= before_timestamp,
+                or_(model.timestamp < before_timestamp, model.id < before_id)
+            )
+        rows = db.execute(page.order_by(desc(model.timestamp), desc(model.id)).limit(chunk_rows)).all()
+        if rows:
+            yield rows
+        if len(rows) < chunk_rows:
+            return
+        before = (rows[-1].timestamp, rows[-1].id)
+
+
+def alert_to_export_dict(alert):
+    return {
+        'id': alert.id,
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'message': alert.message,
+        'floor': alert.floor,
+        'member_count': alert.member_count or 1,
+        'affected_ids': parse_affected_ids(alert.affected_ids),
+        'timestamp': alert.timestamp,
+        'acknowledged': alert.acknowledged
+    }
+
+
+def alert_rows(db, firefighter_id, max_id, since=None, until=None, chunk_rows=CHUNK_ROWS):
+    """Alerts of a firefighter (None: system alerts) up to `max_id` from both tables, newest first, in chunks"""
+    before = None
+    while True:
+        rows = query_alert_history(db, firefighter_id=firefighter_id, since=since, until=until,
+                                   before=before, limit=chunk_rows, max_id=max_id)
+        if rows:
+            yield rows
+        if len(rows) < chunk_rows:
+            return
+        before = (rows[-1].timestamp, rows[-1].id)
+
+
+def _json_items(chunks):
+    """Comma-separated JSON array items of all chunks (without brackets); returns the item count"""
+    count = 0
+    for chunk in chunks:
+        items = dumps(chunk)[1:-1]
+        yield b',' + items if count else items
+        count += len(chunk)
+    return count
+
+
+class BlackboxExport:
+    """One export run; the small tables are read when it is created, the history while streaming.
+
+    `firefighter_ids` limits the export to those firefighters (system alerts
+    and beacons are always included), `since` / `until` the history and
+    alerts to since < timestamp <= until.
+    """
+
+    def __init__(self, db, firefighter_ids=None, since=None, until=None, chunk_rows=CHUNK_ROWS):
+        self.db = db
+        self.firefighter_ids = firefighter_ids
+        self.since = since
+        self.until = until
+        self.chunk_rows = chunk_rows
+        self.export_timestamp = datetime.utcnow().isoformat()
+        self.max_position_id = db.query(func.max(Position.id)).scalar() or 0
+        self.max_vitals_id = db.query(func.max(Vitals.id)).scalar() or 0
+        # Archived alerts keep their ids
+        self.max_alert_id = max(db.query(func.max(Alert.id)).scalar() or 0,
+                                db.query(func.max(AlertArchive.id)).scalar() or 0)
+        firefighters = db.query(Firefighter).order_by(Firefighter.id)
+        if firefighter_ids is not None:
+            firefighters = firefighters.filter(Firefighter.id.in_(firefighter_ids))
+        self.firefighters = [{
+            'id': ff.id,
+            'name': ff.name,
+            'badge_number': ff.badge_number,
+            'team': ff.team,
+            'on_mission': ff.on_mission,
+            'created_at': ff.created_at
+        } for ff in firefighters]
+        beacon_columns = [getattr(Beacon, column) for column in BEACON_COLUMNS]
+        self.beacons = [dict(zip(BEACON_COLUMNS, row)) for row in db.execute(select(*beacon_columns)).all()]
+        self.statistics = {
+            'total_firefighters': len(self.firefighters),
+            'total_beacons': len(self.beacons),
+            'total_positions': 0,
+            'total_vitals': 0,
+            'total_alerts': 0
+        }
+
+    @property
+    def filename(self):
+        return f'blackbox_export_{self.export_timestamp.replace(":", "-").split(".")[0]}'
+
+    @property
+    def filters(self):
+        return {'firefighter_ids': self.firefighter_ids, 'since': self.since, 'until': self.until}
+
+    def position_rows(self, firefighter_id, columns=POSITION_COLUMNS):
+        return history_rows(self.db, Position, columns, firefighter_id, self.max_position_id,
+                            self.since, self.until, self.chunk_rows)
+
+    def vitals_rows(self, firefighter_id, columns=VITALS_COLUMNS):
+        return history_rows(self.db, Vitals, columns, firefighter_id, self.max_vitals_id,
+                            self.since, self.until, self.chunk_rows)
+
+    def alert_rows(self, firefighter_id):
+        return alert_rows(self.db, firefighter_id, self.max_alert_id, self.since, self.until, self.chunk_rows)
+
+    def _sections(self, firefighter_id):
+        """(name, statistics key, chunks of dicts) of one firefighter's history"""
+        return (
+            ('positions', 'total_positions',
+             ([dict(zip(POSITION_COLUMNS, row)) for row in rows] for rows in self.position_rows(firefighter_id))),
+            ('vitals', 'total_vitals',
+             ([dict(zip(VITALS_COLUMNS, row)) for row in rows] for rows in self.vitals_rows(firefighter_id))),
+            ('alerts', 'total_alerts', self.alert_chunks(firefighter_id)),
+        )
+
+    def alert_chunks(self, firefighter_id):
+        """Alerts of a firefighter (None: system alerts) in chunks of export dicts"""
+        return ([alert_to_export_dict(alert) for alert in rows] for rows in self.alert_rows(firefighter_id))
+
+    def stream_json(self):
+        """The export as one JSON document, in pieces"""
+        yield (b'{"export_timestamp":' + dumps(self.export_timestamp)
+               + b',"export_type":"blackbox","version":' + dumps(EXPORT_VERSION)
+               + b',"filters":' + dumps(self.filters) + b',"data":{"firefighters":[')
+        for i, firefighter in enumerate(self.firefighters):
+            # The firefighter object is left open for its history arrays
+            yield (b',' if i else b'') + dumps(firefighter)[:-1]
+            for name, key, chunks in self._sections(firefighter['id']):
+                yield f',"{name}":['.encode()
+                self.statistics[key] += yield from _json_items(chunks)
+                yield b']'
+            yield b'}'
+        yield b'],"beacons":' + dumps(self.beacons) + b',"system_alerts":['
+        self.statistics['total_alerts'] += yield from _json_items(self.alert_chunks(None))
+        yield b']},"statistics":' + dumps(self.statistics) + b'}'
+
+    def stream_ndjson(self):
+        """The export as NDJSON: one record per line, each with a `type`"""
+        yield dumps({'type': 'export', 'export_timestamp': self.export_timestamp, 'export_type': 'blackbox',
+                     'version': EXPORT_VERSION, 'filters': self.filters}) + b'\n'
+        for firefighter in self.firefighters:
+            yield dumps({'type': 'firefighter', **firefighter}) + b'\n'
+            for name, key, chunks in self._sections(firefighter['id']):
+                record_type = NDJSON_TYPES[name]
+                for chunk in chunks:
+                    yield b''.join(dumps({'type': record_type, 'firefighter_id': firefighter['id'], **row}) + b'\n'
+                                   for row in chunk)
+                    self.statistics[key] += len(chunk)
+        yield b''.join(dumps({'type': 'beacon', **beacon}) + b'\n' for beacon in self.beacons)
+        for chunk in self.alert_chunks(None):
+            yield b''.join(dumps({'type': 'system_alert', **alert}) + b'\n' for alert in chunk)
+            self.statistics['total_alerts'] += len(chunk)
+        yield dumps({'type': 'statistics', **self.statistics}) + b'\n'
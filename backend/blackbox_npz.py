@@ -0,0 +1,179 @@
+"""
+Columnar black-box export (`format=npz`) and its reader.
+
+The export is a NumPy .npz archive (zip, deflate-compressed). Each history
+table (positions, vitals, alerts) is stored as one typed array per column,
+sorted by firefighter and time, plus an index: the firefighter ids and the
+offset of each one's first row. A reader slices one firefighter's rows and
+narrows them to a time window with a binary search, and only the columns
+it touches are decompressed. Timestamps are datetime64[us] (UTC), missing
+integers are MISSING_INT and missing floats NaN; system alerts are indexed
+under SYSTEM_FIREFIGHTER_ID. Firefighters, beacons and the export metadata
+are stored as JSON in `meta`.
+
+    archive = BlackboxArchive('blackbox_export.npz')
+    vitals = archive.table('vitals', firefighter_id=3, since='2024-05-01T10:00:00')
+    vitals['timestamp'], vitals['heart_rate']
+"""
+import json
+import numpy as np
+from backend.blackbox import EXPORT_VERSION
+from backend.serialization import dumps
+
+MISSING_INT = -32768
+SYSTEM_FIREFIGHTER_ID = -1
+
+# Table -> ((column, dtype), ...); strings are stored as fixed-width unicode ('U')
+TABLES = {
+    'positions': (
+        ('id', 'i8'), ('timestamp', 'M8[us]'), ('latitude', 'f8'), ('longitude', 'f8'), ('floor', 'i2'),
+    ),
+    'vitals': (
+        ('id', 'i8'), ('timestamp', 'M8[us]'), ('heart_rate', 'i2'), ('temperature', 'f4'), ('oxygen_level', 'f4'),
+        ('co_level', 'f4'), ('battery_level', 'f4'), ('scba_pressure', 'f4'),
+    ),
+    'alerts': (
+        ('id', 'i8'), ('timestamp', 'M8[us]'), ('alert_type', 'U'), ('severity', 'U'), ('message', 'U'),
+        ('floor', 'i2'), ('member_count', 'i2'), ('acknowledged', '?'), ('affected_ids', 'U'),
+    ),
+}
+STATISTICS_KEYS = {'positions': 'total_positions', 'vitals': 'total_vitals', 'alerts': 'total_alerts'}
+
+
+def _to_array(values, dtype):
+    if dtype[0] == 'i':
+        return np.array([MISSING_INT if value is None else value for value in values], dtype=dtype)
+    if dtype == 'U':
+        return np.array(['' if value is None else value for value in values], dtype=str)
+    if dtype == '?':
+        return np.array([bool(value) for value in values], dtype=bool)
+    return np.array(values, dtype=dtype)  # None becomes NaN / NaT
+
+
+def _concatenate(pieces, dtype):
+    if not pieces:
+        return np.empty(0, dtype=str if dtype == 'U' else dtype)
+    return np.concatenate(pieces)
+
+
+def _table_arrays(export, table):
+    """Column arrays and index of one table, built chunk by chunk"""
+    columns = TABLES[table]
+    names = [name for name, _ in columns]
+    if table == 'alerts':
+        sources = [(SYSTEM_FIREFIGHTER_ID, export.alert_rows(None))]
+        sources += [(ff['id'], export.alert_rows(ff['id'])) for ff in export.firefighters]
+    else:
+        read = export.position_rows if table == 'positions' else export.vitals_rows
+        sources = [(ff['id'], read(ff['id'], names)) for ff in export.firefighters]
+
+    pieces = {name: [] for name in names}
+    index_ids, offsets = [], [0]
+    for firefighter_id, chunks in sources:
+        # Chunks come newest first - reverse them into time order
+        firefighter_pieces = {name: [] for name in names}
+        count = 0
+        for rows in chunks:
+            values = dict(zip(rows[0]._fields, zip(*rows)))  # Column-wise
+            for name, dtype in columns:
+                firefighter_pieces[name].append(_to_array(values[name], dtype)[::-1])
+            count += len(rows)
+        if not count:
+            continue
+        for name in names:
+            pieces[name].extend(reversed(firefighter_pieces[name]))
+        index_ids.append(firefighter_id)
+        offsets.append(offsets[-1] + count)
+
+    arrays = {f'{table}/{name}': _concatenate(pieces[name], dtype) for name, dtype in columns}
+    arrays[f'{table}/index_firefighter_ids'] = np.array(index_ids, dtype='i4')
+    arrays[f'{table}/index_offsets'] = np.array(offsets, dtype='i8')
+    return arrays, offsets[-1]
+
+
+def build_arrays(export):
+    """All arrays of the archive (tables, indexes and `meta`) for a BlackboxExport (backend/blackbox.py)"""
+    arrays = {}
+    for table in TABLES:
+        table_arrays, count = _table_arrays(export, table)
+        arrays.update(table_arrays)
+        export.statistics[STATISTICS_KEYS[table]] = count
+    meta = {
+        'export_timestamp': export.export_timestamp,
+        'export_type': 'blackbox',
+        'version': EXPORT_VERSION,
+        'filters': export.filters,
+        'firefighters': export.firefighters,
+        'beacons': export.beacons,
+        'statistics': export.statistics,
+    }
+    arrays['meta'] = np.frombuffer(dumps(meta), dtype=np.uint8)
+    return arrays
+
+
+def write_npz(export, file):
+    """Write a BlackboxExport as a columnar archive to a path or file object"""
+    np.savez_compressed(file, **build_arrays(export))
+
+
+def _datetime64(value):
+    return None if value is None else np.datetime64(value, 'us')
+
+
+class BlackboxArchive:
+    """Reader for `format=npz` black-box exports (a path, file object or the dict from build_arrays)"""
+
+    def __init__(self, file):
+        self.npz = file if isinstance(file, dict) else np.load(file)
+        self.meta = json.loads(self.npz['meta'].tobytes())
+        self.firefighters = self.meta['firefighters']
+        self.beacons = self.meta['beacons']
+        self.statistics = self.meta['statistics']
+        self._arrays = {}
+
+    def _array(self, key):
+        # Every access to an npz member decompresses it again
+        if key not in self._arrays:
+            self._arrays[key] = self.npz[key]
+        return self._arrays[key]
+
+    def table(self, name, firefighter_id=None, since=None, until=None, columns=None):
+        """Columns of a table as {column: array} plus `firefighter_id`, in firefighter and time order.
+
+        `firefighter_id` (None: all, SYSTEM_FIREFIGHTER_ID: system alerts) and
+        `since` / `until` (since < timestamp <= until; datetime, ISO string or
+        datetime64) select rows through the index; `columns` limits the columns read.
+        """
+        ids = self._array(f'{name}/index_firefighter_ids')
+        offsets = self._array(f'{name}/index_offsets')
+        if firefighter_id is None:
+            ranges = list(zip(ids.tolist(), offsets[:-1].tolist(), offsets[1:].tolist()))
+        else:
+            position = int(np.searchsorted(ids, firefighter_id))
+            found = position < len(ids) and ids[position] == firefighter_id
+            ranges = [(firefighter_id, int(offsets[position]), int(offsets[position + 1]))] if found else []
+
+        since, until = _datetime64(since), _datetime64(until)
+        if since is not None or until is not None:
+            timestamps = self._array(f'{name}/timestamp')
+            narrowed = []
+            for ff_id, start, end in ranges:
+                window = timestamps[start:end]
+                if since is not None:
+                    start += int(np.searchsorted(window, since, side='right'))
+                if until is not None:
+                    end = start + int(np.searchsorted(timestamps[start:end], until, side='right'))
+                narrowed.append((ff_id, start, end))
+            ranges = narrowed
+
+        names = columns or [column for column, _ in TABLES[name]]
+        result = {
+            column: np.concatenate([self._array(f'{name}/{column}')[start:end] for _, start, end in ranges])
+            if ranges else self._array(f'{name}/{column}')[:0]
+            for column in names
+        }
+        result['firefighter_id'] = np.repeat(
+            np.array([ff_id for ff_id, _, _ in ranges], dtype='i4'),
+            [end - start for _, start, end in ranges]
+        )
+        return result
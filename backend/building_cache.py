@@ -0,0 +1,110 @@
+"""
+Building model cache with stale-while-revalidate.
+
+The building geometry from the upstream API almost never changes, so it is
+kept in memory and on disk (database/building_cache.json). Reads return the
+cached copy immediately; once it is older than `max_age` a background thread
+refreshes it while the stale copy keeps being served. When the upstream is
+unreachable the last good copy (also after a restart, from disk) is used.
+"""
+import os
+import json
+import time
+import threading
+import requests
+
+BUILDING_URL = 'https://niesmiertelnik.replit.app/api/v1/building'
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'building_cache.json')
+MAX_AGE_SECONDS = 300  # Cached copy is fresh for 5 min, afterwards served stale while refreshing
+RETRY_SECONDS = 30  # Wait between refresh attempts after a failed one
+FETCH_TIMEOUT = 5
+
+
+class BuildingCache:
+    def __init__(self, url=BUILDING_URL, path=CACHE_PATH, max_age=MAX_AGE_SECONDS, timeout=FETCH_TIMEOUT, on_change=None):
+        self.url = url
+        self.path = path
+        self.max_age = max_age
+        self.timeout = timeout
+        self.on_change = on_change  # Called (without arguments) when the cached building changes
+        self.data = None
+        self.fetched_at = 0.0  # time.time() of the cached copy
+        self.failed_at = 0.0  # time.time() of the last failed refresh
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self._load()
+
+    def get(self):
+        """Return the building JSON from the upstream API (None if it was never fetched)"""
+        if self.data is None and not self.failed_at:
+            # Cold start without a disk copy - the first caller waits for the upstream
+            self.refresh()
+        elif self._is_stale():
+            self._refresh_in_background()
+        return self.data
+
+    def refresh(self):
+        """Fetch the building from the upstream; keeps the last good copy on failure"""
+        try:
+            response = requests.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            if not isinstance(data, dict):
+                raise ValueError(f"unexpected building response type {type(data).__name__}")
+        except Exception as e:
+            print(f"Error refreshing building cache: {e}")
+            self.failed_at = time.time()
+            return False
+
+        with self.lock:
+            changed = data != self.data
+            self.data = data
+            self.fetched_at = time.time()
+            self.failed_at = 0.0
+        if changed:
+            self._save(data)
+            if self.on_change:
+                self.on_change()
+        return True
+
+    def _is_stale(self):
+        now = time.time()
+        return now - self.fetched_at > self.max_age and now - self.failed_at > RETRY_SECONDS
+
+    def _refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self.refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _load(self):
+        """Load the last good copy from disk (its age is the file's modification time)"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.data = data
+                self.fetched_at = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Could not load building cache from {self.path}: {e}")
+
+    def _save(self, data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save building cache to {self.path}: {e}")
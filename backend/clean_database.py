@@ -8,7 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.database import SessionLocal, engine
-from backend.models import Base, Firefighter, Position, Vitals, Alert, Beacon
+from backend.models import Base, Firefighter, Position, Vitals, Alert, AlertArchive, Beacon
 from sqlalchemy import text
 
 def clean_database():
@@ -19,6 +19,7 @@ def clean_database():
         
         # Delete all data
         db.query(Alert).delete()
+        db.query(AlertArchive).delete()
         db.query(Vitals).delete()
         db.query(Position).delete()
         db.query(Beacon).delete()
@@ -0,0 +1,168 @@
+"""
+Response compression (gzip / brotli) for the Flask apps.
+
+`init_compression` registers an after_request hook compressing responses of
+text-like types above a size threshold with the best encoding the client
+accepts (brotli if the brotli package is installed, otherwise gzip).
+Streamed responses are compressed chunk by chunk, flushing after each chunk
+so the client still receives data as it is produced. Server-sent events are
+never compressed (proxies and browsers buffer them).
+
+`serve_precompressed_static` replaces the static file view: files are
+compressed once (again when they change) and kept in memory, URLs built with
+`url_for('static', ...)` carry a content hash, so the files can be cached by
+the browser for a year.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import zlib
+from flask import request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Optional - gzip is used instead
+
+MIN_SIZE = 1024  # Smaller responses don't gain enough to pay for the headers and CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # On-the-fly; static files use the maximum quality
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/x-ndjson', 'application/xml',
+    'application/msgpack', 'image/svg+xml',
+}
+
+
+def _compressible(mimetype):
+    if not mimetype or mimetype == 'text/event-stream':
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def choose_encoding():
+    """Best content coding accepted by the current request, or None"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def compress(data, encoding, quality=None):
+    """Compress bytes with `encoding` ('br' or 'gzip')"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY if quality is None else quality)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL if quality is None else quality, mtime=0)
+
+
+def _compress_stream(chunks, encoding):
+    """Compress an iterable of chunks, flushing after every chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk.encode('utf-8') if isinstance(chunk, str) else chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31: gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def compress_response(response, min_size=MIN_SIZE):
+    """Compress `response` in place if the client and the content allow it"""
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.direct_passthrough or not _compressible(response.mimetype)):
+        return response
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    # The compressed body differs byte for byte - a strong ETag must not be shared with the identity one
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app, min_size=MIN_SIZE):
+    """Compress the responses of `app` larger than `min_size` bytes"""
+    app.after_request(lambda response: compress_response(response, min_size))
+
+
+class StaticAsset:
+    """A static file with its precompressed variants"""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.version = hashlib.sha1(self.data).hexdigest()[:12]
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.variants = {None: self.data}
+        if _compressible(self.mimetype) and len(self.data) >= MIN_SIZE:
+            self.variants['gzip'] = compress(self.data, 'gzip', quality=9)
+            if brotli is not None:
+                self.variants['br'] = compress(self.data, 'br', quality=11)
+
+
+def serve_precompressed_static(app):
+    """Serve `app.static_folder` from memory, precompressed, with long-lived cache headers"""
+    assets = {}
+
+    def load(filename):
+        path = safe_join(app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        asset = assets.get(filename)
+        if asset is None or asset.mtime != os.path.getmtime(path):
+            asset = assets[filename] = StaticAsset(path)
+        return asset
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        # The URL changes with the content, so cached copies never go stale
+        if endpoint == 'static' and 'v' not in values:
+            asset = load(values['filename'])
+            if asset is not None:
+                values['v'] = asset.version
+
+    def static(filename):
+        asset = load(filename)
+        if asset is None:
+            return app.response_class(status=404)
+
+        encoding = None
+        if len(asset.variants) > 1:
+            offered = [name for name in ('br', 'gzip') if name in asset.variants]
+            encoding = request.accept_encodings.best_match(offered)
+        response = app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(asset.version, weak=True)
+        if request.args.get('v') == asset.version:
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'  # Unversioned URL - revalidate
+        return response.make_conditional(request)
+
+    app.view_functions['static'] = static
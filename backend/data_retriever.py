@@ -6,24 +6,47 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import requests
 import time
+import json
+import hashlib
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from backend.database import SessionLocal, init_db
 from backend.models import Firefighter, Position, Vitals, Alert, Beacon
+from backend.alert_engine import AlertEngine
+from backend.alert_rules import RuleTable
+from backend.stationary_tracker import StationaryTracker
+from backend.scba_predictor import ScbaPredictor
+from backend.alert_index import AlertIndex
+from backend.alert_correlator import AlertCorrelator, aggregate_message
+from backend.event_bus import EventBus
+from backend.serializers import alert_to_dict, firefighter_to_dict, position_to_dict, vitals_to_dict
+from backend.roster_stream import RosterStream
+from backend.data_version import data_versions
+from backend.alert_archive import archive_alerts, archived_remote_ids, ACTIVE_ALERTS_LIMIT, ARCHIVE_BATCH_SIZE, ARCHIVE_MAX_BATCHES
 
 # API Configuration
 SIMULATOR_API_BASE = 'https://niesmiertelnik.replit.app/api/v1'
+SIMULATOR_ALERT_SOURCE = 'simulator'  # Alert.source of alerts ingested from the simulator API
+
+# Max rows per INSERT statement when ingesting upstream alerts
+ALERT_INSERT_BATCH = 500
+
+# Upstream alerts with neither id nor timestamp are skipped while an unacknowledged
+# alert of the same firefighter and type is this recent (the pre-index dedup window)
+UNKEYED_ALERT_DEDUP_SECONDS = 30
 
 # Alert types mapping
 ALERT_TYPES = {
-    'man_down': {'severity': 'critical', 'description': 'Bezruch >30s'},
+    'man_down': {'severity': 'critical', 'description': 'Bezruch >60s'},
     'sos_pressed': {'severity': 'critical', 'description': 'Przycisk SOS'},
     'high_heart_rate': {'severity': 'warning', 'description': 'Tętno >180 bpm'},
     'low_battery': {'severity': 'warning', 'description': 'Bateria <20%'},
     'scba_low_pressure': {'severity': 'warning', 'description': 'Niskie ciśnienie SCBA'},
     'scba_critical': {'severity': 'critical', 'description': 'Krytyczne ciśnienie SCBA'},
+    'scba_time_low': {'severity': 'warning', 'description': 'Powietrze SCBA <5 min do rezerwy'},
     'beacon_offline': {'severity': 'warning', 'description': 'Beacon nie odpowiada'},
     'tag_offline': {'severity': 'critical', 'description': 'Tag strażaka offline'},
     'high_co': {'severity': 'critical', 'description': 'Wysokie CO'},
@@ -39,6 +62,16 @@ class DataRetriever:
         self.thread = None
         self.firefighter_map = {}  # Map simulator tag_id -> local firefighter_id
         self.beacon_map = {}  # Map simulator beacon_id -> local beacon_id
+        rule_table = RuleTable()  # Thresholds, cooldowns, correlation and MAN-DOWN settings (alert_rules.json)
+        self.stationary_tracker = StationaryTracker(**rule_table.stationary)  # Shared with the API for movement status
+        self.scba_predictor = ScbaPredictor()  # Air remaining estimates, shared with the API
+        self.alert_engine = AlertEngine(rule_table, self.stationary_tracker, self.scba_predictor)  # Evaluates alert rules as samples are ingested
+        self.alert_index = AlertIndex(self.alert_engine.rule_table)  # Dedup/cooldown state of unacknowledged alerts
+        self.alert_correlator = AlertCorrelator(self.alert_engine.rule_table, ALERT_TYPES)  # Open aggregate alerts per floor
+        self.alert_events = EventBus()  # Alert created/updated/acknowledged events for SSE clients
+        self.new_alerts = []  # Alerts created in the current cycle, published after commit
+        self.roster = RosterStream()  # Latest state per firefighter, streamed to clients as deltas
+        self.unkeyed_alerts = 0  # Upstream alerts seen with neither id nor timestamp (see /api/metrics)
     
     def _convert_signal_quality(self, value):
         """Convert signal_quality from string to float"""
@@ -95,19 +128,30 @@ class DataRetriever:
         # Initialize database
         init_db()
         
+        # Load cooldown state of unacknowledged alerts
+        self._rebuild_alert_index()
+        
         # Create initial mappings
         self._sync_initial_data()
         
+        # Restore movement state from stored positions
+        self._seed_stationary_tracker()
+        
+        # Initial state of the live roster stream
+        self._seed_roster()
+        
         self.running = True
         self.thread = threading.Thread(target=self._retrieve_loop, daemon=True)
         self.thread.start()
         print("Data retriever started")
         
     def stop(self):
-        """Stop the data retriever"""
+        """Stop the data retriever and end the SSE streams"""
         self.running = False
         if self.thread:
             self.thread.join(timeout=2)
+        self.alert_events.close()
+        self.roster.events.close()
         print("Data retriever stopped")
         
     def _sync_initial_data(self):
@@ -322,10 +366,70 @@ class DataRetriever:
         except Exception as e:
             print(f"Error syncing initial data: {e}")
             
+    def _rebuild_alert_index(self):
+        """Rebuild the in-memory alert dedup index and open aggregates from the database"""
+        db = SessionLocal()
+        try:
+            self.alert_index.rebuild(db)
+            self.alert_correlator.rebuild(db)
+        except Exception as e:
+            print(f"Error rebuilding alert index: {e}")
+        finally:
+            db.close()
+    
+    def set_on_mission(self, firefighter_id, on_mission):
+        """Stream a mission status change made through the API (after commit)"""
+        self.roster.update(firefighter_id, {'on_mission': bool(on_mission)})
+        self.roster.publish()
+        data_versions.bump('firefighters')
+    
+    def acknowledge_alert(self, alert):
+        """Keep the alert index consistent after an alert was acknowledged (and committed)"""
+        self.alert_index.acknowledge(alert)
+        self.alert_events.publish('alert-acknowledged', {'id': alert.id})
+        data_versions.bump('alerts')
+            
+    def _seed_stationary_tracker(self):
+        """Initialize the stationary tracker from recent positions (once, at startup)"""
+        db = SessionLocal()
+        try:
+            for firefighter in db.query(Firefighter).all():
+                positions = db.query(Position).filter(
+                    Position.firefighter_id == firefighter.id
+                ).order_by(desc(Position.timestamp)).limit(100).all()
+                self.stationary_tracker.seed(firefighter.id, positions)
+        except Exception as e:
+            print(f"Error seeding stationary tracker: {e}")
+        finally:
+            db.close()
+            
+    def _seed_roster(self):
+        """Load the latest state of every firefighter into the roster stream (once, at startup)"""
+        db = SessionLocal()
+        try:
+            for firefighter in db.query(Firefighter).all():
+                latest_pos = db.query(Position).filter(
+                    Position.firefighter_id == firefighter.id
+                ).order_by(desc(Position.timestamp)).first()
+                latest_vitals = db.query(Vitals).filter(
+                    Vitals.firefighter_id == firefighter.id
+                ).order_by(desc(Vitals.timestamp)).first()
+                self.roster.update(firefighter.id, firefighter_to_dict(firefighter, latest_pos, latest_vitals))
+            self.roster.publish()
+        except Exception as e:
+            print(f"Error seeding roster: {e}")
+        finally:
+            db.close()
+            
     def _retrieve_loop(self):
         """Main retrieval loop"""
         while self.running:
             try:
+                # Pick up edits to the alert rule file without a restart
+                rule_table = self.alert_engine.rule_table
+                if rule_table.reload_if_changed():
+                    self.stationary_tracker.configure(**rule_table.stationary)
+                
                 db = SessionLocal()
                 try:
                     self._update_firefighters(db)
@@ -397,6 +501,7 @@ class DataRetriever:
                         tag_id
                     )
                     team = firefighter_data.get('team') or sim_ff.get('team') or ''
+                    role = firefighter_data.get('role') or sim_ff.get('role') or ''
                 else:
                     name = (
                         sim_ff.get('name') or 
@@ -407,6 +512,7 @@ class DataRetriever:
                     )
                     badge_number = sim_ff.get('badge_number') or sim_ff.get('badge') or tag_id
                     team = sim_ff.get('team') or ''
+                    role = sim_ff.get('role') or ''
                     
                 # If tag_id not in map, try to add it
                 if tag_id not in self.firefighter_map:
@@ -448,6 +554,19 @@ class DataRetriever:
                 if team and team.strip() and team != firefighter.team:
                     firefighter.team = team
                 
+                # Always update role if available
+                if role and role.strip() and role != firefighter.role:
+                    firefighter.role = role
+                
+                # Team and role select per-team/per-role alert thresholds
+                self.alert_engine.set_attributes(firefighter_id, team=firefighter.team, role=firefighter.role)
+                roster_fields = {
+                    'name': firefighter.name,
+                    'badge_number': firefighter.badge_number,
+                    'team': firefighter.team or '',
+                    'on_mission': bool(firefighter.on_mission),
+                }
+                
                 # IMPORTANT: Do NOT update on_mission here - it should only be changed manually via RFID scanner or API
                 # This ensures that firefighters who are not on mission stay that way
                 
@@ -479,6 +598,8 @@ class DataRetriever:
                             timestamp=datetime.utcnow()
                         )
                         db.add(position)
+                        self.alert_engine.on_position(firefighter_id, position.latitude, position.longitude, position.timestamp)
+                        roster_fields['position'] = position_to_dict(position)
                 
                 # Update vitals - always update, even if some data is missing
                 # New API structure: vitals and device are directly in sim_ff, not in telemetry
@@ -553,6 +674,16 @@ class DataRetriever:
                     timestamp=datetime.utcnow()
                 )
                 db.add(vitals)
+                self.alert_engine.on_vitals(firefighter_id, {
+                    'heart_rate': heart_rate,
+                    'temperature': temperature,
+                    'oxygen_level': oxygen_level,
+                    'co_level': co_level,
+                    'battery_level': battery_level,
+                    'scba_pressure': scba_pressure
+                }, vitals.timestamp)
+                roster_fields['vitals'] = vitals_to_dict(vitals)
+                self.roster.update(firefighter_id, roster_fields)
                 
                 # Log if battery level is missing - show what data we have
                 if battery_level is None:
@@ -569,6 +700,15 @@ class DataRetriever:
                     print(f"Warning: Firefighter {firefighter.badge_number} ({firefighter.name or 'Unknown'}) has no battery level data. Debug: {debug_info}")
             
             db.commit()
+            data_versions.bump('firefighters')
+            
+            # Stream what changed in this cycle (including movement state and air remaining predictions)
+            for firefighter_id, prediction in self.scba_predictor.predictions().items():
+                self.roster.update(firefighter_id, {'scba_prediction': prediction})
+            for firefighter_id in self.firefighter_map.values():
+                since = self.stationary_tracker.stationary_since(firefighter_id)
+                self.roster.update(firefighter_id, {'stationary_since': since.isoformat() if since else None})
+            self.roster.publish()
             
             # After updating, check if there are any firefighters in DB that weren't updated
             all_db_firefighters = db.query(Firefighter).all()
@@ -648,6 +788,9 @@ class DataRetriever:
             all_local_beacons = db.query(Beacon).all()
             print(f"Total local beacons: {len(all_local_beacons)}")
             
+            # Only changes other than last_seen invalidate cached beacon responses
+            beacons_changed = False
+            
             for local_beacon in all_local_beacons:
                 if str(local_beacon.beacon_id) not in sim_beacon_ids:
                     # Beacon not in simulation
@@ -658,9 +801,12 @@ class DataRetriever:
                         # Test beacon - delete it (it's from old simulator)
                         print(f"Deleting test beacon {local_beacon.beacon_id} (not in simulation)")
                         db.delete(local_beacon)
+                        beacons_changed = True
                     else:
                         # Real beacon - mark as offline (keep for history)
+                        beacons_changed = beacons_changed or local_beacon.is_online != False
                         local_beacon.is_online = False
+                        self.alert_engine.on_beacon(local_beacon.id, local_beacon.floor, False)
                         print(f"Marked beacon {local_beacon.beacon_id} as offline (not in simulation)")
             
             # Now update/create beacons from simulation
@@ -750,6 +896,7 @@ class DataRetriever:
                         db.refresh(beacon)
                         self.beacon_map[beacon_id] = beacon.id
                         created_count += 1
+                        beacons_changed = True
                         print(f"Created new beacon {beacon_id} at ({lat}, {lon})")
                     
                     if beacon:
@@ -813,6 +960,8 @@ class DataRetriever:
                         
                         beacon.is_online = status.get('is_online') if isinstance(status, dict) and 'is_online' in status else (sim_beacon.get('is_online', True))
                         beacon.last_seen = datetime.utcnow()
+                        beacons_changed = beacons_changed or self._has_changes(beacon, ignore=('last_seen',))
+                        self.alert_engine.on_beacon(beacon.id, beacon.floor, beacon.is_online)
                 except Exception as e:
                     print(f"ERROR processing beacon {idx+1} (beacon_id: {beacon_id if 'beacon_id' in locals() else 'unknown'}): {e}")
                     import traceback
@@ -822,12 +971,18 @@ class DataRetriever:
                     continue
             
             db.commit()
+            if beacons_changed:
+                data_versions.bump('beacons')
             print(f"Beacon update summary: {created_count} created, {updated_count} updated, {skipped_count} skipped, {len(sim_beacons)} total in API response")
         except Exception as e:
             print(f"Error updating beacons: {e}")
             import traceback
             traceback.print_exc()
             db.rollback()  # Rollback transaction on error
+    
+    def _has_changes(self, obj, ignore=()):
+        """Whether attributes of `obj` (other than `ignore`) changed since it was loaded or last flushed"""
+        return any(attr.history.has_changes() for attr in inspect(obj).attrs if attr.key not in ignore)
             
     def _update_alerts(self, db: Session):
         """Update alerts from simulator API and generate local alerts"""
@@ -851,183 +1006,173 @@ class DataRetriever:
                     print(f"Could not extract list from alerts API response: {type(sim_alerts)}")
                     sim_alerts = []
                 
-                for sim_alert in sim_alerts:
-                    # Check if sim_alert is a dict
-                    if not isinstance(sim_alert, dict):
-                        continue
-                    alert_type = sim_alert.get('alert_type') or sim_alert.get('type')
-                    tag_id = sim_alert.get('tag_id') or sim_alert.get('firefighter_id')
-                    
-                    if not alert_type:
-                        continue
-                    
-                    firefighter_id = None
-                    if tag_id and tag_id in self.firefighter_map:
-                        firefighter_id = self.firefighter_map[tag_id]
-                    
-                    # Check if alert already exists
-                    recent_alert = db.query(Alert).filter(
-                        Alert.firefighter_id == firefighter_id,
-                        Alert.alert_type == alert_type,
-                        Alert.timestamp > datetime.utcnow() - timedelta(seconds=30),
-                        Alert.acknowledged == False
-                    ).first()
-                    
-                    if not recent_alert:
-                        alert_info = ALERT_TYPES.get(alert_type, {'severity': 'warning', 'description': alert_type})
-                        alert = Alert(
-                            firefighter_id=firefighter_id,
-                            alert_type=alert_type,
-                            severity=alert_info['severity'],
-                            message=alert_info['description'],
-                            timestamp=datetime.utcnow()
-                        )
-                        db.add(alert)
+                inserted_ids = self._ingest_remote_alerts(db, sim_alerts)
+            else:
+                inserted_ids = []
             
-            # Generate local alerts based on vitals (with diversity)
-            self._generate_local_alerts(db)
+            # Persist local alerts raised by the rule engine during ingestion
+            updated_ids, closed_alerts = self._emit_engine_alerts(db)
             
+            db.flush()
+            created_ids = inserted_ids + [alert.id for alert in self.new_alerts]
+            self.new_alerts = []
             db.commit()
+            if created_ids or updated_ids:
+                data_versions.bump('alerts')
             
-            # Clean up old alerts - keep only last 20
-            self._cleanup_old_alerts(db)
+            # Push to SSE subscribers only what is committed
+            self._publish_alert_events(db, created_ids, updated_ids)
+            for alert in closed_alerts:
+                # Every member of the aggregate recovered, or its window expired
+                self.acknowledge_alert(alert)
+            
+            # Move old alerts to the archive - keep only the last ACTIVE_ALERTS_LIMIT active
+            self._archive_old_alerts(db)
         except Exception as e:
             print(f"Error updating alerts: {e}")
+            # Alerts recorded in the index may not have been stored
+            self.new_alerts = []
+            db.rollback()
+            self.alert_index.rebuild(db)
+            self.alert_correlator.rebuild(db)
             
-    def _generate_local_alerts(self, db: Session):
-        """Generate alerts based on local vitals data"""
-        from math import sqrt, cos
+    def _ingest_remote_alerts(self, db: Session, sim_alerts):
+        """Insert upstream alerts keyed by their remote id; already known alerts are skipped.
         
-        for firefighter_id in self.firefighter_map.values():
-            # Get latest vitals
-            last_vitals = db.query(Vitals).filter(
-                Vitals.firefighter_id == firefighter_id
-            ).order_by(desc(Vitals.timestamp)).first()
+        Returns ids of the newly inserted alerts.
+        """
+        rows = []
+        now = datetime.utcnow()
+        for sim_alert in sim_alerts:
+            # Check if sim_alert is a dict
+            if not isinstance(sim_alert, dict):
+                continue
+            alert_type = sim_alert.get('alert_type') or sim_alert.get('type')
+            tag_id = sim_alert.get('tag_id') or sim_alert.get('firefighter_id')
             
-            if not last_vitals:
+            if not alert_type:
                 continue
             
-            # Check for MAN-DOWN (30 seconds stationary)
-            positions = db.query(Position).filter(
-                Position.firefighter_id == firefighter_id
-            ).order_by(desc(Position.timestamp)).limit(100).all()
+            firefighter_id = None
+            if tag_id and tag_id in self.firefighter_map:
+                firefighter_id = self.firefighter_map[tag_id]
             
-            if len(positions) > 1:
-                first_pos = positions[0]
-                stationary_since = first_pos.timestamp
-                
-                for pos in positions[1:]:
-                    lat_diff = abs(pos.latitude - first_pos.latitude) * 111000
-                    lon_diff = abs(pos.longitude - first_pos.longitude) * 111000 * cos(first_pos.latitude * 3.14159 / 180)
-                    distance = sqrt(lat_diff**2 + lon_diff**2)
-                    
-                    if distance > 5:
-                        break
-                    stationary_since = pos.timestamp
-                
-                time_stationary = (datetime.utcnow() - stationary_since).total_seconds()
-                
-                # Increased threshold to 60 seconds to reduce false alarms
-                if time_stationary >= 60:  # Changed from 30 to 60
-                    self._create_alert(db, firefighter_id, 'man_down')
+            # Upstream id; fall back to what identifies the alert if there is none
+            remote_id = sim_alert.get('id') or sim_alert.get('alert_id')
+            if remote_id is None:
+                if sim_alert.get('timestamp'):
+                    remote_id = f"{tag_id}:{alert_type}:{sim_alert.get('timestamp')}"
+                else:
+                    # Can't be ingested idempotently (and may be an SOS) - deduplicated by recency instead
+                    self.unkeyed_alerts += 1
+                    print(f"Upstream alert without id and timestamp: {alert_type} for {tag_id}")
+                    if self.alert_index.fired_within(firefighter_id, alert_type, UNKEYED_ALERT_DEDUP_SECONDS, now):
+                        continue
+                    remote_id = self._unkeyed_remote_id(tag_id, alert_type, sim_alert.get('message'), now)
             
-            # Check for high heart rate
-            if last_vitals.heart_rate and last_vitals.heart_rate > 180:
-                self._create_alert(db, firefighter_id, 'high_heart_rate')
-                
-            # Check for low battery
-            if last_vitals.battery_level and last_vitals.battery_level < 20:
-                self._create_alert(db, firefighter_id, 'low_battery')
-                
-            # Check for low SCBA pressure
-            if last_vitals.scba_pressure:
-                if last_vitals.scba_pressure < 50:
-                    self._create_alert(db, firefighter_id, 'scba_critical')
-                elif last_vitals.scba_pressure < 100:
-                    self._create_alert(db, firefighter_id, 'scba_low_pressure')
+            alert_info = ALERT_TYPES.get(alert_type, {'severity': 'warning', 'description': alert_type})
+            rows.append({
+                'firefighter_id': firefighter_id,
+                'alert_type': alert_type,
+                'severity': alert_info['severity'],
+                'message': alert_info['description'],
+                'timestamp': now,
+                'acknowledged': False,
+                'source': SIMULATOR_ALERT_SOURCE,
+                'remote_id': str(remote_id)
+            })
+        
+        # Alerts that already went to the archive are not re-inserted into the active table
+        archived = archived_remote_ids(db, SIMULATOR_ALERT_SOURCE, {row['remote_id'] for row in rows})
+        if archived:
+            rows = [row for row in rows if row['remote_id'] not in archived]
+        
+        inserted_ids = []
+        for start in range(0, len(rows), ALERT_INSERT_BATCH):
+            stmt = sqlite_insert(Alert).values(rows[start:start + ALERT_INSERT_BATCH])
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=['source', 'remote_id']
+            ).returning(Alert.id, Alert.firefighter_id, Alert.alert_type, Alert.timestamp)
             
-            # Check for high CO
-            if last_vitals.co_level and last_vitals.co_level > 30:
-                self._create_alert(db, firefighter_id, 'high_co')
-                
-            # Check for low oxygen
-            if last_vitals.oxygen_level and last_vitals.oxygen_level < 90:
-                self._create_alert(db, firefighter_id, 'low_oxygen')
-                
-            # Check for high temperature
-            if last_vitals.temperature and last_vitals.temperature > 40:
-                self._create_alert(db, firefighter_id, 'high_temperature')
+            # Only newly inserted alerts are returned
+            for inserted in db.execute(stmt):
+                self.alert_index.record(inserted)
+                inserted_ids.append(inserted.id)
+        return inserted_ids
+    
+    @staticmethod
+    def _unkeyed_remote_id(tag_id, alert_type, message, now):
+        """Key of an upstream alert with neither id nor timestamp: unique per ingestion cycle only"""
+        digest = hashlib.sha1(f"{tag_id}\x1f{alert_type}\x1f{message}".encode('utf-8')).hexdigest()[:16]
+        return f"unkeyed:{digest}:{now.isoformat()}"
+    
+    def _emit_engine_alerts(self, db: Session):
+        """Create alerts for rule hits queued by the alert engine since the last cycle.
         
-        # Check for offline beacons
-        beacons = db.query(Beacon).all()
-        for beacon in beacons:
-            if not beacon.is_online:
-                self._create_alert(db, None, 'beacon_offline')
+        Returns ids of aggregate alerts updated in place and the aggregates closed.
+        """
+        # MAN-DOWN against the current time, also for tags that stopped sending positions
+        self.alert_engine.sweep(self.firefighter_map.values())
+        for firefighter_id, alert_type in self.alert_engine.drain():
+            self._create_alert(db, firefighter_id, alert_type)
+        # Grouped hits (e.g. offline beacons per floor) update aggregate alerts
+        return self.alert_correlator.apply(db, self.alert_engine.drain_groups(), self._create_alert)
+    
+    def _publish_alert_events(self, db: Session, created_ids, updated_ids):
+        """Publish alert-created / alert-updated events for committed alerts"""
+        if not created_ids and not updated_ids:
+            return
+        updated_ids = set(updated_ids) - set(created_ids)
+        alerts = db.query(Alert).filter(
+            Alert.id.in_(list(created_ids) + list(updated_ids))
+        ).order_by(Alert.id).all()
+        for alert in alerts:
+            event = 'alert-updated' if alert.id in updated_ids else 'alert-created'
+            self.alert_events.publish(event, alert_to_dict(alert))
     
-    def _cleanup_old_alerts(self, db: Session):
-        """Remove old alerts, keeping only the last 20 most recent ones"""
+    def _archive_old_alerts(self, db: Session):
+        """Move acknowledged alerts and all but the ACTIVE_ALERTS_LIMIT most recent unacknowledged ones to the archive"""
         try:
-            # Get total count of unacknowledged alerts
-            total_alerts = db.query(Alert).filter(Alert.acknowledged == False).count()
+            # Nothing to move if the active set is within bounds and nothing was acknowledged
+            if self.alert_index.unacknowledged <= ACTIVE_ALERTS_LIMIT and not self.alert_index.acknowledged_since_archive:
+                return
             
-            if total_alerts > 20:
-                # Get the 20 most recent unacknowledged alerts (by timestamp, descending)
-                recent_alerts = db.query(Alert).filter(
-                    Alert.acknowledged == False
-                ).order_by(desc(Alert.timestamp)).limit(20).all()
-                recent_alert_ids = {alert.id for alert in recent_alerts}
-                
-                # Delete all unacknowledged alerts that are not in the recent 20
-                deleted_count = db.query(Alert).filter(
-                    Alert.acknowledged == False,
-                    ~Alert.id.in_(recent_alert_ids)
-                ).delete(synchronize_session=False)
-                
-                db.commit()
-                if deleted_count > 0:
-                    print(f"Cleaned up {deleted_count} old alerts, kept {len(recent_alerts)} most recent")
+            self.alert_index.acknowledged_since_archive = False
+            moved, moved_unacknowledged = archive_alerts(db, keep=ACTIVE_ALERTS_LIMIT)
+            if moved >= ARCHIVE_BATCH_SIZE * ARCHIVE_MAX_BATCHES:
+                # Backlog left - continue next cycle
+                self.alert_index.acknowledged_since_archive = True
+            
+            if moved_unacknowledged > 0:
+                # Archived alerts no longer hold cooldowns - reload the (now small) unacknowledged set
+                self.alert_index.rebuild(db)
+            if moved > 0:
+                data_versions.bump('alerts')
+                print(f"Archived {moved} alerts ({moved_unacknowledged} unacknowledged)")
         except Exception as e:
-            print(f"Error cleaning up old alerts: {e}")
+            print(f"Error archiving old alerts: {e}")
             db.rollback()
                 
-    def _create_alert(self, db: Session, firefighter_id: int, alert_type: str):
-        """Create an alert if it doesn't exist recently and if there's diversity"""
-        
-        # Check if this specific firefighter already has this alert type recently (180 seconds cooldown)
-        recent_alert_for_firefighter = db.query(Alert).filter(
-            Alert.firefighter_id == firefighter_id,
-            Alert.alert_type == alert_type,
-            Alert.timestamp > datetime.utcnow() - timedelta(seconds=180),
-            Alert.acknowledged == False
-        ).first()
+    def _create_alert(self, db: Session, firefighter_id: int, alert_type: str, floor=None, members=None):
+        """Create an alert if it doesn't exist recently and if there's diversity.
         
-        if recent_alert_for_firefighter:
-            return  # Don't create duplicate alert for same firefighter
+        With `members` an aggregate alert for a floor is created (deduplicated by
+        the correlator instead of cooldowns). Returns the new alert or None.
+        """
         
-        # Check for global diversity - don't create same alert type if it was created recently (30 seconds)
-        # This ensures variety in alerts
-        recent_alert_same_type = db.query(Alert).filter(
-            Alert.alert_type == alert_type,
-            Alert.timestamp > datetime.utcnow() - timedelta(seconds=30),
-            Alert.acknowledged == False
-        ).first()
+        # Per-firefighter cooldown and global same-type diversity, checked in memory
+        if members is None and not self.alert_index.allows(firefighter_id, alert_type):
+            return None
         
-        if recent_alert_same_type:
-            return  # Don't create same alert type too frequently (diversity)
-        
-        # Check total number of unacknowledged alerts - limit to 20
-        total_unacknowledged = db.query(Alert).filter(
-            Alert.acknowledged == False
-        ).count()
+        alert_info = ALERT_TYPES.get(alert_type, {'severity': 'warning', 'description': alert_type})
         
-        if total_unacknowledged >= 20:
+        # Check total number of unacknowledged alerts - limit to ACTIVE_ALERTS_LIMIT
+        if self.alert_index.unacknowledged >= ACTIVE_ALERTS_LIMIT:
             # If we're at the limit, only allow critical alerts
-            alert_info = ALERT_TYPES.get(alert_type, {'severity': 'warning', 'description': alert_type})
             if alert_info.get('severity') != 'critical':
-                return  # Don't create non-critical alerts if we're at limit
+                return None  # Don't create non-critical alerts if we're at limit
         
         # Create the alert
-        alert_info = ALERT_TYPES.get(alert_type, {'severity': 'warning', 'description': alert_type})
         alert = Alert(
             firefighter_id=firefighter_id,
             alert_type=alert_type,
@@ -1035,5 +1180,12 @@ class DataRetriever:
             message=alert_info['description'],
             timestamp=datetime.utcnow()
         )
+        if members is not None:
+            alert.floor = floor
+            alert.member_count = len(members)
+            alert.affected_ids = json.dumps(sorted(members))
+            alert.message = aggregate_message(alert_info['description'], floor, len(members))
         db.add(alert)
-
+        self.alert_index.record(alert)
+        self.new_alerts.append(alert)
+        return alert
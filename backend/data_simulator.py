@@ -1,15 +1,18 @@
 import random
 import time
+import json
 import threading
 from datetime import datetime, timedelta
-from math import sqrt, cos
 from sqlalchemy.orm import Session
 from backend.database import SessionLocal, init_db
 from backend.models import Firefighter, Position, Vitals, Alert, Beacon
+from backend.alert_rules import RuleTable, RosterSnapshot, VITALS_FIELDS
+from backend.stationary_tracker import StationaryTracker
+from backend.alert_correlator import AlertCorrelator, aggregate_message
 
 # Alert types mapping
 ALERT_TYPES = {
-    'man_down': {'severity': 'critical', 'description': 'Bezruch >30s'},
+    'man_down': {'severity': 'critical', 'description': 'Bezruch >60s'},
     'sos_pressed': {'severity': 'critical', 'description': 'Przycisk SOS'},
     'high_heart_rate': {'severity': 'warning', 'description': 'Tętno >180 bpm'},
     'low_battery': {'severity': 'warning', 'description': 'Bateria <20%'},
@@ -30,6 +33,9 @@ class DataSimulator:
         self.thread = None
         self.firefighters = []
         self.beacons = []
+        self.rule_table = RuleTable()  # Declarative vitals thresholds
+        self.stationary_tracker = StationaryTracker(**self.rule_table.stationary)  # MAN-DOWN detection
+        self.alert_correlator = AlertCorrelator(self.rule_table, ALERT_TYPES)  # Offline beacons grouped per floor
         
     def start(self):
         """Start the data simulator"""
@@ -42,6 +48,13 @@ class DataSimulator:
         # Create initial firefighters and beacons
         self._create_initial_data()
         
+        # Re-open aggregate alerts left from a previous run
+        db = SessionLocal()
+        try:
+            self.alert_correlator.rebuild(db)
+        finally:
+            db.close()
+        
         self.running = True
         self.thread = threading.Thread(target=self._simulate_loop, daemon=True)
         self.thread.start()
@@ -139,6 +152,7 @@ class DataSimulator:
                 timestamp=datetime.utcnow()
             )
             db.add(position)
+            self.stationary_tracker.update(firefighter.id, lat, lon, position.timestamp)
             
             # Update vitals
             last_vitals = db.query(Vitals).filter(
@@ -187,6 +201,10 @@ class DataSimulator:
         
     def _generate_alerts(self, db: Session):
         """Generate random alerts based on vitals and position"""
+        if self.rule_table.reload_if_changed():
+            self.stationary_tracker.configure(**self.rule_table.stationary)
+        snapshot = RosterSnapshot(capacity=max(len(self.firefighters), 1))
+        
         for firefighter in self.firefighters:
             last_vitals = db.query(Vitals).filter(
                 Vitals.firefighter_id == firefighter.id
@@ -195,73 +213,45 @@ class DataSimulator:
             if not last_vitals:
                 continue
             
-            # Check for MAN-DOWN (30 seconds stationary)
-            positions = db.query(Position).filter(
-                Position.firefighter_id == firefighter.id
-            ).order_by(Position.timestamp.desc()).limit(100).all()
+            # Collect latest vitals for the vectorized threshold pass below
+            snapshot.set_attributes(firefighter.id, team=firefighter.team, role=firefighter.role)
+            snapshot.set_vitals(firefighter.id, {field: getattr(last_vitals, field) for field in VITALS_FIELDS})
             
-            if len(positions) > 1:
-                first_pos = positions[0]
-                stationary_since = first_pos.timestamp
-                
-                for pos in positions[1:]:
-                    # Check if position changed (more than 5 meters)
-                    lat_diff = abs(pos.latitude - first_pos.latitude) * 111000
-                    lon_diff = abs(pos.longitude - first_pos.longitude) * 111000 * cos(first_pos.latitude * 3.14159 / 180)
-                    distance = sqrt(lat_diff**2 + lon_diff**2)
-                    
-                    if distance > 5:  # Moved more than 5 meters
-                        break
-                    stationary_since = pos.timestamp
-                
-                time_stationary = (datetime.utcnow() - stationary_since).total_seconds()
-                
-                # Generate MAN-DOWN alert if stationary for 30+ seconds
-                if time_stationary >= 30:
-                    self._create_alert(db, firefighter.id, 'man_down')
-                
-            # Check for high heart rate
-            if last_vitals.heart_rate > 180:
-                self._create_alert(db, firefighter.id, 'high_heart_rate')
-                
-            # Check for low battery
-            if last_vitals.battery_level < 20:
-                self._create_alert(db, firefighter.id, 'low_battery')
-                
-            # Check for low SCBA pressure
-            if last_vitals.scba_pressure < 50:
-                self._create_alert(db, firefighter.id, 'scba_critical')
-            elif last_vitals.scba_pressure < 100:
-                self._create_alert(db, firefighter.id, 'scba_low_pressure')
-                
-            # Check for high CO
-            if last_vitals.co_level > 30:
-                self._create_alert(db, firefighter.id, 'high_co')
-                
-            # Check for low oxygen
-            if last_vitals.oxygen_level < 90:
-                self._create_alert(db, firefighter.id, 'low_oxygen')
-                
-            # Check for high temperature
-            if last_vitals.temperature > 40:
-                self._create_alert(db, firefighter.id, 'high_temperature')
+            # Check for MAN-DOWN
+            if self.stationary_tracker.is_stationary(firefighter.id):
+                self._create_alert(db, firefighter.id, 'man_down')
+        
+        # Check vitals thresholds for all firefighters at once
+        for firefighter_id, alert_type in self.rule_table.evaluate(snapshot):
+            self._create_alert(db, firefighter_id, alert_type)
                 
-        # Check for offline beacons
+        # Check for offline beacons - one aggregate alert per floor, closed when all are back online
+        offline = {}
         for beacon in self.beacons:
+            members = offline.setdefault(('beacon_offline', beacon.floor), set())
             if not beacon.is_online:
-                self._create_alert(db, None, 'beacon_offline')
-                
-        db.commit()
+                members.add(beacon.id)
+        self.alert_correlator.apply(db, offline, self._create_alert)
+        
+        try:
+            db.commit()
+        except Exception:
+            # Aggregates tracked by the correlator were not stored
+            db.rollback()
+            self.alert_correlator.rebuild(db)
+            raise
         
-    def _create_alert(self, db: Session, firefighter_id: int, alert_type: str):
-        """Create an alert if it doesn't exist recently"""
-        # Check if alert already exists in last 30 seconds
-        recent_alert = db.query(Alert).filter(
-            Alert.firefighter_id == firefighter_id,
-            Alert.alert_type == alert_type,
-            Alert.timestamp > datetime.utcnow() - timedelta(seconds=30),
-            Alert.acknowledged == False
-        ).first()
+    def _create_alert(self, db: Session, firefighter_id: int, alert_type: str, floor=None, members=None):
+        """Create an alert if it doesn't exist recently (aggregate alert if `members` is given)"""
+        # Check if alert already exists in last 30 seconds (aggregates are deduplicated by the correlator)
+        recent_alert = None
+        if members is None:
+            recent_alert = db.query(Alert).filter(
+                Alert.firefighter_id == firefighter_id,
+                Alert.alert_type == alert_type,
+                Alert.timestamp > datetime.utcnow() - timedelta(seconds=30),
+                Alert.acknowledged == False
+            ).first()
         
         if not recent_alert:
             alert_info = ALERT_TYPES.get(alert_type, {'severity': 'warning', 'description': alert_type})
@@ -272,5 +262,12 @@ class DataSimulator:
                 message=alert_info['description'],
                 timestamp=datetime.utcnow()
             )
+            if members is not None:
+                alert.floor = floor
+                alert.member_count = len(members)
+                alert.affected_ids = json.dumps(sorted(members))
+                alert.message = aggregate_message(alert_info['description'], floor, len(members))
             db.add(alert)
+            return alert
+        return None
 
@@ -0,0 +1,68 @@
+"""
+Per-resource data version counters.
+
+Ingest (data retriever) and mutation paths (API) bump the version of the
+resources they change after committing. The API derives ETags from these
+in-memory counters, so a conditional request whose data did not change is
+answered with 304 without touching the database or serializing anything.
+"""
+import threading
+import uuid
+
+# Resources with their own version counter
+RESOURCES = ('firefighters', 'beacons', 'alerts', 'building')
+
+
+class DataVersions:
+    def __init__(self):
+        self.versions = {resource: 0 for resource in RESOURCES}
+        self.boot_id = uuid.uuid4().hex[:8]  # ETags from before a restart never match
+        self.lock = threading.Lock()
+
+    def bump(self, *resources):
+        """Mark resources as changed (call after the change is committed)"""
+        with self.lock:
+            for resource in resources:
+                self.versions[resource] += 1
+
+    def etag(self, resources):
+        """ETag value for a response built from the given resources"""
+        versions = self.versions
+        return f"{self.boot_id}-" + '-'.join(str(versions[resource]) for resource in resources)
+
+
+class ConditionalStats:
+    """Counts conditional GETs answered with 304 per endpoint, for /api/metrics"""
+
+    def __init__(self):
+        self.requests = {}  # endpoint -> [requests, not_modified]
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, not_modified):
+        with self.lock:
+            counts = self.requests.setdefault(endpoint, [0, 0])
+            counts[0] += 1
+            if not_modified:
+                counts[1] += 1
+
+    def to_dict(self):
+        with self.lock:
+            total = sum(counts[0] for counts in self.requests.values())
+            not_modified = sum(counts[1] for counts in self.requests.values())
+            return {
+                'requests': total,
+                'not_modified': not_modified,
+                'not_modified_rate': round(not_modified / total, 3) if total else 0.0,
+                'endpoints': {
+                    endpoint: {
+                        'requests': counts[0],
+                        'not_modified': counts[1],
+                        'not_modified_rate': round(counts[1] / counts[0], 3),
+                    } for endpoint, counts in sorted(self.requests.items())
+                },
+            }
+
+
+# Shared by the data retriever and the API (same process)
+data_versions = DataVersions()
+conditional_stats = ConditionalStats()
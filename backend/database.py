@@ -50,6 +50,60 @@ def migrate_db():
                 conn.execute(text('ALTER TABLE firefighters ADD COLUMN team VARCHAR(50)'))
                 conn.commit()
             print("Added 'team' column to firefighters table")
+        
+        # Add role column if it doesn't exist
+        if 'role' not in columns:
+            with engine.connect() as conn:
+                conn.execute(text('ALTER TABLE firefighters ADD COLUMN role VARCHAR(50)'))
+                conn.commit()
+            print("Added 'role' column to firefighters table")
+    
+    # Check if alerts table exists
+    if 'alerts' in inspector.get_table_names():
+        columns = [col['name'] for col in inspector.get_columns('alerts')]
+        
+        # Add upstream alert identity columns if they don't exist
+        if 'source' not in columns:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE alerts ADD COLUMN source VARCHAR(50) DEFAULT 'local'"))
+                conn.commit()
+            print("Added 'source' column to alerts table")
+        if 'remote_id' not in columns:
+            with engine.connect() as conn:
+                conn.execute(text('ALTER TABLE alerts ADD COLUMN remote_id VARCHAR(100)'))
+                conn.commit()
+            print("Added 'remote_id' column to alerts table")
+        
+        with engine.connect() as conn:
+            conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_alerts_source_remote_id ON alerts (source, remote_id)'))
+            conn.commit()
+    
+    # Add aggregate alert columns (alert correlation) to both alert tables
+    for table in ('alerts', 'alerts_archive'):
+        if table not in inspector.get_table_names():
+            continue
+        columns = [col['name'] for col in inspector.get_columns(table)]
+        for column, definition in (('floor', 'INTEGER'), ('member_count', 'INTEGER DEFAULT 1'), ('affected_ids', 'TEXT')):
+            if column not in columns:
+                with engine.connect() as conn:
+                    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+                    conn.commit()
+                print(f"Added '{column}' column to {table} table")
+    
+    # Indexes for `since` / `cursor` history queries
+    with engine.connect() as conn:
+        # Keyset pagination of the alert history (the archive table gets its other indexes from create_all)
+        if 'alerts' in inspector.get_table_names():
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_alerts_timestamp_id ON alerts (timestamp, id)'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_alerts_firefighter_timestamp ON alerts (firefighter_id, timestamp)'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_alerts_type_timestamp ON alerts (alert_type, timestamp)'))
+        if 'alerts_archive' in inspector.get_table_names():
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_alerts_archive_type_timestamp ON alerts_archive (alert_type, timestamp)'))
+        for table in ('positions', 'vitals'):
+            if table in inspector.get_table_names():
+                conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_firefighter_timestamp ON {table} (firefighter_id, timestamp)'))
+                conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_firefighter_id ON {table} (firefighter_id, id)'))
+        conn.commit()
 
 
 def get_db():
@@ -60,3 +114,13 @@ def get_db():
     finally:
         db.close()
 
+
+
+def begin_read(db):
+    """Start an explicit read transaction on the session's connection.
+    
+    The SQLite driver only opens a transaction before writes, so consecutive
+    SELECTs could otherwise see different commits of the data retriever.
+    Ends when the session is closed or rolled back.
+    """
+    db.connection().exec_driver_sql('BEGIN')
@@ -0,0 +1,125 @@
+"""
+Downsampling of history series: LTTB for charts, RDP for map trails.
+
+Largest-Triangle-Three-Buckets (LTTB) keeps the first and last point and picks
+one point per bucket: the one forming the largest triangle with the point
+chosen in the previous bucket and the average of the next bucket. Peaks and
+dips therefore survive, unlike with plain striding or averaging. Buckets are
+processed in order (each choice depends on the previous one), the work inside
+a bucket is vectorized. LTTB needs a monotonic x axis (time).
+
+Position trails, where neither coordinate is monotonic, are simplified as a
+path with Ramer-Douglas-Peucker (RDP) instead: starting from the endpoints, the
+sample farthest from the simplified path is added until the requested number
+of points is reached, so corners of the trail survive.
+"""
+import heapq
+import numpy as np
+
+MIN_POINTS = 3  # First, last and at least one bucket
+
+
+def lttb_indices(x, y, points):
+    """Indices of the `points` samples of (x, y) selected by LTTB, in order.
+
+    `x` and `y` are 1-D float arrays of equal length in sample order. Missing
+    values (NaN) in `y` are treated as the series mean when choosing points.
+    """
+    n = len(x)
+    if points >= n or n <= MIN_POINTS:
+        return np.arange(n)
+    points = max(points, MIN_POINTS)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    missing = np.isnan(y)
+    if missing.any():
+        y = np.where(missing, np.nanmean(y) if not missing.all() else 0.0, y)
+
+    # Bucket i covers samples edges[i]:edges[i + 1]; the first and last sample are kept as they are
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(int) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+
+    selected = np.empty(points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    last_bucket = points - 3
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i < last_bucket:
+            next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area (the factor does not change the argmax)
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def lttb_select(samples, points):
+    """Ids of the samples kept by LTTB.
+
+    `samples` are (id, x, y) tuples in order; None values count as missing.
+    """
+    if points >= len(samples):
+        return [sample[0] for sample in samples]
+    # Plain tuples - NumPy probes other sequence types (e.g. result rows) element by element
+    data = np.array([tuple(sample) for sample in samples], dtype=float)
+    return data[lttb_indices(data[:, 1], data[:, 2], points), 0].astype(int).tolist()
+
+
+def rdp_indices(x, y, points):
+    """Indices of the `points` samples of the path (x, y) kept by Ramer-Douglas-Peucker, in order.
+
+    Starting from the first and last sample, the sample farthest from the
+    simplified path is added repeatedly, so corners of the path survive.
+    """
+    n = len(x)
+    if points >= n or n <= MIN_POINTS:
+        return np.arange(n)
+    points = max(points, MIN_POINTS)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    segments = []  # Heap of (-distance, start, end, farthest sample)
+
+    def push(start, end):
+        if end - start < 2:
+            return
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distance = np.abs(px * dy - py * dx) / length
+        else:
+            distance = np.hypot(px, py)  # Segment returns to its start
+        farthest = int(np.argmax(distance))
+        heapq.heappush(segments, (-distance[farthest], start, end, start + 1 + farthest))
+
+    selected = [0, n - 1]
+    push(0, n - 1)
+    while len(selected) < points and segments:
+        _, start, end, index = heapq.heappop(segments)
+        selected.append(index)
+        push(start, index)
+        push(index, end)
+    return np.sort(np.array(selected))
+
+
+def rdp_select(samples, points):
+    """Ids of the samples kept by RDP.
+
+    `samples` are (id, x, y) tuples in path order.
+    """
+    if points >= len(samples):
+        return [sample[0] for sample in samples]
+    data = np.array([tuple(sample) for sample in samples], dtype=float)
+    return data[rdp_indices(data[:, 1], data[:, 2], points), 0].astype(int).tolist()
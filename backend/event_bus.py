@@ -0,0 +1,132 @@
+"""
+In-process event bus for Server-Sent Events.
+
+Events get monotonically increasing ids and are kept in a bounded ring buffer,
+so a reconnecting client can resume from its `Last-Event-ID`. Each event is
+serialized to JSON once when published and shared by all subscribers.
+Subscribers block on a Condition until a newer event exists (or a heartbeat
+timeout passes), so idle connections cost no CPU and no database queries.
+
+Under a thread pool server (serve.py) every open stream still holds a worker
+thread, so `StreamLimit` caps the number of open streams below the pool size:
+the remaining threads stay free for the other requests.
+"""
+import threading
+from collections import deque
+from backend.serialization import dumps
+
+EVENT_BUFFER_SIZE = 1000  # Events kept for Last-Event-ID resume
+HEARTBEAT_SECONDS = 15  # Comment line sent on idle streams to keep proxies from closing them
+MAX_STREAMS = 100  # Default limit of concurrently open streams (all kinds together)
+
+
+class EventBus:
+    def __init__(self, capacity=EVENT_BUFFER_SIZE):
+        self.events = deque(maxlen=capacity)  # (id, event_name, json_data, data)
+        self.last_id = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def publish(self, event, data):
+        """Append an event and wake up waiting subscribers; returns the event id.
+
+        `data` is kept as well, so subscribers can filter it - it must not be mutated later.
+        """
+        payload = dumps(data).decode('utf-8')
+        with self.condition:
+            self.last_id += 1
+            self.events.append((self.last_id, event, payload, data))
+            self.condition.notify_all()
+            return self.last_id
+
+    def close(self):
+        """End all streams (server shutdown) - clients reconnect and resume with Last-Event-ID"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def since(self, last_id):
+        """Return (events newer than last_id, missed) - missed is True if some were
+        already dropped from the buffer and the client should reload its state"""
+        with self.condition:
+            return self._since(last_id)
+
+    def wait(self, last_id, timeout=HEARTBEAT_SECONDS):
+        """Block until events newer than last_id exist, the bus is closed or the timeout passes"""
+        with self.condition:
+            if self.last_id <= last_id:
+                self.condition.wait_for(lambda: self.last_id > last_id or self.closed, timeout)
+            return self._since(last_id)
+
+    def _since(self, last_id):
+        if self.last_id <= last_id or not self.events:
+            return [], False
+        first_id = self.events[0][0]
+        missed = last_id < first_id - 1
+        # Ids are contiguous, so the start position follows from the first buffered id
+        start = max(0, last_id - first_id + 1)
+        return [self.events[i] for i in range(start, len(self.events))], missed
+
+    def stream(self, last_id=None, heartbeat=HEARTBEAT_SECONDS):
+        """Generate SSE-formatted text for one subscriber.
+
+        Without `last_id` the stream starts at the current end of the buffer.
+        """
+        yield "retry: 3000\n\n"
+        cursor = self.last_id if last_id is None else last_id
+        if cursor > self.last_id:
+            # Id from before a server restart - the client has to reload its state
+            cursor = self.last_id
+            yield "event: reset\ndata: {}\n\n"
+        while not self.closed:
+            events, missed = self.wait(cursor, heartbeat)
+            if missed:
+                yield "event: reset\ndata: {}\n\n"
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            for event_id, event, payload, _ in events:
+                yield f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+            cursor = events[-1][0]
+
+
+class StreamLimit:
+    """Counts open streams; `acquire` fails once `limit` streams are open"""
+
+    def __init__(self, limit=MAX_STREAMS):
+        self.limit = limit
+        self.open = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.open >= self.limit:
+                self.rejected += 1
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.open = max(0, self.open - 1)
+
+    def to_dict(self):
+        with self.lock:
+            return {'open': self.open, 'limit': self.limit, 'rejected': self.rejected}
+
+
+def format_event(event_id, event, data):
+    """Format one SSE message with a JSON payload"""
+    payload = dumps(data).decode('utf-8')
+    if event_id is None:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+def parse_last_event_id(value):
+    """Parse a Last-Event-ID header value (None if absent or invalid)"""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
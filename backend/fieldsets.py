@@ -0,0 +1,78 @@
+"""
+Sparse fieldsets for the roster endpoint (`fields=id,name,vitals.battery_level`).
+
+`parse_fields` turns the parameter into a FieldSet: the firefighter fields
+and the position / vitals fields a client asked for. The API selects only
+those columns (and skips the position / vitals / SCBA lookups nobody asked
+for), so the rest is neither loaded from the database nor serialized.
+"""
+
+FIREFIGHTER_FIELDS = ('id', 'name', 'badge_number', 'team', 'on_mission', 'scba_prediction', 'position', 'vitals')
+FIREFIGHTER_COLUMNS = ('id', 'name', 'badge_number', 'team', 'on_mission')
+POSITION_FIELDS = ('latitude', 'longitude', 'floor', 'timestamp')
+VITALS_FIELDS = ('heart_rate', 'temperature', 'oxygen_level', 'co_level', 'battery_level', 'scba_pressure', 'timestamp')
+NESTED_FIELDS = {'position': POSITION_FIELDS, 'vitals': VITALS_FIELDS}
+
+
+class FieldSet:
+    """Requested fields in response order; `position` / `vitals` are None when not requested"""
+
+    def __init__(self, firefighter, position=None, vitals=None):
+        self.firefighter = firefighter
+        self.position = position
+        self.vitals = vitals
+
+    @property
+    def columns(self):
+        """Firefighter table columns to select"""
+        return [field for field in self.firefighter if field in FIREFIGHTER_COLUMNS]
+
+    def to_dict(self, firefighter, position=None, vitals=None, scba_prediction=None):
+        """Same values as firefighter_to_dict, limited to the requested fields"""
+        data = {}
+        for field in self.firefighter:
+            if field == 'team':
+                data['team'] = firefighter.team or ''
+            elif field == 'on_mission':
+                data['on_mission'] = bool(firefighter.on_mission)
+            elif field == 'scba_prediction':
+                data['scba_prediction'] = scba_prediction
+            elif field == 'position':
+                data['position'] = {name: getattr(position, name) for name in self.position} if position else None
+            elif field == 'vitals':
+                data['vitals'] = {name: getattr(vitals, name) for name in self.vitals} if vitals else None
+            else:
+                data[field] = getattr(firefighter, field)
+        return data
+
+
+def parse_fields(value):
+    """Parse a `fields` parameter; None if absent (all fields).
+
+    `position` / `vitals` select the whole block, `vitals.battery_level` one
+    field of it. `id` is always included. Raises ValueError for unknown fields.
+    """
+    if not value:
+        return None
+    top = {'id'}
+    nested = {'position': set(), 'vitals': set()}
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        block, dot, field = name.partition('.')
+        if dot:
+            if field not in NESTED_FIELDS.get(block, ()):
+                raise ValueError(f"Unknown field: {name}")
+            top.add(block)
+            nested[block].add(field)
+        elif block in FIREFIGHTER_FIELDS:
+            top.add(block)
+            if block in nested:
+                nested[block].update(NESTED_FIELDS[block])
+        else:
+            raise ValueError(f"Unknown field: {name}")
+
+    # Canonical order, so equal field sets give identical responses
+    def ordered(block):
+        return [field for field in NESTED_FIELDS[block] if field in nested[block]] if block in top else None
+    return FieldSet([field for field in FIREFIGHTER_FIELDS if field in top], ordered('position'), ordered('vitals'))
@@ -13,7 +13,7 @@ from datetime import datetime, timedelta
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.database import SessionLocal, init_db
-from backend.models import Firefighter, Position, Vitals, Alert, Beacon
+from backend.models import Firefighter, Position, Vitals, Alert, AlertArchive, Beacon
 
 # Building center coordinates (Warsaw)
 BUILDING_CENTER_LAT = 52.2297
@@ -27,6 +27,7 @@ def generate_test_data():
         
         # Clean existing data first
         db.query(Alert).delete()
+        db.query(AlertArchive).delete()
         db.query(Vitals).delete()
         db.query(Position).delete()
         db.query(Beacon).delete()
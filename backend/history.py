@@ -0,0 +1,72 @@
+"""
+Batch history reads for several firefighters at once.
+
+Channels name the history fields a client wants (e.g. `position`,
+`heart_rate`). Channels stored in the same table are read together with one
+range query over the (firefighter_id, timestamp) index for all requested
+firefighters, selecting only the needed columns. Results are columnar - one
+array per field for each firefighter - so field names are not repeated for
+every sample.
+"""
+from sqlalchemy import select
+from backend.models import Position, Vitals
+
+# Channel -> (history table, columns)
+HISTORY_CHANNELS = {
+    'position': (Position, ('latitude', 'longitude', 'floor')),
+    'heart_rate': (Vitals, ('heart_rate',)),
+    'temperature': (Vitals, ('temperature',)),
+    'oxygen_level': (Vitals, ('oxygen_level',)),
+    'co_level': (Vitals, ('co_level',)),
+    'battery_level': (Vitals, ('battery_level',)),
+    'scba_pressure': (Vitals, ('scba_pressure',)),
+}
+# Response key per history table
+TABLE_KEYS = {Position: 'positions', Vitals: 'vitals'}
+
+MAX_FIREFIGHTERS = 200  # Firefighter ids per request
+MAX_ROWS = 50000  # Rows per table per request; larger results are truncated
+DEFAULT_WINDOW_SECONDS = 600  # Window when the request has no `since`
+
+
+def query_history_batch(db, firefighter_ids, start, end, channels, max_rows=MAX_ROWS):
+    """Columnar history of `channels` for `firefighter_ids` with start < timestamp <= end.
+
+    Returns {'positions'|'vitals': {firefighter_id: {'timestamp': [...], field: [...]}}}
+    plus `truncated` (tables that hit `max_rows` and are therefore incomplete).
+    Raises ValueError for an unknown channel.
+    """
+    columns_by_table = {}
+    for channel in channels:
+        if channel not in HISTORY_CHANNELS:
+            raise ValueError(f"Unknown channel: {channel}")
+        model, columns = HISTORY_CHANNELS[channel]
+        table_columns = columns_by_table.setdefault(model, [])
+        table_columns.extend(column for column in columns if column not in table_columns)
+
+    result = {'truncated': []}
+    for model, columns in columns_by_table.items():
+        stmt = select(
+            model.firefighter_id, model.timestamp, *(getattr(model, column) for column in columns)
+        ).where(
+            model.firefighter_id.in_(firefighter_ids),
+            model.timestamp > start,
+            model.timestamp <= end
+        ).order_by(model.firefighter_id, model.timestamp).limit(max_rows)
+        rows = db.execute(stmt).all()
+        if len(rows) >= max_rows:
+            result['truncated'].append(TABLE_KEYS[model])
+
+        series = {}
+        for row in rows:
+            firefighter_id = row[0]
+            columnar = series.get(firefighter_id)
+            if columnar is None:
+                columnar = series[firefighter_id] = {'timestamp': []}
+                for column in columns:
+                    columnar[column] = []
+            columnar['timestamp'].append(row[1])
+            for index, column in enumerate(columns, 2):
+                columnar[column].append(row[index])
+        result[TABLE_KEYS[model]] = series
+    return result
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -13,6 +13,7 @@ class Firefighter(Base):
     name = Column(String(100), nullable=False)
     badge_number = Column(String(50), unique=True)
     team = Column(String(50))  # Team/unit name (e.g., 'RIT', 'Engine 1', etc.)
+    role = Column(String(50))  # Role within the team (used for per-role alert thresholds)
     on_mission = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -34,6 +35,12 @@ class Position(Base):
     
     # Relationship
     firefighter = relationship("Firefighter", back_populates="positions")
+    
+    __table_args__ = (
+        # Latest / `since` queries by time and `cursor` (row id) queries per firefighter
+        Index('ix_positions_firefighter_timestamp', 'firefighter_id', 'timestamp'),
+        Index('ix_positions_firefighter_id', 'firefighter_id', 'id'),
+    )
 
 
 class Vitals(Base):
@@ -51,6 +58,11 @@ class Vitals(Base):
     
     # Relationship
     firefighter = relationship("Firefighter", back_populates="vitals")
+    
+    __table_args__ = (
+        Index('ix_vitals_firefighter_timestamp', 'firefighter_id', 'timestamp'),
+        Index('ix_vitals_firefighter_id', 'firefighter_id', 'id'),
+    )
 
 
 class Alert(Base):
@@ -63,9 +75,23 @@ class Alert(Base):
     message = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     acknowledged = Column(Boolean, default=False)
+    source = Column(String(50), default='local')  # 'local' (rule engine) or upstream source name
+    remote_id = Column(String(100))  # Alert id in the upstream source (None for local alerts)
+    floor = Column(Integer)  # Floor of a correlated (aggregate) alert
+    member_count = Column(Integer, default=1)  # Number of grouped occurrences (e.g. offline beacons)
+    affected_ids = Column(Text)  # JSON list of ids covered by an aggregate alert
     
     # Relationship
     firefighter = relationship("Firefighter", back_populates="alerts")
+    
+    __table_args__ = (
+        # Makes upstream alert ingestion idempotent (ON CONFLICT DO NOTHING)
+        Index('ix_alerts_source_remote_id', 'source', 'remote_id', unique=True),
+        # Keyset pages of the alert history, optionally per firefighter or alert type
+        Index('ix_alerts_timestamp_id', 'timestamp', 'id'),
+        Index('ix_alerts_firefighter_timestamp', 'firefighter_id', 'timestamp'),
+        Index('ix_alerts_type_timestamp', 'alert_type', 'timestamp'),
+    )
 
 
 class Beacon(Base):
@@ -83,3 +109,29 @@ class Beacon(Base):
     last_seen = Column(DateTime, default=datetime.utcnow)
     is_online = Column(Boolean, default=True)
 
+
+
+class AlertArchive(Base):
+    """Append-only archive of alerts moved out of the (bounded) active alerts table"""
+    __tablename__ = 'alerts_archive'
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Same id as in the alerts table
+    firefighter_id = Column(Integer, ForeignKey('firefighters.id'), nullable=True)
+    alert_type = Column(String(50), nullable=False)
+    severity = Column(String(20), nullable=False)
+    message = Column(Text)
+    timestamp = Column(DateTime, nullable=False)
+    acknowledged = Column(Boolean, default=False)
+    source = Column(String(50), default='local')
+    remote_id = Column(String(100))
+    floor = Column(Integer)
+    member_count = Column(Integer, default=1)
+    affected_ids = Column(Text)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_alerts_archive_timestamp_id', 'timestamp', 'id'),
+        Index('ix_alerts_archive_firefighter_timestamp', 'firefighter_id', 'timestamp'),
+        Index('ix_alerts_archive_type_timestamp', 'alert_type', 'timestamp'),
+        Index('ix_alerts_archive_source_remote_id', 'source', 'remote_id', unique=True),
+    )
@@ -0,0 +1,189 @@
+"""
+Per-request profiling: wall time, SQL statement count and SQL time.
+
+`init_profiling` registers request hooks and SQLAlchemy cursor events. Every
+response gets a `Server-Timing` header (`app` - whole request, `db` - time
+in SQL statements, with their count), shown by the browser dev tools, and
+each request is added to the rolling per-route statistics in /api/metrics.
+A request with many statements (N+1 query patterns) is logged.
+
+SQL time is measured between the before/after_cursor_execute events, so it
+covers statement execution only: fetching the rows (and building ORM objects)
+happens after that and is counted in `app` but not in `db` - SQL time is
+understated, most for queries returning many rows.
+
+SQL time is attributed to the request handled by the current thread, so
+the data retriever's queries are not counted. Streamed responses are
+measured until the response starts; queries run while streaming are left out.
+
+With the `PROFILE_TOKEN` environment variable set, a request sending
+`X-Profile: <token>` is run under cProfile; the dump is written to
+PROFILE_DIR (inspect with `python -m pstats` or snakeviz) and its file name
+(relative to PROFILE_DIR - the server path is not exposed) is returned in the
+`X-Profile-Dump` header. Only the dump's location is logged.
+"""
+import cProfile
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROLLING_SAMPLES = 1000  # Requests per route kept for the statistics
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)  # Upper bounds of wall time buckets
+MANY_STATEMENTS = 50  # Requests running more SQL statements are logged
+PROFILE_HEADER = 'X-Profile'
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles')
+)
+
+
+class RequestProfile:
+    __slots__ = ('started', 'statements', 'sql_seconds', 'query_started', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.query_started = None
+        self.profiler = None
+
+
+_current = threading.local()  # .profile: RequestProfile of the request this thread handles
+_profiler_lock = threading.Lock()  # cProfile runs for one request at a time
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_current, 'profile', None)
+    if profile is not None:
+        profile.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_current, 'profile', None)
+    if profile is not None and profile.query_started is not None:
+        profile.sql_seconds += time.perf_counter() - profile.query_started
+        profile.statements += 1
+        profile.query_started = None
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class RouteStats:
+    """Rolling per-route timings for /api/metrics: the last ROLLING_SAMPLES requests of each route"""
+
+    def __init__(self, samples=ROLLING_SAMPLES):
+        self.samples = samples
+        self.routes = {}  # route -> [total requests, deque of (wall ms, statements, sql ms)]
+        self.lock = threading.Lock()
+
+    def record(self, route, wall_ms, statements, sql_ms):
+        with self.lock:
+            entry = self.routes.get(route)
+            if entry is None:
+                entry = self.routes[route] = [0, deque(maxlen=self.samples)]
+            entry[0] += 1
+            entry[1].append((wall_ms, statements, sql_ms))
+
+    def to_dict(self):
+        with self.lock:
+            routes = {route: (total, list(samples)) for route, (total, samples) in self.routes.items()}
+        result = {}
+        for route, (total, samples) in sorted(routes.items()):
+            wall = sorted(sample[0] for sample in samples)
+            sql = sorted(sample[2] for sample in samples)
+            statements = [sample[1] for sample in samples]
+            histogram = {f'<={bound}ms': 0 for bound in HISTOGRAM_BUCKETS_MS}
+            histogram[f'>{HISTOGRAM_BUCKETS_MS[-1]}ms'] = 0
+            labels = list(histogram)
+            for value in wall:
+                bucket = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if value <= bound), len(labels) - 1)
+                histogram[labels[bucket]] += 1
+            result[route] = {
+                'requests': total,
+                'window': len(samples),
+                'wall_ms': {'p50': round(_percentile(wall, 0.5), 2), 'p95': round(_percentile(wall, 0.95), 2),
+                            'p99': round(_percentile(wall, 0.99), 2), 'max': round(wall[-1], 2)},
+                'sql_ms': {'p50': round(_percentile(sql, 0.5), 2), 'p95': round(_percentile(sql, 0.95), 2)},
+                'sql_statements': {'mean': round(sum(statements) / len(statements), 1), 'max': max(statements)},
+                'histogram': histogram,
+            }
+        return result
+
+
+route_stats = RouteStats()
+
+
+def _route():
+    rule = request.url_rule
+    return f'{request.method} {rule.rule}' if rule is not None else f'{request.method} <unmatched>'
+
+
+def _start_request():
+    profile = RequestProfile()
+    token = os.environ.get('PROFILE_TOKEN')
+    if token and request.headers.get(PROFILE_HEADER) == token and _profiler_lock.acquire(blocking=False):
+        profile.profiler = cProfile.Profile()
+        profile.profiler.enable()
+    _current.profile = profile
+
+
+def _dump_profile(profiler):
+    """Write a cProfile dump of the current request; returns its file name in PROFILE_DIR"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{request.endpoint or 'unmatched'}.prof"
+    path = os.path.join(PROFILE_DIR, name)
+    profiler.dump_stats(path)
+    print(f"Profile of {request.method} {request.full_path} written to {path}")
+    return name
+
+
+def _finish_request(response):
+    profile = getattr(_current, 'profile', None)
+    if profile is None:
+        return response
+    _current.profile = None
+    if profile.profiler is not None:
+        profile.profiler.disable()
+        try:
+            response.headers['X-Profile-Dump'] = _dump_profile(profile.profiler)
+        finally:
+            _profiler_lock.release()
+
+    wall_ms = (time.perf_counter() - profile.started) * 1e3
+    sql_ms = profile.sql_seconds * 1e3
+    response.headers['Server-Timing'] = (
+        f'app;dur={wall_ms:.2f}, db;dur={sql_ms:.2f};desc="SQL x{profile.statements}, execute only"'
+    )
+    route = _route()
+    route_stats.record(route, wall_ms, profile.statements, sql_ms)
+    if profile.statements > MANY_STATEMENTS:
+        print(f"Profiling: {route} ran {profile.statements} SQL statements ({sql_ms:.1f} of {wall_ms:.1f} ms)")
+    return response
+
+
+def _clear_request(exception=None):
+    # A request that failed before after_request leaves no profile behind
+    profile = getattr(_current, 'profile', None)
+    if profile is not None:
+        _current.profile = None
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            _profiler_lock.release()
+
+
+def init_profiling(app):
+    """Profile every request of `app`. Register it before other after_request hooks
+    (e.g. compression), as those run in reverse order and should be included."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        # On the Engine class, so engines created later (benchmarks, tests) are covered too
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_clear_request)
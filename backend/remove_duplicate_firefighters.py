@@ -9,7 +9,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.database import SessionLocal
-from backend.models import Firefighter, Position, Vitals, Alert
+from backend.models import Firefighter, Position, Vitals, Alert, AlertArchive
 
 def remove_duplicate_firefighters():
     """Remove duplicate firefighters - keep TAG, remove FF"""
@@ -76,6 +76,11 @@ def remove_duplicate_firefighters():
                 })
                 print(f"  Updated {alerts_count} alerts to point to TAG version")
             
+            # Archived alerts point to the TAG version as well
+            db.query(AlertArchive).filter(AlertArchive.firefighter_id == ff_to_remove.id).update({
+                'firefighter_id': tag_to_keep.id
+            })
+            
             # Delete related records (cascade should handle this, but let's be explicit)
             db.query(Position).filter(Position.firefighter_id == ff_to_remove.id).delete()
             db.query(Vitals).filter(Vitals.firefighter_id == ff_to_remove.id).delete()
@@ -0,0 +1,310 @@
+"""
+Black-box replay: plays a recorded incident back on a virtual clock.
+
+A ReplaySession loads the history of a time range - from the live database
+or from an uploaded `format=npz` export - into the columnar arrays of
+backend/blackbox_npz.py (one firefighter's rows are contiguous and in time
+order). The roster and the alerts as of any virtual time are then a binary
+search per firefighter, so seeking costs the same anywhere in a multi-hour
+incident and nothing touches the database after loading.
+
+The clock runs at 1x-50x wall time while playing and stops at the end of the
+range. Subscribers of `stream` get a `replay-frame` event (clock, roster in
+the /api/firefighters shape, alerts raised so far) every FRAME_SECONDS while
+playing and at once after play / pause / seek / speed changes.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from backend.alert_correlator import parse_affected_ids
+from backend.blackbox import BlackboxExport
+from backend.blackbox_npz import BlackboxArchive, MISSING_INT, SYSTEM_FIREFIGHTER_ID, build_arrays
+from backend.event_bus import HEARTBEAT_SECONDS, format_event
+from backend.fieldsets import POSITION_FIELDS, VITALS_FIELDS
+
+MIN_SPEED = 1
+MAX_SPEED = 50
+FRAME_SECONDS = 0.5  # Wall time between frames of a playing stream
+ALERT_LIMIT = 100  # Most recent alerts in a frame
+MAX_SESSIONS = 8  # Open sessions kept; the least recently used one is dropped
+ACTIONS = ('play', 'pause', 'seek', 'speed')
+
+ALERT_FIELDS = ('id', 'alert_type', 'severity', 'message', 'floor', 'member_count', 'affected_ids', 'timestamp',
+                'acknowledged')
+
+
+def _values(array):
+    """Array values as JSON-ready Python values; missing ones (MISSING_INT, NaN, NaT) become None"""
+    if array.dtype.kind == 'i':
+        return [None if value == MISSING_INT else value for value in array.tolist()]
+    if array.dtype == np.float32:
+        # Shortest repr of the stored float32 (36.7, not 36.70000076293945)
+        values = [float(value) for value in array.astype(str)]
+    else:
+        values = array.tolist()
+    if array.dtype.kind == 'f':
+        return [None if value != value else value for value in values]
+    return values
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.rstrip('Z')) if isinstance(value, str) else value
+
+
+class Timeline:
+    """One history table split per firefighter, for `rows_at` lookups"""
+
+    def __init__(self, archive, table, fields):
+        data = archive.table(table, columns=list(fields))
+        self.fields = fields
+        self.timestamps = data['timestamp']
+        self.columns = {field: data[field] for field in fields}
+        ids, starts, counts = np.unique(data['firefighter_id'], return_index=True, return_counts=True)
+        self.ranges = {ff_id: (start, start + count)
+                       for ff_id, start, count in zip(ids.tolist(), starts.tolist(), counts.tolist())}
+
+    def bounds(self):
+        if not len(self.timestamps):
+            return None
+        return self.timestamps.min(), self.timestamps.max()
+
+    def rows_at(self, at):
+        """{firefighter_id: latest row with timestamp <= at} (datetime64 `at`)"""
+        found, indexes = [], []
+        for ff_id, (start, end) in self.ranges.items():
+            end = start + int(np.searchsorted(self.timestamps[start:end], at, side='right'))
+            if end > start:
+                found.append(ff_id)
+                indexes.append(end - 1)
+        if not found:
+            return {}
+        indexes = np.array(indexes)
+        columns = [_values(self.columns[field][indexes]) for field in self.fields]
+        return {ff_id: dict(zip(self.fields, row)) for ff_id, row in zip(found, zip(*columns))}
+
+
+class ReplayClock:
+    """Virtual incident time: runs at `speed` x wall time while playing, stops at `end`"""
+
+    def __init__(self, start, end, speed=MIN_SPEED):
+        self.start = start
+        self.end = end
+        self.speed = speed
+        self.position = start  # Virtual time at `anchor`
+        self.anchor = None  # Wall (monotonic) time the clock started running; None when paused
+
+    def time(self):
+        if self.anchor is None:
+            return self.position
+        current = self.position + timedelta(seconds=(time.monotonic() - self.anchor) * self.speed)
+        if current >= self.end:
+            self.position, self.anchor = self.end, None
+            return self.end
+        return current
+
+    @property
+    def playing(self):
+        return self.anchor is not None and self.time() < self.end
+
+    def play(self):
+        if self.time() >= self.end:
+            self.position = self.start  # Played to the end - start over
+        self.anchor = time.monotonic()
+
+    def pause(self):
+        self.position, self.anchor = self.time(), None
+
+    def seek(self, at):
+        self.position = min(max(at, self.start), self.end)
+        if self.anchor is not None:
+            self.anchor = time.monotonic()
+
+    def set_speed(self, speed):
+        self.position = self.time()
+        if self.anchor is not None:
+            self.anchor = time.monotonic()
+        self.speed = speed
+
+    def to_dict(self):
+        return {
+            'time': self.time(),
+            'start': self.start,
+            'end': self.end,
+            'speed': self.speed,
+            'playing': self.playing
+        }
+
+
+class ReplaySession:
+    """A loaded time range and its clock; use from_database / from_file"""
+
+    def __init__(self, archive, source):
+        self.id = secrets.token_hex(8)
+        self.source = source
+        self.firefighters = archive.firefighters
+        self.statistics = archive.statistics
+        self.positions = Timeline(archive, 'positions', POSITION_FIELDS)
+        self.vitals = Timeline(archive, 'vitals', VITALS_FIELDS)
+
+        alerts = archive.table('alerts', columns=list(ALERT_FIELDS))
+        order = np.argsort(alerts['timestamp'], kind='stable')  # All alerts in time order
+        self.alert_timestamps = alerts['timestamp'][order]
+        self.alert_columns = {field: alerts[field][order] for field in ALERT_FIELDS}
+        self.alert_firefighter_ids = alerts['firefighter_id'][order]
+
+        bounds = [b for b in (self.positions.bounds(), self.vitals.bounds()) if b is not None]
+        if len(self.alert_timestamps):
+            bounds.append((self.alert_timestamps[0], self.alert_timestamps[-1]))
+        filters = archive.meta.get('filters') or {}
+        start, end = _parse_time(filters.get('since')), _parse_time(filters.get('until'))
+        if not bounds and (start is None or end is None):
+            raise ValueError("No history in the selected range")
+        if start is None:
+            start = min(b[0] for b in bounds).item()
+        if end is None:
+            end = max(b[1] for b in bounds).item()
+        self.clock = ReplayClock(start, max(start, end))
+        self.version = 0  # Bumped on every control action, wakes up the streams
+        self.closed = False
+        self.condition = threading.Condition()
+
+    @classmethod
+    def from_database(cls, db, firefighter_ids=None, since=None, until=None):
+        """Load since < timestamp <= until of the live database"""
+        return cls(BlackboxArchive(build_arrays(BlackboxExport(db, firefighter_ids, since, until))), 'database')
+
+    @classmethod
+    def from_file(cls, file):
+        """Load a `format=npz` black-box export (path or file object)"""
+        return cls(BlackboxArchive(file), 'file')
+
+    def control(self, action, at=None, speed=None):
+        """Apply play / pause / seek (to `at`) / speed (to `speed`); raises ValueError for bad arguments"""
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        if action == 'seek' and at is None:
+            raise ValueError("seek needs a time")
+        if action == 'speed' and (speed is None or not MIN_SPEED <= speed <= MAX_SPEED):
+            raise ValueError(f"speed must be between {MIN_SPEED} and {MAX_SPEED}")
+        with self.condition:
+            if action == 'play':
+                self.clock.play()
+            elif action == 'pause':
+                self.clock.pause()
+            elif action == 'seek':
+                self.clock.seek(at)
+            else:
+                self.clock.set_speed(speed)
+            self.version += 1
+            self.condition.notify_all()
+
+    def roster_at(self, at):
+        """Firefighters as returned by /api/firefighters, as of virtual time `at`"""
+        at = np.datetime64(at, 'us')
+        positions = self.positions.rows_at(at)
+        vitals = self.vitals.rows_at(at)
+        return [{
+            'id': ff['id'],
+            'name': ff['name'],
+            'badge_number': ff['badge_number'],
+            'team': ff['team'] or '',
+            'on_mission': bool(ff['on_mission']),
+            'scba_prediction': None,  # Predictions are made live only
+            'position': positions.get(ff['id']),
+            'vitals': vitals.get(ff['id'])
+        } for ff in self.firefighters]
+
+    def alerts_at(self, at, limit=ALERT_LIMIT):
+        """Alerts raised up to virtual time `at`, newest first. The export has no acknowledgement
+        times, so `acknowledged` is the alert's final state."""
+        end = int(np.searchsorted(self.alert_timestamps, np.datetime64(at, 'us'), side='right'))
+        window = slice(max(0, end - limit), end)
+        columns = {field: _values(self.alert_columns[field][window]) for field in ALERT_FIELDS}
+        firefighter_ids = self.alert_firefighter_ids[window].tolist()
+        alerts = []
+        for i in reversed(range(len(firefighter_ids))):
+            alert = {field: columns[field][i] for field in ALERT_FIELDS}
+            alert['firefighter_id'] = None if firefighter_ids[i] == SYSTEM_FIREFIGHTER_ID else firefighter_ids[i]
+            alert['member_count'] = alert['member_count'] or 1
+            alert['affected_ids'] = parse_affected_ids(alert['affected_ids'])
+            alerts.append(alert)
+        return alerts
+
+    def time(self):
+        with self.condition:
+            return self.clock.time()
+
+    def frame(self):
+        """Clock, roster and alerts as of the current virtual time"""
+        with self.condition:
+            clock = self.clock.to_dict()
+        return {'clock': clock, 'firefighters': self.roster_at(clock['time']), 'alerts': self.alerts_at(clock['time'])}
+
+    def to_dict(self):
+        with self.condition:
+            clock = self.clock.to_dict()
+        return {'id': self.id, 'source': self.source, 'statistics': self.statistics, 'clock': clock}
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stream(self, frame_seconds=FRAME_SECONDS, heartbeat=HEARTBEAT_SECONDS):
+        """Generate the SSE stream of replay frames for one subscriber"""
+        yield "retry: 3000\n\n"
+        sent_version, sent_time = None, None
+        while not self.closed:
+            with self.condition:
+                timeout = frame_seconds if self.clock.playing else heartbeat
+                self.condition.wait_for(lambda: self.version != sent_version or self.closed, timeout)
+                if self.closed:
+                    return
+                changed = self.version != sent_version or self.clock.time() != sent_time
+                sent_version = self.version
+            if not changed:
+                yield ": heartbeat\n\n"
+                continue
+            frame = self.frame()
+            sent_time = frame['clock']['time']
+            yield format_event(None, 'replay-frame', frame)
+
+
+class ReplayManager:
+    """Open replay sessions by id"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, session):
+        with self.lock:
+            self.sessions[session.id] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)[1].close()
+        return session
+
+    def get(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def close(self):
+        """End all replay streams (server shutdown)"""
+        with self.lock:
+            sessions, self.sessions = list(self.sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
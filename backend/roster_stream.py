@@ -0,0 +1,138 @@
+"""
+Live roster state and delta stream.
+
+The data retriever writes each firefighter's latest state (same shape as
+/api/firefighters) into RosterStream as it ingests samples. Changes are
+diffed per field and published once per ingest cycle as a single
+`roster-delta` event, so the cost of the stream follows the rate of change:
+a client gets one full `snapshot` on connect and afterwards only the fields
+that changed. Subscribers may filter by floor and/or team; firefighters
+entering a filtered view are sent in full and leaving ones are sent as
+`{'id': ..., 'removed': True}`.
+"""
+import threading
+from backend.event_bus import EventBus, HEARTBEAT_SECONDS, format_event
+
+
+def entry_floor(entry):
+    position = entry.get('position')
+    return position.get('floor') if position else None
+
+
+def diff_entry(old, new):
+    """Changed fields of `new` against `old`; nested dicts are diffed one level deep"""
+    delta = {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if value == previous:
+            continue
+        if isinstance(value, dict) and isinstance(previous, dict):
+            delta[key] = {k: v for k, v in value.items() if previous.get(k) != v}
+        else:
+            delta[key] = value
+    return delta
+
+
+class RosterStream:
+    def __init__(self):
+        self.entries = {}  # firefighter_id -> latest entry (replaced, never mutated)
+        self.changes = {}  # firefighter_id -> delta accumulated since the last publish
+        self.lock = threading.Lock()
+        self.events = EventBus()
+
+    def update(self, firefighter_id, fields):
+        """Merge new field values into a firefighter's entry and record what changed"""
+        with self.lock:
+            old = self.entries.get(firefighter_id) or {'id': firefighter_id}
+            new = dict(old, **fields)
+            delta = diff_entry(old, new)
+            if not delta:
+                return
+            self.entries[firefighter_id] = new
+            pending = self.changes.setdefault(firefighter_id, {'id': firefighter_id})
+            for key, value in delta.items():
+                if isinstance(value, dict) and isinstance(pending.get(key), dict):
+                    pending[key] = dict(pending[key], **value)
+                else:
+                    pending[key] = value
+
+    def publish(self):
+        """Publish changes accumulated since the last call as one roster-delta event"""
+        with self.lock:
+            if not self.changes:
+                return None
+            changes = list(self.changes.values())
+            self.changes = {}
+            return self.events.publish('roster-delta', {'firefighters': changes})
+
+    def _matches(self, entry, floor, team):
+        if entry is None:
+            return False
+        if floor is not None and entry_floor(entry) != floor:
+            return False
+        if team is not None and entry.get('team') != team:
+            return False
+        return True
+
+    def snapshot(self, floor=None, team=None):
+        """Return (event id, entries matching the filter) taken atomically"""
+        with self.lock:
+            entries = [entry for entry in self.entries.values() if self._matches(entry, floor, team)]
+            return self.events.last_id, entries
+
+    def stream(self, last_id=None, floor=None, team=None, heartbeat=HEARTBEAT_SECONDS):
+        """Generate the SSE stream for one subscriber"""
+        yield "retry: 3000\n\n"
+        unfiltered = floor is None and team is None
+        events, missed = [], True
+        if last_id is not None and last_id <= self.events.last_id:
+            events, missed = self.events.since(last_id)
+
+        if missed:
+            cursor, entries = self.snapshot(floor, team)
+            yield format_event(cursor, 'snapshot', {'firefighters': entries})
+            events = []
+        else:
+            cursor = last_id
+        visible = {entry['id'] for entry in self.snapshot(floor, team)[1]}
+
+        while not self.events.closed:
+            if not events:
+                events, missed = self.events.wait(cursor, heartbeat)
+                if missed:
+                    # Too far behind - start over with a fresh snapshot
+                    cursor, entries = self.snapshot(floor, team)
+                    visible = {entry['id'] for entry in entries}
+                    yield format_event(cursor, 'snapshot', {'firefighters': entries})
+                    events = []
+                    continue
+                if not events:
+                    yield ": heartbeat\n\n"
+                    continue
+
+            for event_id, event, payload, data in events:
+                cursor = event_id
+                if unfiltered:
+                    yield f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+                    continue
+                changes = self._filter(data['firefighters'], floor, team, visible)
+                if changes:
+                    yield format_event(event_id, event, {'firefighters': changes})
+            events = []
+
+    def _filter(self, changes, floor, team, visible):
+        """Deltas for a filtered subscriber; updates its set of visible firefighters"""
+        result = []
+        for change in changes:
+            firefighter_id = change['id']
+            entry = self.entries.get(firefighter_id)
+            if self._matches(entry, floor, team):
+                if firefighter_id in visible:
+                    result.append(change)
+                else:
+                    visible.add(firefighter_id)
+                    result.append(entry)  # Entered the view - send everything
+            elif firefighter_id in visible:
+                visible.discard(firefighter_id)
+                result.append({'id': firefighter_id, 'removed': True})
+        return result
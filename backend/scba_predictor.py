@@ -0,0 +1,130 @@
+"""
+Incremental SCBA air-remaining predictor.
+
+Keeps the last cylinder pressure and an exponentially weighted (time-aware
+EWMA) consumption rate per firefighter in NumPy arrays. Each pressure sample
+updates one row in O(1); time-to-reserve and time-to-empty are computed for
+the whole roster in one vectorized pass. State warms up from live samples -
+a rate is available once a firefighter has been sampled for RATE_WARMUP_S.
+"""
+from datetime import datetime
+import numpy as np
+
+RESERVE_PRESSURE_BAR = 50  # Reserve level (same as the scba_critical threshold)
+EMPTY_PRESSURE_BAR = 0
+RATE_TIME_CONSTANT_S = 60  # EWMA time constant of the consumption rate
+MIN_CONSUMPTION_BAR_S = 0.001  # Slower consumption counts as "not breathing from the cylinder"
+RATE_WARMUP_S = 10  # Minimum span of the first rate estimate, so sensor noise is not extrapolated
+REFILL_JUMP_BAR = 20  # Pressure rise above this means a cylinder swap - restart the estimate
+LOW_AIR_MINUTES = 5  # Raise 'scba_time_low' when predicted time to reserve drops below this
+
+
+def _to_epoch(timestamp):
+    return (timestamp - datetime(1970, 1, 1)).total_seconds()
+
+
+class ScbaPredictor:
+    def __init__(self, capacity=64, reserve_bar=RESERVE_PRESSURE_BAR, empty_bar=EMPTY_PRESSURE_BAR,
+                 time_constant_s=RATE_TIME_CONSTANT_S):
+        self.reserve_bar = reserve_bar
+        self.empty_bar = empty_bar
+        self.time_constant_s = time_constant_s
+        self.size = 0
+        self.slots = {}  # firefighter_id -> row
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.pressure = np.full(capacity, np.nan)  # Last pressure (bar)
+        self.sampled_at = np.full(capacity, np.nan)  # Time of the last pressure sample (epoch seconds)
+        self.rate = np.full(capacity, np.nan)  # Smoothed consumption (bar/s), NaN until known
+
+    def _slot(self, firefighter_id):
+        row = self.slots.get(firefighter_id)
+        if row is None:
+            if self.size == len(self.ids):
+                capacity = len(self.ids) * 2
+                self.ids = np.resize(self.ids, capacity)
+                for name in ('pressure', 'sampled_at', 'rate'):
+                    grown = np.full(capacity, np.nan)
+                    grown[:self.size] = getattr(self, name)[:self.size]
+                    setattr(self, name, grown)
+            row = self.size
+            self.size += 1
+            self.slots[firefighter_id] = row
+            self.ids[row] = firefighter_id
+        return row
+
+    def update(self, firefighter_id, pressure, timestamp=None):
+        """Record a cylinder pressure sample (None/invalid values are ignored)"""
+        try:
+            pressure = float(pressure)
+        except (TypeError, ValueError):
+            return
+        if np.isnan(pressure):
+            return
+
+        now = _to_epoch(timestamp or datetime.utcnow())
+        row = self._slot(firefighter_id)
+        last_pressure = self.pressure[row]
+        dt = now - self.sampled_at[row]
+
+        if np.isnan(last_pressure) or pressure - last_pressure > REFILL_JUMP_BAR:
+            # First sample or new cylinder
+            self.rate[row] = np.nan
+        elif np.isnan(self.rate[row]):
+            if dt < RATE_WARMUP_S:
+                return  # Keep the first sample as the reference until the span is long enough
+            self.rate[row] = max(0.0, (last_pressure - pressure) / dt)
+        elif dt > 0:
+            instant = max(0.0, (last_pressure - pressure) / dt)
+            alpha = 1.0 - np.exp(-dt / self.time_constant_s)
+            self.rate[row] += alpha * (instant - self.rate[row])
+        else:
+            return  # Out-of-order or duplicate sample
+
+        self.pressure[row] = pressure
+        self.sampled_at[row] = now
+
+    def predict(self, now=None):
+        """Vectorized prediction for the whole roster.
+
+        Returns (ids, minutes_to_reserve, minutes_to_empty, consumption_bar_per_min);
+        times are NaN while the rate is unknown and inf when no air is being used.
+        """
+        n = self.size
+        elapsed = _to_epoch(now or datetime.utcnow()) - self.sampled_at[:n]
+        rate = self.rate[:n]
+        pressure = self.pressure[:n]
+        consuming = rate >= MIN_CONSUMPTION_BAR_S
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            to_reserve = np.where(consuming, (pressure - self.reserve_bar) / rate - elapsed, np.inf) / 60
+            to_empty = np.where(consuming, (pressure - self.empty_bar) / rate - elapsed, np.inf) / 60
+        unknown = np.isnan(rate)
+        to_reserve[unknown] = np.nan
+        to_empty[unknown] = np.nan
+        return self.ids[:n], np.maximum(to_reserve, 0), np.maximum(to_empty, 0), rate * 60
+
+    def predictions(self, now=None):
+        """Return {firefighter_id: {...}} with rounded predictions for API responses"""
+        ids, to_reserve, to_empty, consumption = self.predict(now)
+        result = {}
+        for i, firefighter_id in enumerate(ids.tolist()):
+            result[firefighter_id] = {
+                'minutes_to_reserve': _round(to_reserve[i]),
+                'minutes_to_empty': _round(to_empty[i]),
+                'consumption_bar_per_min': _round(consumption[i]),
+            }
+        return result
+
+    def low_air(self, minutes=LOW_AIR_MINUTES, now=None):
+        """Firefighters above reserve whose predicted time to reserve is below `minutes`"""
+        ids, to_reserve, _, _ = self.predict(now)
+        # Below reserve is already covered by the scba_critical pressure rule
+        above_reserve = self.pressure[:self.size] > self.reserve_bar
+        return ids[(to_reserve < minutes) & above_reserve].tolist()
+
+
+def _round(value):
+    """JSON-friendly value: None for unknown or unlimited"""
+    if not np.isfinite(value):
+        return None
+    return round(float(value), 1)
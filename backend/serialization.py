@@ -0,0 +1,72 @@
+"""
+Response serialization: orjson for JSON, MessagePack on request.
+
+orjson serializes datetimes (as ISO 8601, same as `.isoformat()`) and NumPy
+arrays natively, so serializers can hand over raw values instead of
+formatting every row in Python. `FastJSONProvider` plugs it into Flask, so
+every `jsonify` uses it; clients sending `Accept: application/msgpack` get
+the same data as MessagePack (if the msgpack package is installed).
+"""
+from datetime import date, datetime
+import numpy as np
+import orjson
+from flask import has_request_context, request
+from flask.json.provider import JSONProvider
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # Optional - JSON is served instead
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Types orjson / msgpack don't serialize natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps(data):
+    """Serialize to JSON (bytes)"""
+    return orjson.dumps(data, default=_default, option=JSON_OPTIONS)
+
+
+def packb(data):
+    """Serialize to MessagePack (bytes); datetimes become ISO 8601 strings as in JSON"""
+    return msgpack.packb(data, default=_default, datetime=False)
+
+
+def wants_msgpack():
+    """Whether the current request prefers MessagePack over JSON"""
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider using orjson, answering with MessagePack when the client asks for it"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if wants_msgpack():
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = self._app.response_class(dumps(obj), mimetype='application/json')
+        response.vary.add('Accept')
+        return response
@@ -0,0 +1,76 @@
+"""
+JSON-ready dicts for API responses and pushed events.
+
+Shared by the API and the data retriever so polled responses and streamed
+events have the same shape. Datetimes are left as they are - they are
+formatted as ISO 8601 by backend/serialization.py.
+"""
+from backend.alert_correlator import parse_affected_ids
+
+
+def alert_to_dict(alert):
+    """Alert (ORM object or archive/history row) as returned by /api/alerts"""
+    return {
+        'id': alert.id,
+        'firefighter_id': alert.firefighter_id,
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'message': alert.message,
+        'floor': alert.floor,
+        'member_count': alert.member_count or 1,
+        'affected_ids': parse_affected_ids(alert.affected_ids),
+        'timestamp': alert.timestamp
+    }
+
+
+def position_to_dict(position):
+    return {
+        'latitude': position.latitude,
+        'longitude': position.longitude,
+        'floor': position.floor,
+        'timestamp': position.timestamp
+    }
+
+
+def vitals_to_dict(vitals):
+    return {
+        'heart_rate': vitals.heart_rate,
+        'temperature': vitals.temperature,
+        'oxygen_level': vitals.oxygen_level,
+        'co_level': vitals.co_level,
+        'battery_level': vitals.battery_level,
+        'scba_pressure': vitals.scba_pressure,
+        'timestamp': vitals.timestamp
+    }
+
+
+def beacon_to_dict(beacon):
+    """Beacon as returned by /api/beacons"""
+    return {
+        'id': beacon.id,
+        'beacon_id': beacon.beacon_id,
+        'name': beacon.name,
+        'latitude': beacon.latitude,
+        'longitude': beacon.longitude,
+        'floor': beacon.floor,
+        'battery_percent': beacon.battery_percent,
+        'signal_quality': beacon.signal_quality,
+        'tags_in_range': beacon.tags_in_range,
+        'last_seen': beacon.last_seen,
+        'is_online': beacon.is_online,
+        'status': 'active' if beacon.is_online else 'inactive'
+    }
+
+
+def firefighter_to_dict(firefighter, position=None, vitals=None, scba_prediction=None):
+    """Firefighter with latest position and vitals as returned by /api/firefighters"""
+    return {
+        'id': firefighter.id,
+        'name': firefighter.name,
+        'badge_number': firefighter.badge_number,
+        'team': getattr(firefighter, 'team', None) or '',
+        'on_mission': bool(getattr(firefighter, 'on_mission', False)),
+        'scba_prediction': scba_prediction,
+        'position': position_to_dict(position) if position else None,
+        'vitals': vitals_to_dict(vitals) if vitals else None,
+    }
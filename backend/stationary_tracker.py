@@ -0,0 +1,75 @@
+"""
+Incremental stationary (MAN-DOWN) tracker.
+
+Keeps an anchor position and a "stationary since" timestamp per firefighter.
+Each position sample is compared with the anchor only, so updates are O(1);
+the anchor moves when the firefighter gets further than the motion threshold
+from it. Ingest (retriever, simulator) writes samples and the API reads the
+resulting state instead of scanning position history.
+"""
+from datetime import datetime
+from math import sqrt, cos
+
+# Defaults shared by ingest and API; configured in the `stationary` section of alert_rules.json
+MOTION_THRESHOLD_M = 5  # Movement below this distance (meters) counts as no movement
+MAN_DOWN_SECONDS = 60  # Time without movement before MAN-DOWN / 'bezruch'
+
+
+def flat_distance_m(lat1, lon1, lat2, lon2):
+    """Approximate distance in meters between two nearby GPS points"""
+    lat_diff = abs(lat2 - lat1) * 111000
+    lon_diff = abs(lon2 - lon1) * 111000 * cos(lat1 * 3.14159 / 180)
+    return sqrt(lat_diff**2 + lon_diff**2)
+
+
+class StationaryTracker:
+    def __init__(self, motion_threshold_m=MOTION_THRESHOLD_M, man_down_seconds=MAN_DOWN_SECONDS):
+        self.motion_threshold_m = motion_threshold_m
+        self.man_down_seconds = man_down_seconds
+        # firefighter_id -> (anchor_lat, anchor_lon, stationary_since); tuples are replaced,
+        # never mutated, so API threads can read without locking
+        self.anchors = {}
+
+    def configure(self, motion_threshold_m, man_down_seconds):
+        """Apply new thresholds (e.g. after the rule file was reloaded)"""
+        self.motion_threshold_m = motion_threshold_m
+        self.man_down_seconds = man_down_seconds
+
+    def update(self, firefighter_id, latitude, longitude, timestamp=None):
+        """Record a position sample, return seconds stationary as of this sample"""
+        timestamp = timestamp or datetime.utcnow()
+        anchor = self.anchors.get(firefighter_id)
+
+        if anchor is None or flat_distance_m(anchor[0], anchor[1], latitude, longitude) > self.motion_threshold_m:
+            # First sample or moved - start a new stationary period at this position
+            anchor = (latitude, longitude, timestamp)
+            self.anchors[firefighter_id] = anchor
+
+        return (timestamp - anchor[2]).total_seconds()
+
+    def seed(self, firefighter_id, positions):
+        """Initialize state from stored history (newest first), e.g. at startup"""
+        if not positions:
+            return
+        first_pos = positions[0]
+        stationary_since = first_pos.timestamp
+        for pos in positions[1:]:
+            if flat_distance_m(first_pos.latitude, first_pos.longitude, pos.latitude, pos.longitude) > self.motion_threshold_m:
+                break
+            stationary_since = pos.timestamp
+        self.anchors[firefighter_id] = (first_pos.latitude, first_pos.longitude, stationary_since)
+
+    def stationary_since(self, firefighter_id):
+        anchor = self.anchors.get(firefighter_id)
+        return anchor[2] if anchor else None
+
+    def time_stationary(self, firefighter_id, now=None):
+        """Seconds since the firefighter last moved (0 if unknown)"""
+        anchor = self.anchors.get(firefighter_id)
+        if anchor is None:
+            return 0
+        return max(0.0, ((now or datetime.utcnow()) - anchor[2]).total_seconds())
+
+    def is_stationary(self, firefighter_id, now=None):
+        """True if the firefighter has not moved for at least man_down_seconds"""
+        return self.time_stationary(firefighter_id, now) >= self.man_down_seconds
@@ -0,0 +1,58 @@
+"""
+Shared setup for API benchmarks.
+
+Points the backend at a throwaway SQLite database and imports the Flask app
+without starting the data retriever (which would poll the simulator API).
+"""
+import sys
+import os
+
+# Add parent directory to Python path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import tempfile
+import time
+from contextlib import redirect_stdout
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import backend.database as database
+
+DB_PATH = tempfile.mktemp(suffix='.db')
+database.engine = create_engine(f'sqlite:///{DB_PATH}')
+database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=database.engine)
+
+from backend.data_retriever import DataRetriever
+DataRetriever.start = lambda self: None
+
+with redirect_stdout(io.StringIO()):
+    import api.app as api_app
+    database.init_db()
+
+BUILDING = {
+    'name': 'Benchmark Building',
+    'floors': [{'index': floor, 'name': f'Piętro {floor}'} for floor in range(3)],
+    'gps_reference': {'origin': {'lat': 52.2297, 'lon': 21.0122}}
+}
+api_app.building_cache.data = BUILDING
+api_app.building_cache.fetched_at = time.time()
+
+
+def measure(client, urls, runs, headers=None):
+    """Median latency (ms) and total size (bytes) of requesting all `urls` once"""
+    timings = []
+    size = 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        with redirect_stdout(io.StringIO()):  # The API logs to stdout
+            # Bodies are read inside the timed region - streamed responses are generated only then
+            bodies = [client.get(url, headers=headers).get_data() for url in urls]
+        timings.append((time.perf_counter() - t0) * 1e3)
+        size = sum(len(body) for body in bodies)
+    timings.sort()
+    return timings[len(timings) // 2], size
+
+
+def cleanup():
+    database.engine.dispose()
+    os.remove(DB_PATH)
@@ -0,0 +1,120 @@
+"""
+Benchmark for the streaming black-box export.
+
+Fills a temporary database with a long incident and downloads the export
+as JSON and NDJSON, consuming the stream chunk by chunk: time to the first
+byte, total time, size and - in a second run, as tracemalloc slows
+allocations down - peak Python memory while streaming. For comparison the same export is also joined into one bytes
+object, like the former export built it in memory. The columnar `npz`
+format is measured by export time and size, and by how long the reader
+takes to open the archive, read one firefighter's vitals for a 10 minute
+window and read a whole table - compared with parsing the JSON export.
+"""
+import io
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+from api_setup import api_app, database, cleanup
+from backend.models import Firefighter, Position, Vitals
+from backend.blackbox_npz import BlackboxArchive
+
+FIREFIGHTERS = 20
+SAMPLES = 10000  # Position and vitals rows per firefighter
+
+
+def seed():
+    db = database.SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.add_all([Firefighter(name=f'Strażak {i}', badge_number=f'FF-{i:03}', team='RIT') for i in range(FIREFIGHTERS)])
+        db.flush()
+        for ff in db.query(Firefighter).all():
+            timestamps = [now - timedelta(seconds=1.5 * (SAMPLES - step)) for step in range(SAMPLES)]
+            db.bulk_insert_mappings(Position, [{
+                'firefighter_id': ff.id, 'latitude': 52.2297 + random.uniform(-1e-4, 1e-4),
+                'longitude': 21.0122 + random.uniform(-1e-4, 1e-4), 'floor': 1, 'timestamp': timestamp
+            } for timestamp in timestamps])
+            db.bulk_insert_mappings(Vitals, [{
+                'firefighter_id': ff.id, 'heart_rate': random.randint(60, 200), 'temperature': 37.0,
+                'oxygen_level': 20.9, 'co_level': random.uniform(0, 40), 'battery_level': random.uniform(0, 100),
+                'scba_pressure': random.uniform(0, 300), 'timestamp': timestamp
+            } for timestamp in timestamps])
+        db.commit()
+    finally:
+        db.close()
+
+
+def download(client, url, join):
+    """(first byte ms, total ms, size)"""
+    t0 = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    chunks = []
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = (time.perf_counter() - t0) * 1e3
+        size += len(chunk)
+        if join:
+            chunks.append(chunk)
+    if join:
+        data = b''.join(chunks)
+    response.close()
+    return first_byte, (time.perf_counter() - t0) * 1e3, size
+
+
+def peak_memory(client, url, join):
+    """Peak traced memory (MiB) of a download"""
+    tracemalloc.start()
+    download(client, url, join)
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    random.seed(0)
+    seed()
+    client = api_app.app.test_client()
+
+    print(f"Black-box export benchmark - {FIREFIGHTERS} firefighters x {SAMPLES} positions and vitals")
+    print("-" * 92)
+    for name, url, join in [('json, streamed', '/api/export/blackbox', False),
+                            ('ndjson, streamed', '/api/export/blackbox?format=ndjson', False),
+                            ('json, joined in memory', '/api/export/blackbox', True)]:
+        first_byte, total, size = download(client, url, join)
+        peak = peak_memory(client, url, join)
+        print(f"{name:24} | first byte {first_byte:7.1f} ms | total {total:8.1f} ms | "
+              f"{size / 2 ** 20:6.1f} MiB | peak memory {peak:6.1f} MiB")
+
+
+    t0 = time.perf_counter()
+    response = client.get('/api/export/blackbox?format=npz')
+    export_ms = (time.perf_counter() - t0) * 1e3
+    print(f"{'npz':24} | export {export_ms:8.1f} ms | {len(response.data) / 2 ** 20:6.1f} MiB")
+
+    t0 = time.perf_counter()
+    archive = BlackboxArchive(io.BytesIO(response.data))
+    open_ms = (time.perf_counter() - t0) * 1e3
+    end = archive.table('vitals', firefighter_id=1, columns=['timestamp'])['timestamp'][-1]
+    t0 = time.perf_counter()
+    window = archive.table('vitals', firefighter_id=1, since=end - np.timedelta64(10, 'm'), until=end)
+    window_ms = (time.perf_counter() - t0) * 1e3
+    t0 = time.perf_counter()
+    vitals = archive.table('positions')
+    table_ms = (time.perf_counter() - t0) * 1e3
+    t0 = time.perf_counter()
+    json.loads(client.get('/api/export/blackbox').data)
+    json_ms = (time.perf_counter() - t0) * 1e3
+    print(f"{'npz reader':24} | open {open_ms:5.1f} ms | 10 min of one firefighter ({len(window['id'])} rows) "
+          f"{window_ms:5.1f} ms | all positions ({len(vitals['id'])} rows) {table_ms:6.1f} ms")
+    print(f"{'json export + parse':24} | {json_ms:8.1f} ms")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
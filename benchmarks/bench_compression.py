@@ -0,0 +1,45 @@
+"""
+Benchmark for gzip / brotli response compression.
+
+Requests the largest API responses (roster, history, alert archive, black
+box) without compression and with each encoding the server offers, and
+reports latency and transferred size per endpoint.
+"""
+import random
+from api_setup import api_app, measure, cleanup
+from bench_snapshot import seed, FIREFIGHTERS, HISTORY
+from backend import compression
+
+RUNS = 10
+
+ENDPOINTS = [
+    '/api/firefighters',
+    '/api/snapshot',
+    '/api/firefighters/1/vitals?limit=500',
+    '/api/history?ids=' + ','.join(str(i) for i in range(1, FIREFIGHTERS + 1)),
+    '/api/alerts/all?acknowledged=true',
+    '/api/export/blackbox',
+]
+
+
+def main():
+    random.seed(0)
+    seed()
+    client = api_app.app.test_client()
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+
+    print(f"Compression benchmark - {FIREFIGHTERS} firefighters x {HISTORY} samples (median of {RUNS} requests)")
+    print("-" * 100)
+    print(f"{'endpoint':45} | " + " | ".join(f"{encoding:>18}" for encoding in encodings))
+    for url in ENDPOINTS:
+        cells = []
+        for encoding in encodings:
+            ms, size = measure(client, [url], RUNS, headers={'Accept-Encoding': encoding})
+            cells.append(f"{ms:6.2f} ms {size / 1024:6.1f} KiB")
+        print(f"{url[:45]:45} | " + " | ".join(cells))
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
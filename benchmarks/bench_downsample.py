@@ -0,0 +1,68 @@
+"""
+Benchmark for `points=N` (LTTB) downsampling of the vitals history endpoint.
+
+Stores 24 h of vitals (one sample per 1.5 s) for one firefighter and compares
+raw responses with downsampled ones for 1 h, 8 h and 24 h windows: latency,
+response size and number of points.
+"""
+import math
+import random
+from datetime import datetime, timedelta
+from api_setup import api_app, database, measure, cleanup
+from backend.models import Firefighter, Vitals
+
+HOURS = 24
+INTERVAL_SECONDS = 1.5
+POINTS = 500
+RUNS = 5
+
+
+def seed():
+    """Returns the end of the stored history"""
+    db = database.SessionLocal()
+    try:
+        firefighter = Firefighter(name='Strażak 1', badge_number='FF-001', team='RIT')
+        db.add(firefighter)
+        db.flush()
+        end = datetime.utcnow()
+        samples = int(HOURS * 3600 / INTERVAL_SECONDS)
+        rows = []
+        for i in range(samples):
+            rows.append({
+                'firefighter_id': firefighter.id,
+                'heart_rate': int(110 + 40 * math.sin(i / 400) + random.gauss(0, 8) + (70 if i % 5000 == 0 else 0)),
+                'temperature': 37.0, 'oxygen_level': 20.9, 'co_level': random.uniform(0, 40),
+                'battery_level': 100 - 80 * i / samples, 'scba_pressure': 300 - (i % 1200) / 4,
+                'timestamp': end - timedelta(seconds=INTERVAL_SECONDS * (samples - i))
+            })
+        db.bulk_insert_mappings(Vitals, rows)
+        db.commit()
+        return firefighter.id, end
+    finally:
+        db.close()
+
+
+def main():
+    random.seed(0)
+    firefighter_id, end = seed()
+    client = api_app.app.test_client()
+
+    print(f"Downsampling benchmark - vitals every {INTERVAL_SECONDS} s for {HOURS} h, points={POINTS}")
+    print("-" * 80)
+    for hours in (1, 8, 24):
+        since = (end - timedelta(hours=hours)).isoformat()
+        base = f'/api/firefighters/{firefighter_id}/vitals?since={since}'
+        raw_url = f'{base}&limit=1000000'
+        sampled_url = f'{base}&points={POINTS}'
+        raw_ms, raw_size = measure(client, [raw_url], RUNS)
+        sampled_ms, sampled_size = measure(client, [sampled_url], RUNS)
+        raw_points = len(client.get(raw_url).json)
+        sampled_points = len(client.get(sampled_url).json)
+        print(f"{hours:2} h | raw: {raw_points:6} points {raw_ms:8.1f} ms {raw_size / 1024:8.1f} KiB | "
+              f"points={POINTS}: {sampled_points:4} points {sampled_ms:7.1f} ms {sampled_size / 1024:6.1f} KiB")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark for `fields=` sparse fieldsets on /api/firefighters.
+
+Compares the full roster with the projections the views need: latency and
+response size (JSON and MessagePack). Part of the latency difference comes
+from the query shape: the full roster looks up position and vitals per
+firefighter, projections read the latest rows of each table in one query.
+"""
+import random
+from api_setup import api_app, measure, cleanup
+from bench_snapshot import seed, FIREFIGHTERS, HISTORY
+
+RUNS = 30
+
+FIELDSETS = [
+    None,
+    'id,name',
+    'team,on_mission,vitals.battery_level',
+    'name,badge_number,team,position.floor',
+    'position,vitals',
+]
+
+
+def main():
+    random.seed(0)
+    seed()
+    client = api_app.app.test_client()
+
+    print(f"Sparse fieldset benchmark - {FIREFIGHTERS} firefighters x {HISTORY} samples (median of {RUNS} requests)")
+    print("-" * 90)
+    print(f"{'fields':40} | {'json':>18} | {'msgpack':>18}")
+    for fields in FIELDSETS:
+        url = '/api/firefighters' + (f'?fields={fields}' if fields else '')
+        json_ms, json_size = measure(client, [url], RUNS)
+        msgpack_ms, msgpack_size = measure(client, [url], RUNS, headers={'Accept': 'application/msgpack'})
+        print(f"{fields or '(all)':40} | {json_ms:6.2f} ms {json_size / 1024:6.1f} KiB | "
+              f"{msgpack_ms:6.2f} ms {msgpack_size / 1024:6.1f} KiB")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for the request profiling middleware (backend/profiling.py).
+
+Fills a temporary database with a crew, its history, beacons and alerts,
+requests the main endpoints and prints the SQL statements and SQL time the
+middleware reports in the Server-Timing header of each URL (per URL, as
+/api/metrics merges the query string variants of a route) - which surfaces
+the endpoints running one query per firefighter. Then measures
+the middleware's own overhead (the same requests with the hooks removed)
+and takes one cProfile dump through the `X-Profile` header.
+"""
+import io
+import os
+import random
+import re
+from contextlib import redirect_stdout
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from api_setup import api_app, measure, cleanup
+from bench_snapshot import seed, FIREFIGHTERS, HISTORY
+from backend import profiling
+
+RUNS = 30
+URLS = [
+    '/api/firefighters',
+    '/api/firefighters?fields=id,name,vitals',
+    '/api/firefighters/all',
+    '/api/beacons/1/firefighters',
+    '/api/alerts',
+    '/api/beacons',
+    '/api/snapshot',
+    '/api/firefighters/1/vitals?limit=100',
+]
+
+
+def set_hooks(app, enabled):
+    hooks = ((app.before_request_funcs, profiling._start_request), (app.after_request_funcs, profiling._finish_request),
+             (app.teardown_request_funcs, profiling._clear_request))
+    events = (('before_cursor_execute', profiling._before_cursor_execute),
+              ('after_cursor_execute', profiling._after_cursor_execute))
+    for registry, hook in hooks:
+        functions = registry.setdefault(None, [])
+        if enabled and hook not in functions:
+            # Before the compression hook, as init_profiling registers it
+            functions.insert(0, hook)
+        elif not enabled and hook in functions:
+            functions.remove(hook)
+    for name, listener in events:
+        if enabled and not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+        elif not enabled and event.contains(Engine, name, listener):
+            event.remove(Engine, name, listener)
+
+
+def main():
+    random.seed(0)
+    seed()
+    client = api_app.app.test_client()
+    headers = {'Accept-Encoding': 'identity'}
+
+    print(f"Profiling benchmark - {FIREFIGHTERS} firefighters x {HISTORY} samples")
+    print("-" * 104)
+    for url in URLS:
+        ms, _ = measure(client, [url], RUNS, headers)
+        with redirect_stdout(io.StringIO()):  # Requests with many statements are logged
+            timing = client.get(url, headers=headers).headers['Server-Timing']
+        sql_ms, statements = re.search(r'db;dur=([\d.]+);desc="SQL x(\d+)', timing).groups()
+        print(f"{url:50} | p50 {ms:7.2f} ms | SQL {float(sql_ms):6.2f} ms | {int(statements):4} statements")
+    print("-" * 104)
+
+    with_hooks, _ = measure(client, URLS, RUNS, headers)
+    set_hooks(api_app.app, False)
+    without_hooks, _ = measure(client, URLS, RUNS, headers)
+    set_hooks(api_app.app, True)
+    print(f"all {len(URLS)} endpoints | without middleware {without_hooks:7.2f} ms | "
+          f"with middleware {with_hooks:7.2f} ms | overhead {with_hooks - without_hooks:+.2f} ms")
+
+    os.environ['PROFILE_TOKEN'] = 'benchmark'
+    profiling.PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+    with redirect_stdout(io.StringIO()):  # The endpoint and the dump's location are logged to stdout
+        response = client.get('/api/firefighters', headers={'X-Profile': 'benchmark'})
+    path = os.path.join(profiling.PROFILE_DIR, response.headers['X-Profile-Dump'])
+    print(f"cProfile dump: {os.path.getsize(path) / 1024:.1f} KiB ({response.headers['Server-Timing']})")
+    os.remove(path)
+    os.rmdir(profiling.PROFILE_DIR)
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark for the black-box replay (backend/replay.py).
+
+Fills a temporary database with a multi-hour incident, loads it for replay
+and measures the latency of seeks to random points of the incident (each
+answered with the full frame: clock, roster and alerts), compared with
+reading the same "as of" roster from the database, one latest-row query per
+firefighter and table. Also checks that the clock keeps the requested speed
+and how many frames the stream delivers while playing at 50x.
+"""
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import desc
+from api_setup import api_app, database, cleanup
+from bench_blackbox import seed, FIREFIGHTERS, SAMPLES
+from backend.models import Alert, Position, Vitals
+
+ALERTS = 500
+SEEKS = 200
+
+
+def seed_alerts():
+    db = database.SessionLocal()
+    try:
+        first = db.query(Position.timestamp).order_by(Position.timestamp).first()[0]
+        last = db.query(Position.timestamp).order_by(desc(Position.timestamp)).first()[0]
+        span = (last - first).total_seconds()
+        db.add_all([Alert(firefighter_id=random.randint(1, FIREFIGHTERS), alert_type='high_heart_rate',
+                          severity='warning', message='Tętno >180 bpm',
+                          timestamp=first + timedelta(seconds=random.uniform(0, span)))
+                     for _ in range(ALERTS)])
+        db.commit()
+        return first, last
+    finally:
+        db.close()
+
+
+def database_roster_at(at):
+    """Latest position and vitals of every firefighter at `at`, read from the database"""
+    db = database.SessionLocal()
+    try:
+        for ff_id in range(1, FIREFIGHTERS + 1):
+            for model in (Position, Vitals):
+                db.query(model).filter(model.firefighter_id == ff_id, model.timestamp <= at) \
+                    .order_by(desc(model.timestamp)).first()
+        db.query(Alert).filter(Alert.timestamp <= at).order_by(desc(Alert.timestamp)).limit(100).all()
+    finally:
+        db.close()
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95)], timings[-1]
+
+
+def main():
+    random.seed(0)
+    seed()
+    first, last = seed_alerts()
+    client = api_app.app.test_client()
+    hours = (last - first).total_seconds() / 3600
+
+    print(f"Replay benchmark - {FIREFIGHTERS} firefighters x {SAMPLES} samples ({hours:.1f} h), {ALERTS} alerts")
+    print("-" * 72)
+    t0 = time.perf_counter()
+    response = client.post('/api/replay', json={})
+    load_ms = (time.perf_counter() - t0) * 1e3
+    session_id = response.get_json()['id']
+    print(f"load from database      | {load_ms:8.0f} ms")
+
+    points = [first + timedelta(seconds=random.uniform(0, (last - first).total_seconds())) for _ in range(SEEKS)]
+    seek_timings, db_timings = [], []
+    for at in points:
+        t0 = time.perf_counter()
+        response = client.post(f'/api/replay/{session_id}/seek', json={'time': at.isoformat()})
+        seek_timings.append((time.perf_counter() - t0) * 1e3)
+        assert response.status_code == 200
+    size = len(response.data)
+    for at in points[:50]:
+        t0 = time.perf_counter()
+        database_roster_at(at)
+        db_timings.append((time.perf_counter() - t0) * 1e3)
+    for name, timings in (('seek (replay)', seek_timings), ('as-of query (database)', db_timings)):
+        p50, p95, worst = percentiles(timings)
+        print(f"{name:23} | p50 {p50:7.2f} ms | p95 {p95:7.2f} ms | max {worst:7.2f} ms")
+    print(f"frame size              | {size / 1024:8.1f} KiB")
+
+    # Clock speed and stream frames while playing at 50x
+    client.post(f'/api/replay/{session_id}/seek', json={'time': first.isoformat()})
+    client.post(f'/api/replay/{session_id}/speed', json={'speed': 50})
+    client.post(f'/api/replay/{session_id}/play')
+    response = client.get(f'/api/replay/{session_id}/stream', buffered=False)
+    stream = iter(response.response)
+    frames = []
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < 2:
+        chunk = next(stream)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith('event: replay-frame'):
+            frames.append(json.loads(chunk.split('data: ', 1)[1]))
+    elapsed = time.perf_counter() - t0
+    response.close()
+    clock = [datetime.fromisoformat(frame['clock']['time'].rstrip('Z')) for frame in (frames[0], frames[-1])]
+    advanced = (clock[1] - clock[0]).total_seconds()
+    print(f"playing at 50x          | {len(frames)} frames in {elapsed:.1f} s, "
+          f"clock advanced {advanced:.0f} s between first and last frame")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark for the orjson / MessagePack serialization layer.
+
+Serves the same endpoints with the standard library JSON provider (what
+Flask used before, with datetimes formatted by `.isoformat()`), with the
+orjson provider and with `Accept: application/msgpack`, and reports latency
+and response size per endpoint.
+"""
+import random
+from datetime import datetime
+from flask.json.provider import DefaultJSONProvider
+from api_setup import api_app, measure, cleanup
+from bench_snapshot import seed, FIREFIGHTERS, HISTORY
+from backend.serialization import FastJSONProvider
+
+RUNS = 30
+
+ENDPOINTS = [
+    '/api/firefighters',
+    '/api/snapshot',
+    '/api/firefighters/1/vitals?limit=500',
+    '/api/firefighters/1/positions?limit=500',
+    '/api/history?ids=' + ','.join(str(i) for i in range(1, FIREFIGHTERS + 1)),
+    '/api/alerts/all?acknowledged=true',
+]
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, formatting datetimes like the hand-written `.isoformat()` calls did"""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return DefaultJSONProvider.default(value)
+
+
+def main():
+    random.seed(0)
+    seed()
+    client = api_app.app.test_client()
+
+    print(f"Serialization benchmark - {FIREFIGHTERS} firefighters x {HISTORY} samples (median of {RUNS} requests)")
+    print("-" * 100)
+    print(f"{'endpoint':45} | {'stdlib json':>18} | {'orjson':>18} | {'msgpack':>18}")
+    for url in ENDPOINTS:
+        api_app.app.json = StdlibJSONProvider(api_app.app)
+        stdlib_ms, stdlib_size = measure(client, [url], RUNS)
+        api_app.app.json = FastJSONProvider(api_app.app)
+        orjson_ms, orjson_size = measure(client, [url], RUNS)
+        msgpack_ms, msgpack_size = measure(client, [url], RUNS, headers={'Accept': 'application/msgpack'})
+        print(f"{url[:45]:45} | {stdlib_ms:6.2f} ms {stdlib_size / 1024:6.1f} KiB | "
+              f"{orjson_ms:6.2f} ms {orjson_size / 1024:6.1f} KiB | {msgpack_ms:6.2f} ms {msgpack_size / 1024:6.1f} KiB")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
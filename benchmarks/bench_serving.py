@@ -0,0 +1,135 @@
+"""
+Throughput benchmark for the production launcher (serve.py).
+
+Starts the API in a child process with the launcher used so far
+(`app.run(debug=True)`; without the reloader, which only adds a file
+watcher process) and with serve.py (waitress if installed and Werkzeug's
+threaded server), then hits it from concurrent clients for a fixed time and
+reports requests per second, latency percentiles and the time a SIGTERM
+shutdown takes. The load runs twice: full responses (dominated by the views)
+and conditional polls answered with 304 (dominated by the server itself).
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import requests
+
+CONCURRENCY = 16
+DURATION = 5  # Seconds of load per launcher
+PORT = 5099
+THREADS = 16
+
+URLS = [
+    '/api/firefighters',
+    '/api/alerts',
+    '/api/beacons',
+    '/api/snapshot',
+    '/api/firefighters/1/vitals?limit=100',
+]
+
+
+def run_server(mode, port):
+    """Child process: seed a benchmark database and serve it"""
+    import random
+    from api_setup import api_app, cleanup
+    from bench_snapshot import seed
+    random.seed(0)
+    seed()
+    try:
+        if mode == 'flask':
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            api_app.app.run(debug=True, port=port, use_reloader=False)
+        else:
+            from serve import serve
+            serve(api_app.app, '127.0.0.1', port, threads=THREADS, server=mode, on_shutdown=api_app.shutdown)
+    finally:
+        cleanup()
+
+
+def wait_until_up(base, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base + '/api/building', timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def load(base, conditional):
+    """(requests per second, p50 ms, p95 ms, errors) of CONCURRENCY clients for DURATION seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + DURATION
+
+    def client(offset):
+        session = requests.Session()
+        i = offset
+        local = []
+        etags = {}
+        while time.monotonic() < stop_at:
+            url = URLS[i % len(URLS)]
+            headers = {'If-None-Match': etags[url]} if conditional and url in etags else None
+            t0 = time.perf_counter()
+            response = session.get(base + url, headers=headers)
+            local.append((time.perf_counter() - t0) * 1e3)
+            if 'ETag' in response.headers:
+                etags[url] = response.headers['ETag']
+            if response.status_code not in (200, 304):
+                with lock:
+                    errors[0] += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CONCURRENCY)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return (len(latencies) / DURATION, latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.95)], errors[0])
+
+
+def main():
+    modes = ['flask', 'werkzeug']
+    try:
+        import waitress  # noqa: F401
+        modes.append('waitress')
+    except ImportError:
+        print("waitress is not installed - only the Werkzeug servers are compared")
+
+    print(f"Serving benchmark - {CONCURRENCY} concurrent clients for {DURATION} s, {len(URLS)} endpoints")
+    print("-" * 80)
+    base = f'http://127.0.0.1:{PORT}'
+    for mode in modes:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode, str(PORT)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(base)
+            results = [load(base, conditional) for conditional in (False, True)]
+            t0 = time.perf_counter()
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+            shutdown_ms = (time.perf_counter() - t0) * 1e3
+        finally:
+            if process.poll() is None:
+                process.kill()
+        label = 'app.run(debug=True)' if mode == 'flask' else f'serve.py ({mode})'
+        for name, (rps, p50, p95, errors) in zip(('full', '304'), results):
+            print(f"{label:22} | {name:4} | {rps:7.1f} req/s | p50 {p50:6.1f} ms | p95 {p95:6.1f} ms | "
+                  f"errors {errors}")
+        print(f"{label:22} | shutdown (SIGTERM) {shutdown_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--serve':
+        run_server(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,74 @@
+"""
+Benchmark for the composite /api/snapshot endpoint.
+
+Fills a temporary database with a crew, its history, beacons and alerts and
+compares one /api/snapshot request against the separate requests the map
+view made before (/api/firefighters, /api/alerts, /api/beacons,
+/api/building): latency and response size, for the whole building and for
+one floor.
+"""
+import random
+from datetime import datetime, timedelta
+from api_setup import api_app, database, measure, cleanup
+from backend.models import Firefighter, Position, Vitals, Alert, Beacon
+
+FIREFIGHTERS = 40
+HISTORY = 500  # Position and vitals rows per firefighter
+BEACONS = 30
+ALERTS = 20
+FLOORS = 3
+RUNS = 50
+
+
+def seed():
+    db = database.SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.add_all([Firefighter(name=f'Strażak {i}', badge_number=f'FF-{i:03}', team='RIT' if i % 2 else 'Zastęp 1')
+                    for i in range(FIREFIGHTERS)])
+        db.flush()
+        ids = [ff.id for ff in db.query(Firefighter).all()]
+        positions, vitals = [], []
+        for step in range(HISTORY):
+            timestamp = now - timedelta(seconds=1.5 * (HISTORY - step))
+            for ff_id in ids:
+                positions.append({'firefighter_id': ff_id, 'latitude': 52.2297 + random.uniform(-1e-4, 1e-4),
+                                  'longitude': 21.0122 + random.uniform(-1e-4, 1e-4), 'floor': ff_id % FLOORS,
+                                  'timestamp': timestamp})
+                vitals.append({'firefighter_id': ff_id, 'heart_rate': random.randint(60, 200), 'temperature': 37.0,
+                               'oxygen_level': 20.9, 'co_level': random.uniform(0, 40),
+                               'battery_level': random.uniform(0, 100), 'scba_pressure': random.uniform(0, 300),
+                               'timestamp': timestamp})
+        db.bulk_insert_mappings(Position, positions)
+        db.bulk_insert_mappings(Vitals, vitals)
+        db.add_all([Beacon(beacon_id=f'B{i:02}', name=f'Beacon {i}', latitude=52.2297, longitude=21.0122,
+                           floor=i % FLOORS, is_online=i % 5 != 0) for i in range(BEACONS)])
+        db.add_all([Alert(firefighter_id=random.choice(ids), alert_type='high_heart_rate', severity='warning',
+                          message='Tętno >180 bpm', timestamp=now) for _ in range(ALERTS)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    random.seed(0)
+    seed()
+    client = api_app.app.test_client()
+
+    print(f"Snapshot benchmark - {FIREFIGHTERS} firefighters x {HISTORY} samples, {BEACONS} beacons, {ALERTS} alerts")
+    print("-" * 72)
+    cases = [
+        ('whole building', ['/api/firefighters', '/api/alerts', '/api/beacons', '/api/building'], ['/api/snapshot']),
+        ('floor 1', ['/api/firefighters', '/api/alerts', '/api/beacons?floor=1', '/api/building'], ['/api/snapshot?floor=1']),
+    ]
+    for name, separate, snapshot in cases:
+        separate_ms, separate_size = measure(client, separate, RUNS)
+        snapshot_ms, snapshot_size = measure(client, snapshot, RUNS)
+        print(f"{name:15} | separate {len(separate)} requests: {separate_ms:7.2f} ms {separate_size / 1024:7.1f} KiB | "
+              f"snapshot: {snapshot_ms:7.2f} ms {snapshot_size / 1024:7.1f} KiB")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
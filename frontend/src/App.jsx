@@ -12,7 +12,7 @@ import BlackBoxView from './components/BlackBoxView'
 import TeamsView from './components/TeamsView'
 import Navigation from './components/Navigation'
 import RFIDScanner from './components/RFIDScanner'
-import { api } from './utils/api'
+import { api, applyAlertEvent } from './utils/api'
 import './App.css'
 
 const VIEWS = {
@@ -26,12 +26,13 @@ const VIEWS = {
 }
 
 const ALERT_TYPES = {
-  'man_down': { severity: 'critical', description: 'Bezruch >30s' },
+  'man_down': { severity: 'critical', description: 'Bezruch >60s' },
   'sos_pressed': { severity: 'critical', description: 'Przycisk SOS' },
   'high_heart_rate': { severity: 'warning', description: 'Tętno >180 bpm' },
   'low_battery': { severity: 'warning', description: 'Bateria <20%' },
   'scba_low_pressure': { severity: 'warning', description: 'Niskie ciśnienie SCBA' },
   'scba_critical': { severity: 'critical', description: 'Krytyczne ciśnienie SCBA' },
+  'scba_time_low': { severity: 'warning', description: 'Powietrze SCBA <5 min do rezerwy' },
   'beacon_offline': { severity: 'warning', description: 'Beacon nie odpowiada' },
   'tag_offline': { severity: 'critical', description: 'Tag strażaka offline' },
   'high_co': { severity: 'critical', description: 'Wysokie CO' },
@@ -47,38 +48,54 @@ function App() {
   const [selectedFirefighter, setSelectedFirefighter] = useState(null)
   const [selectedBeacon, setSelectedBeacon] = useState(null)
   const [building, setBuilding] = useState(null)
+  const [beacons, setBeacons] = useState([])
   const [currentFloor, setCurrentFloor] = useState(0)
   const [showBeacons, setShowBeacons] = useState(true)
   const [showHistory, setShowHistory] = useState(true)
   const [teamFilter, setTeamFilter] = useState('all')
 
   useEffect(() => {
-    // Load building info
-    api.getBuilding().then(setBuilding).catch(console.error)
-
-    // Load initial data
-    loadData()
-
-    // Set up refresh interval (5 seconds for alerts)
-    const interval = setInterval(loadData, 5000)
-
-    return () => clearInterval(interval)
+    // Load building, firefighters, alerts and beacons in one request
+    api.getSnapshot().then(snapshot => {
+      setBuilding(snapshot.building)
+      setFirefighters(snapshot.firefighters || [])
+      setAlerts(snapshot.alerts || [])
+      setBeacons(snapshot.beacons || [])
+    }).catch(console.error)
+
+    // Firefighter changes are streamed by the server as they are ingested
+    const unsubscribeRoster = api.subscribeRoster({}, setFirefighters)
+
+    // Alerts are pushed by the server as they are created / acknowledged
+    const unsubscribe = api.subscribeAlerts(
+      (type, data) => setAlerts(current => applyAlertEvent(current, type, data)),
+      loadAlerts
+    )
+
+    return () => {
+      unsubscribeRoster()
+      unsubscribe()
+    }
   }, [])
 
+  const loadAlerts = async () => {
+    try {
+      const alertsData = await api.getAlerts()
+      setAlerts(alertsData || [])
+    } catch (error) {
+      console.error('Error loading alerts:', error)
+    }
+  }
+
   const loadData = async () => {
     try {
       console.log('Loading data...')
-      const [firefightersData, alertsData] = await Promise.all([
-        api.getFirefighters(),
-        api.getAlerts()
-      ])
+      const firefightersData = await api.getFirefighters()
       console.log('Data loaded:', { 
         firefighters: firefightersData?.length || 0, 
-        alerts: alertsData?.length || 0,
         onMissionCount: firefightersData?.filter(ff => ff.on_mission === true).length || 0
       })
       setFirefighters(firefightersData || [])
-      setAlerts(alertsData || [])
     } catch (error) {
       console.error('Error loading data:', error)
       console.error('Error details:', error.message, error.stack)
@@ -157,6 +174,7 @@ function App() {
                 firefighters={firefighters}
                 selectedFirefighter={selectedFirefighter}
                 building={building}
+                beacons={beacons}
                 currentFloor={currentFloor}
                 showBeacons={showBeacons}
                 showHistory={showHistory}
@@ -172,7 +190,7 @@ function App() {
       case VIEWS.ALERTS:
         return <AlertsView alertTypes={ALERT_TYPES} onFirefighterClick={handleFirefighterClick} />
       case VIEWS.FIREFIGHTERS:
-        return <FirefightersView onFirefighterClick={handleFirefighterClick} />
+        return <FirefightersView firefighters={firefighters} onFirefighterClick={handleFirefighterClick} />
       case VIEWS.BEACONS:
         return selectedBeacon ? (
           <BeaconDetail beaconId={selectedBeacon} onClose={() => setSelectedBeacon(null)} />
@@ -186,7 +204,7 @@ function App() {
       case VIEWS.BLACKBOX:
         return <BlackBoxView />
       case VIEWS.TEAMS:
-        return <TeamsView onFirefighterClick={handleFirefighterClick} />
+        return <TeamsView firefighters={firefighters} onFirefighterClick={handleFirefighterClick} />
       default:
         return null
     }
@@ -1,10 +1,12 @@
 import React, { useState, useEffect } from 'react'
-import { api } from '../utils/api'
+import { api, applyAlertEvent } from '../utils/api'
 
 function AlertsView({ alertTypes, onFirefighterClick }) {
   const [alerts, setAlerts] = useState([])
   const [firefighters, setFirefighters] = useState([])
   const [severityFilter, setSeverityFilter] = useState('all')
+  const [showHistory, setShowHistory] = useState(false) // Active alerts or the whole history (archive included)
+  const [nextPage, setNextPage] = useState(null) // Token of the next (older) history page
   const [sortBy, setSortBy] = useState('timestamp')
   const [sortOrder, setSortOrder] = useState('desc') // 'asc' or 'desc'
   const [currentPage, setCurrentPage] = useState(1)
@@ -13,34 +15,75 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
   useEffect(() => {
     loadAlerts()
     loadFirefighters()
-    const interval = setInterval(() => {
-      loadAlerts()
-      loadFirefighters()
-    }, 8000)
-    return () => clearInterval(interval)
-  }, [severityFilter])
+    const interval = setInterval(loadFirefighters, 8000)
+    // New and acknowledged alerts are pushed by the server
+    const unsubscribe = api.subscribeAlerts((type, data) => {
+      if (type !== 'alert-acknowledged' && severityFilter !== 'all' && data.severity !== severityFilter) return
+      if (showHistory && type === 'alert-acknowledged') {
+        // The history keeps acknowledged alerts
+        setAlerts(current => current.map(alert => alert.id === data.id ? { ...alert, acknowledged: true } : alert))
+        return
+      }
+      setAlerts(current => applyAlertEvent(current, type, data))
+    }, loadAlerts)
+    return () => {
+      clearInterval(interval)
+      unsubscribe()
+    }
+  }, [severityFilter, showHistory])
+
+  const severity = severityFilter !== 'all' ? severityFilter : null
 
   const loadAlerts = async () => {
     try {
-      const data = await api.getAllAlerts(
-        severityFilter !== 'all' ? severityFilter : null,
-        false // Only unacknowledged (active) alerts
-      )
-      setAlerts(data)
+      if (showHistory) {
+        // Newest page first, older pages on demand
+        const page = await api.getAlertHistoryPage({ severity })
+        setAlerts(page.items)
+        setNextPage(page.nextPage)
+      } else {
+        // All active alerts (a bounded set, not paged)
+        const data = await api.getAlerts()
+        setAlerts(severity ? data.filter(alert => alert.severity === severity) : data)
+        setNextPage(null)
+      }
     } catch (error) {
       console.error('Error loading alerts:', error)
     }
   }
 
+  const loadOlderAlerts = async () => {
+    try {
+      const page = await api.getAlertHistoryPage({ page: nextPage, severity })
+      setAlerts(current => [...current, ...page.items.filter(alert => !current.some(a => a.id === alert.id))])
+      setNextPage(page.nextPage)
+    } catch (error) {
+      console.error('Error loading alert history:', error)
+    }
+  }
+
   const loadFirefighters = async () => {
     try {
-      const data = await api.getAllFirefighters()
+      // Only names are shown next to alerts
+      const data = await api.getFirefighters('id,name')
       setFirefighters(data)
     } catch (error) {
       console.error('Error loading firefighters:', error)
     }
   }
 
+  const handleAcknowledge = async (alertId) => {
+    try {
+      await api.acknowledgeAlert(alertId)
+      // The alert-acknowledged event does the same; this keeps the list right without the stream
+      setAlerts(current => showHistory
+        ? current.map(alert => alert.id === alertId ? { ...alert, acknowledged: true } : alert)
+        : current.filter(alert => alert.id !== alertId))
+    } catch (error) {
+      console.error('Error acknowledging alert:', error)
+    }
+  }
+
   // Get firefighter name by ID
   const getFirefighterName = (firefighterId) => {
     if (!firefighterId) return null
@@ -55,6 +98,7 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
       'sos_pressed': 'bi-exclamation-circle-fill',
       'scba_low_pressure': 'bi-wind',
       'scba_critical': 'bi-exclamation-triangle-fill',
+      'scba_time_low': 'bi-hourglass-split',
       'low_battery': 'bi-battery-half',
       'high_heart_rate': 'bi-heart-pulse-fill',
       'beacon_offline': 'bi-broadcast',
@@ -102,7 +146,7 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
   // Reset to page 1 when filters change
   useEffect(() => {
     setCurrentPage(1)
-  }, [severityFilter, sortBy, sortOrder])
+  }, [severityFilter, sortBy, sortOrder, showHistory])
 
   return (
     <div className="alerts-view p-4">
@@ -117,7 +161,7 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
             gap: '0.5rem'
           }}>
             <i className="bi-bell-fill" style={{ color: '#c82333' }}></i>
-            Aktywne alerty ({sortedAlerts.length})
+            {showHistory ? 'Historia alertów' : 'Aktywne alerty'} ({sortedAlerts.length})
           </h4>
         </div>
         <div className="row g-2">
@@ -152,6 +196,16 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
               <option value="asc">Najstarsze/Najniższe</option>
             </select>
           </div>
+          <div className="col-md-3">
+            <select
+              className="form-select form-select-sm"
+              value={showHistory ? 'history' : 'active'}
+              onChange={(e) => setShowHistory(e.target.value === 'history')}
+            >
+              <option value="active">Tylko aktywne</option>
+              <option value="history">Historia (z potwierdzonymi)</option>
+            </select>
+          </div>
         </div>
       </div>
       <div className="list-group">
@@ -306,6 +360,21 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
                         second: '2-digit'
                       })}
                     </div>
+                    {alert.acknowledged ? (
+                      <div className="small mt-2" style={{ color: '#999999' }}>
+                        <i className="bi-check2"></i> Potwierdzony
+                      </div>
+                    ) : (
+                      <button
+                        className="btn btn-sm btn-outline-light mt-2"
+                        onClick={(e) => {
+                          e.stopPropagation()
+                          handleAcknowledge(alert.id)
+                        }}
+                      >
+                        <i className="bi-check2"></i> Potwierdź
+                      </button>
+                    )}
                   </div>
                 </div>
               </div>
@@ -313,6 +382,13 @@ function AlertsView({ alertTypes, onFirefighterClick }) {
           })
         )}
       </div>
+      {showHistory && nextPage && currentPage === totalPages && (
+        <div className="text-center mt-3">
+          <button className="btn btn-sm btn-outline-light" onClick={loadOlderAlerts}>
+            Załaduj starsze alerty
+          </button>
+        </div>
+      )}
       {totalPages > 1 && (
         <nav className="mt-3">
           <ul className="pagination pagination-sm justify-content-center">
@@ -1,5 +1,6 @@
 import React, { useState } from 'react'
 import { api } from '../utils/api'
+import ReplayPanel from './ReplayPanel'
 
 function BlackBoxView() {
   const [downloading, setDownloading] = useState(false)
@@ -159,6 +160,7 @@ function BlackBoxView() {
                 </div>
               </div>
             </div>
+            <ReplayPanel />
           </div>
         </div>
       </div>
@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from 'react'
-import { api } from '../utils/api'
+import { api, minutesStationary } from '../utils/api'
 
-function FirefightersView({ onFirefighterClick }) {
-  const [firefighters, setFirefighters] = useState([])
+// `firefighters` is the live roster streamed by App
+function FirefightersView({ firefighters, onFirefighterClick }) {
   const [alerts, setAlerts] = useState([])
   const [searchTerm, setSearchTerm] = useState('')
   const [missionFilter, setMissionFilter] = useState('all')
@@ -13,24 +13,11 @@ function FirefightersView({ onFirefighterClick }) {
   const itemsPerPage = 20
 
   useEffect(() => {
-    loadFirefighters()
     loadAlerts()
-    const interval = setInterval(() => {
-      loadFirefighters()
-      loadAlerts()
-    }, 3000)
+    const interval = setInterval(loadAlerts, 3000)
     return () => clearInterval(interval)
   }, [])
 
-  const loadFirefighters = async () => {
-    try {
-      const data = await api.getAllFirefighters()
-      setFirefighters(data)
-    } catch (error) {
-      console.error('Error loading firefighters:', error)
-    }
-  }
-
   const loadAlerts = async () => {
     try {
       const data = await api.getAllAlerts('critical', false)
@@ -250,9 +237,9 @@ function FirefightersView({ onFirefighterClick }) {
                       )}
                     </div>
                     <div className="small" style={{ color: '#999999' }}>ID: {ff.badge_number}</div>
-                    {ff.time_stationary > 0 && (
+                    {minutesStationary(ff) > 0 && (
                       <div className="small" style={{ color: '#ffc107' }}>
-                        Bezruch: {ff.time_stationary.toFixed(1)}min
+                        Bezruch: {minutesStationary(ff).toFixed(1)}min
                       </div>
                     )}
                   </div>
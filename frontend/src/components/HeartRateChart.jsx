@@ -24,18 +24,30 @@ ChartJS.register(
   Filler
 )
 
+const CHART_POINTS = 100
+const TREND_MINUTES = 5  // Window of the first load, downsampled on the server to CHART_POINTS
+
 function HeartRateChart({ firefighterId }) {
   const [vitalsData, setVitalsData] = useState([])
   const [currentBPM, setCurrentBPM] = useState(null)
   const intervalRef = useRef(null)
 
   useEffect(() => {
+    // Only rows newer than the cursor are fetched after the first load
+    let cursor = null
+    setVitalsData([])
+
     const loadVitals = async () => {
       try {
-        const vitals = await api.getFirefighterVitals(firefighterId, 100)
-        setVitalsData(vitals)
-        if (vitals.length > 0) {
-          setCurrentBPM(vitals[vitals.length - 1].heart_rate)
+        // First load: the last minutes with their peaks, then only new rows
+        const since = new Date(Date.now() - TREND_MINUTES * 60000).toISOString()
+        const { items, nextCursor } = cursor === null
+          ? await api.getFirefighterVitalsTrend(firefighterId, since, CHART_POINTS)
+          : await api.getFirefighterVitalsSince(firefighterId, cursor, CHART_POINTS)
+        cursor = nextCursor ?? cursor
+        if (items.length > 0) {
+          setVitalsData(current => [...current, ...items].slice(-CHART_POINTS))
+          setCurrentBPM(items[items.length - 1].heart_rate)
         }
       } catch (error) {
         console.error('Error loading vitals:', error)
@@ -1,4 +1,4 @@
-import React, { useEffect, useRef, useState } from 'react'
+import React, { useEffect, useMemo, useRef, useState } from 'react'
 import { MapContainer, TileLayer, ImageOverlay, Marker, Popup, CircleMarker, Circle, useMap } from 'react-leaflet'
 import L from 'leaflet'
 import { api } from '../utils/api'
@@ -486,6 +486,7 @@ function Map({
   firefighters,
   selectedFirefighter,
   building,
+  beacons = [],
   currentFloor,
   showBeacons,
   showHistory,
@@ -493,7 +494,6 @@ function Map({
   teamFilter = 'all',
   onFirefighterClick
 }) {
-  const [beacons, setBeacons] = useState([])
   const [positionHistory, setPositionHistory] = useState({})
   const historyLayersRef = useRef({})
   const [customImageUrl, setCustomImageUrl] = useState(null)
@@ -502,19 +502,11 @@ function Map({
   const [rotation, setRotation] = useState(0)
   const fileInputRef = useRef(null)
 
-  // Load beacons
-  useEffect(() => {
-    if (showBeacons && building) {
-      // Get all beacons, then filter by floor
-      api.getBeacons(null).then(allBeacons => {
-        // Filter by current floor
-        const filtered = allBeacons.filter(b => b.floor === currentFloor)
-        setBeacons(filtered)
-      }).catch(console.error)
-    } else {
-      setBeacons([])
-    }
-  }, [showBeacons, currentFloor, building])
+  // Beacons of the current floor (all beacons come with the snapshot loaded by App)
+  const floorBeacons = useMemo(
+    () => (showBeacons && building ? beacons.filter(b => b.floor === currentFloor) : []),
+    [beacons, showBeacons, currentFloor, building]
+  )
 
   // Load position history for selected firefighter
   useEffect(() => {
@@ -1034,7 +1026,7 @@ function Map({
       )}
 
       {/* Beacons with range circles */}
-      {showBeacons && beacons.map((beacon) => (
+      {showBeacons && floorBeacons.map((beacon) => (
         <React.Fragment key={beacon.id}>
           {/* Range circle */}
           <Circle
@@ -0,0 +1,137 @@
+import React, { useState, useEffect } from 'react'
+import { api } from '../utils/api'
+
+const SPEEDS = [1, 2, 5, 10, 25, 50]
+
+// Server timestamps are UTC without a zone suffix
+const toMs = (timestamp) => Date.parse(timestamp + 'Z')
+const formatTime = (timestamp) => new Date(toMs(timestamp)).toLocaleTimeString('pl-PL')
+
+function ReplayPanel() {
+  const [replay, setReplay] = useState(null)
+  const [frame, setFrame] = useState(null)
+  const [loading, setLoading] = useState(false)
+  const [error, setError] = useState(null)
+
+  useEffect(() => {
+    if (!replay) return undefined
+    const unsubscribe = api.subscribeReplay(replay.id, setFrame)
+    return () => {
+      unsubscribe()
+      api.closeReplay(replay.id)
+    }
+  }, [replay])
+
+  const load = async (file = null) => {
+    setLoading(true)
+    setError(null)
+    try {
+      setFrame(null)
+      setReplay(await api.createReplay({ file }))
+    } catch (err) {
+      console.error('Error loading replay:', err)
+      setError(err.message || 'Nie udało się wczytać danych do odtworzenia')
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const control = async (action, body) => {
+    try {
+      setFrame(await api.controlReplay(replay.id, action, body))
+    } catch (err) {
+      setError(err.message)
+    }
+  }
+
+  const clock = frame?.clock
+
+  return (
+    <div className="card shadow-lg mt-4" style={{ border: '2px solid #c82333' }}>
+      <div className="card-header" style={{
+        background: 'linear-gradient(135deg, #c82333 0%, #a01e2a 100%)',
+        color: 'white'
+      }}>
+        <h4 className="mb-0" style={{ display: 'flex', alignItems: 'center', gap: '0.5rem' }}>
+          <i className="bi-play-circle-fill"></i> Odtwarzanie Akcji
+        </h4>
+      </div>
+      <div className="card-body">
+        <p style={{ color: '#d0d0d0' }}>
+          Odtwórz przebieg akcji z bazy danych lub z pliku eksportu <code>.npz</code> -
+          z przewijaniem i przyspieszeniem do 50x.
+        </p>
+        <div className="d-flex gap-2 mb-3">
+          <button className="btn btn-outline-light" onClick={() => load()} disabled={loading}>
+            <i className="bi-database"></i> Z bazy danych
+          </button>
+          <label className="btn btn-outline-light mb-0">
+            <i className="bi-upload"></i> Z pliku .npz
+            <input type="file" accept=".npz" hidden disabled={loading}
+                   onChange={(e) => e.target.files[0] && load(e.target.files[0])} />
+          </label>
+        </div>
+
+        {error && (
+          <div className="alert alert-danger" style={{ borderRadius: '8px' }}>
+            <strong>Błąd:</strong> {error}
+          </div>
+        )}
+
+        {clock && (
+          <>
+            <div className="d-flex align-items-center gap-2 mb-2">
+              <button className="btn btn-primary"
+                      onClick={() => control(clock.playing ? 'pause' : 'play')}
+                      style={{ background: '#c82333', border: 'none', minWidth: '3rem' }}>
+                <i className={clock.playing ? 'bi-pause-fill' : 'bi-play-fill'}></i>
+              </button>
+              <select className="form-select" style={{ width: 'auto' }} value={clock.speed}
+                      onChange={(e) => control('speed', { speed: Number(e.target.value) })}>
+                {SPEEDS.map(speed => <option key={speed} value={speed}>{speed}x</option>)}
+              </select>
+              <span style={{ color: '#f5f5f5', fontVariantNumeric: 'tabular-nums' }}>
+                {formatTime(clock.time)} / {formatTime(clock.end)}
+              </span>
+            </div>
+            <input type="range" className="form-range mb-3"
+                   min={toMs(clock.start)} max={toMs(clock.end)} step={1000} value={toMs(clock.time)}
+                   onChange={(e) => control('seek', { time: new Date(Number(e.target.value)).toISOString() })} />
+
+            <table className="table table-dark table-sm">
+              <thead>
+                <tr>
+                  <th>Strażak</th>
+                  <th>Piętro</th>
+                  <th>Tętno</th>
+                  <th>SCBA</th>
+                  <th>Bateria</th>
+                </tr>
+              </thead>
+              <tbody>
+                {frame.firefighters.map(ff => (
+                  <tr key={ff.id}>
+                    <td>{ff.name}</td>
+                    <td>{ff.position?.floor ?? '-'}</td>
+                    <td>{ff.vitals?.heart_rate ?? '-'}</td>
+                    <td>{ff.vitals?.scba_pressure != null ? `${Math.round(ff.vitals.scba_pressure)} bar` : '-'}</td>
+                    <td>{ff.vitals?.battery_level != null ? `${Math.round(ff.vitals.battery_level)}%` : '-'}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+
+            <h6 style={{ color: '#c82333' }}>Alerty do tej chwili: {frame.alerts.length}</h6>
+            <ul className="mb-0" style={{ color: '#d0d0d0', paddingLeft: '1.5rem' }}>
+              {frame.alerts.slice(0, 5).map(alert => (
+                <li key={alert.id}>{formatTime(alert.timestamp)} - {alert.message}</li>
+              ))}
+            </ul>
+          </>
+        )}
+      </div>
+    </div>
+  )
+}
+
+export default ReplayPanel
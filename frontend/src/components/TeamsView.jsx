@@ -42,8 +42,8 @@ const getTeamColor = (team) => {
   return `hsl(${hue}, 70%, 50%)`
 }
 
-function TeamsView({ onFirefighterClick }) {
-  const [firefighters, setFirefighters] = useState([])
+// `firefighters` is the live roster streamed by App
+function TeamsView({ firefighters, onFirefighterClick }) {
   const [building, setBuilding] = useState(null)
   const [currentFloor, setCurrentFloor] = useState(0)
   const [teamFilter, setTeamFilter] = useState('all')
@@ -53,8 +53,6 @@ function TeamsView({ onFirefighterClick }) {
 
   useEffect(() => {
     loadInitialData()
-    const interval = setInterval(loadFirefighters, 3000)
-    return () => clearInterval(interval)
   }, [])
 
   const loadInitialData = async () => {
@@ -70,35 +68,11 @@ function TeamsView({ onFirefighterClick }) {
         }
         setBuildingInitialized(true)
       }
-      await loadFirefighters()
     } catch (error) {
       console.error('Error loading initial data:', error)
     }
   }
 
-  const loadFirefighters = async () => {
-    try {
-      const firefightersData = await api.getFirefighters()
-      setFirefighters(firefightersData)
-      
-      // Debug: Log all RIT firefighters
-      const ritFirefighters = firefightersData.filter(ff => {
-        const team = ff.team ? ff.team.trim().toLowerCase() : ''
-        return team === 'rit'
-      })
-      console.log('All RIT firefighters in TeamsView:', ritFirefighters.map(ff => ({
-        id: ff.id,
-        name: ff.name,
-        team: ff.team,
-        hasPosition: !!ff.position,
-        floor: ff.position?.floor,
-        position: ff.position
-      })))
-    } catch (error) {
-      console.error('Error loading firefighters:', error)
-    }
-  }
-
   const handleSelectFirefighter = (firefighterId) => {
     setSelectedFirefighter(firefighterId)
     const ff = firefighters.find(f => f.id === firefighterId)
@@ -1,8 +1,10 @@
 const API_BASE_URL = '/api';
 
 export const api = {
-  async getFirefighters() {
-    const response = await fetch(`${API_BASE_URL}/firefighters`);
+  // `fields` (e.g. 'id,name,vitals.battery_level') limits the response to those fields
+  async getFirefighters(fields = null) {
+    const query = fields ? `?fields=${encodeURIComponent(fields)}` : '';
+    const response = await fetch(`${API_BASE_URL}/firefighters${query}`);
     if (!response.ok) throw new Error('Failed to fetch firefighters');
     return response.json();
   },
@@ -13,18 +15,46 @@ export const api = {
     return response.json();
   },
 
+  // Vitals since `since` downsampled on the server to about `points` samples (peaks of `field` are kept).
+  // Returns { items, nextCursor } - the newest sample is always kept, so nextCursor continues with
+  // getFirefighterVitalsSince.
+  async getFirefighterVitalsTrend(firefighterId, since, points = 300, field = 'heart_rate') {
+    const params = new URLSearchParams({ since, points, field });
+    const response = await fetch(`${API_BASE_URL}/firefighters/${firefighterId}/vitals?${params}`);
+    if (!response.ok) throw new Error('Failed to fetch vitals');
+    return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+  },
+
   async getFirefighterVitals(firefighterId, limit = 100) {
     const response = await fetch(`${API_BASE_URL}/firefighters/${firefighterId}/vitals?limit=${limit}`);
     if (!response.ok) throw new Error('Failed to fetch vitals');
     return response.json();
   },
 
+  // Rows newer than `cursor` (row id from the previous call); without a cursor the last `limit` rows.
+  // Returns { items, nextCursor } - pass nextCursor to the next call.
+  async getFirefighterVitalsSince(firefighterId, cursor = null, limit = 100) {
+    let url = `${API_BASE_URL}/firefighters/${firefighterId}/vitals?limit=${limit}`;
+    if (cursor !== null) url += `&cursor=${cursor}`;
+    const response = await fetch(url);
+    if (!response.ok) throw new Error('Failed to fetch vitals');
+    return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') ?? cursor };
+  },
+
   async getAlerts() {
     const response = await fetch(`${API_BASE_URL}/alerts`);
     if (!response.ok) throw new Error('Failed to fetch alerts');
     return response.json();
   },
 
+  async acknowledgeAlert(alertId) {
+    const response = await fetch(`${API_BASE_URL}/alerts/${alertId}/acknowledge`, {
+      method: 'POST'
+    });
+    if (!response.ok) throw new Error('Failed to acknowledge alert');
+    return response.json();
+  },
+
   async getBeacons(floor = null) {
     const url = floor !== null 
       ? `${API_BASE_URL}/beacons?floor=${floor}`
@@ -40,6 +70,16 @@ export const api = {
     return response.json();
   },
 
+  // Firefighters, active alerts, beacons and building in one consistent response
+  async getSnapshot(floor = null) {
+    const url = floor !== null
+      ? `${API_BASE_URL}/snapshot?floor=${floor}`
+      : `${API_BASE_URL}/snapshot`;
+    const response = await fetch(url);
+    if (!response.ok) throw new Error('Failed to fetch snapshot');
+    return response.json();
+  },
+
   async getFirefighterBeacon(firefighterId) {
     const response = await fetch(`${API_BASE_URL}/firefighters/${firefighterId}/beacon`);
     if (!response.ok) throw new Error('Failed to fetch firefighter beacon');
@@ -68,6 +108,21 @@ export const api = {
     return response.json();
   },
 
+  // One page of the alert history (active + archive), newest first. Returns { items, nextPage } -
+  // pass nextPage as `page` to get the next (older) page; it is null after the last page.
+  async getAlertHistoryPage({ page = null, limit = 100, severity = null, alertType = null, firefighterId = null, since = null, until = null } = {}) {
+    const params = new URLSearchParams({ acknowledged: 'true', limit });
+    if (page) params.set('page', page);
+    if (severity) params.set('severity', severity);
+    if (alertType) params.set('alert_type', alertType);
+    if (firefighterId !== null) params.set('firefighter_id', firefighterId);
+    if (since) params.set('since', since);
+    if (until) params.set('until', until);
+    const response = await fetch(`${API_BASE_URL}/alerts/all?${params}`);
+    if (!response.ok) throw new Error('Failed to fetch alert history');
+    return { items: await response.json(), nextPage: response.headers.get('X-Next-Page') };
+  },
+
   async getBeacon(beaconId) {
     const response = await fetch(`${API_BASE_URL}/beacons/${beaconId}`);
     if (!response.ok) throw new Error('Failed to fetch beacon');
@@ -115,6 +170,143 @@ export const api = {
     });
     if (!response.ok) throw new Error('Failed to close serial port');
     return response.json();
+  },
+
+  // Live alert events (SSE). onEvent(type, data) gets 'alert-created', 'alert-updated',
+  // 'alert-acknowledged'; onReset() means events were missed and alerts should be reloaded.
+  // EventSource reconnects on its own and resumes with Last-Event-ID. Returns an unsubscribe function.
+  subscribeAlerts(onEvent, onReset) {
+    return connectEventSource(`${API_BASE_URL}/alerts/stream`, (source, reopened) => {
+      ['alert-created', 'alert-updated', 'alert-acknowledged'].forEach(type => {
+        source.addEventListener(type, (e) => onEvent(type, JSON.parse(e.data)));
+      });
+      source.addEventListener('reset', () => onReset && onReset());
+      // A new EventSource has no Last-Event-ID - events may have been missed
+      if (reopened && onReset) onReset();
+    });
+  },
+
+  // Live roster (SSE): a full snapshot on connect, then per-firefighter field deltas.
+  // Optional floor / team filters are applied by the server. onUpdate(firefighters) gets
+  // the whole current list after every event. Returns an unsubscribe function.
+  subscribeRoster({ floor = null, team = null } = {}, onUpdate) {
+    const params = new URLSearchParams();
+    if (floor !== null) params.set('floor', floor);
+    if (team) params.set('team', team);
+    let roster = new Map();
+    return connectEventSource(`${API_BASE_URL}/firefighters/stream?${params}`, (source) => {
+      source.addEventListener('snapshot', (e) => {
+        roster = new Map(JSON.parse(e.data).firefighters.map(ff => [ff.id, ff]));
+        onUpdate([...roster.values()]);
+      });
+      source.addEventListener('roster-delta', (e) => {
+        applyRosterDelta(roster, JSON.parse(e.data).firefighters);
+        onUpdate([...roster.values()]);
+      });
+    });
+  },
+
+  // Black-box replay of a time range of the database ({ ids, since, until }, all optional)
+  // or of an uploaded npz export (File). Returns { id, source, statistics, clock }.
+  async createReplay({ ids = null, since = null, until = null, file = null } = {}) {
+    let options;
+    if (file) {
+      const form = new FormData();
+      form.append('file', file);
+      options = { method: 'POST', body: form };
+    } else {
+      options = {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ids, since, until })
+      };
+    }
+    const response = await fetch(`${API_BASE_URL}/replay`, options);
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.error || 'Failed to load replay');
+    }
+    return response.json();
+  },
+
+  // action: 'play', 'pause', 'seek' ({ time }) or 'speed' ({ speed }, 1-50).
+  // Returns the frame at the new clock: { clock, firefighters, alerts }
+  async controlReplay(replayId, action, body = {}) {
+    const response = await fetch(`${API_BASE_URL}/replay/${replayId}/${action}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body)
+    });
+    if (!response.ok) throw new Error('Failed to control replay');
+    return response.json();
+  },
+
+  async closeReplay(replayId) {
+    await fetch(`${API_BASE_URL}/replay/${replayId}`, { method: 'DELETE' });
+  },
+
+  // Replay frames (SSE) while playing and after every control action. Returns an unsubscribe function.
+  subscribeReplay(replayId, onFrame) {
+    return connectEventSource(`${API_BASE_URL}/replay/${replayId}/stream`, (source) => {
+      source.addEventListener('replay-frame', (e) => onFrame(JSON.parse(e.data)));
+    });
   }
 };
 
+// EventSource reopened after `retryMs` when the server refuses the connection (503 while
+// the stream limit is reached) - EventSource itself only retries dropped connections.
+// setup(source, reopened) registers the listeners. Returns a function closing the stream.
+function connectEventSource(url, setup, retryMs = 10000) {
+  let source = null;
+  let timer = null;
+  let closed = false;
+  const open = (reopened) => {
+    source = new EventSource(url);
+    setup(source, reopened);
+    source.addEventListener('error', () => {
+      if (source.readyState === EventSource.CLOSED && !closed) {
+        timer = setTimeout(() => open(true), retryMs);
+      }
+    });
+  };
+  open(false);
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    source.close();
+  };
+}
+
+// Merge streamed roster changes into a Map of firefighters (id -> firefighter)
+export function applyRosterDelta(roster, changes) {
+  changes.forEach(change => {
+    if (change.removed) {
+      roster.delete(change.id);
+      return;
+    }
+    const current = roster.get(change.id) || {};
+    const updated = { ...current };
+    Object.entries(change).forEach(([key, value]) => {
+      const previous = current[key];
+      const isObject = value && typeof value === 'object' && !Array.isArray(value);
+      updated[key] = isObject && previous && typeof previous === 'object' ? { ...previous, ...value } : value;
+    });
+    roster.set(change.id, updated);
+  });
+}
+
+// Minutes since the firefighter last moved, from the streamed stationary_since (UTC)
+export function minutesStationary(ff) {
+  if (!ff.stationary_since) return 0;
+  return Math.max(0, (Date.now() - Date.parse(ff.stationary_since + 'Z')) / 60000);
+}
+
+// Apply a streamed alert event to a list of active alerts
+export function applyAlertEvent(alerts, type, data) {
+  if (type === 'alert-acknowledged') {
+    return alerts.filter(alert => alert.id !== data.id);
+  }
+  const others = alerts.filter(alert => alert.id !== data.id);
+  return [data, ...others];
+}
+
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Production launcher for the API (or the legacy dashboard `app.py`).
+
+Serves the app with waitress (multi-threaded WSGI server) if it is installed,
+otherwise with Werkzeug's threaded server - in both cases without the
+debugger and the reloader, so the data retriever is started exactly once.
+SIGINT / SIGTERM stop accepting connections, end the SSE streams (live and
+replay), let running requests finish and stop the data retriever.
+
+Every open SSE stream holds a worker thread, so the API caps open streams
+(`--max-streams`, 503 above it) and the pool gets REQUEST_THREADS more
+threads than that - streams can never starve the other requests.
+
+Usage:
+    python serve.py [--app api|dashboard] [--host 0.0.0.0] [--port 5000]
+                    [--connection-limit 500] [--max-streams 250] [--threads 266]
+"""
+import sys
+import os
+
+# Add current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import signal
+
+try:
+    from waitress.server import create_server
+except ImportError:
+    create_server = None  # Optional - Werkzeug's threaded server is used instead
+
+DEFAULT_CONNECTION_LIMIT = 500
+REQUEST_THREADS = 16  # Threads left for REST requests on top of the SSE stream limit
+
+
+def default_max_streams(connection_limit):
+    """Open SSE streams allowed for `connection_limit` - half, the rest is kept for other requests"""
+    return max(1, connection_limit // 2)
+
+
+def default_threads(max_streams):
+    """Every open SSE stream holds a worker thread for as long as it is connected"""
+    return max_streams + REQUEST_THREADS
+
+
+def make_server(app, host, port, threads, connection_limit=DEFAULT_CONNECTION_LIMIT, server='auto'):
+    """Create a WSGI server: 'waitress', 'werkzeug' or 'auto' (waitress if installed)"""
+    if server == 'auto':
+        server = 'waitress' if create_server is not None else 'werkzeug'
+    if server == 'waitress':
+        if create_server is None:
+            raise RuntimeError("waitress is not installed (pip install waitress)")
+        return create_server(app, host=host, port=port, threads=threads, connection_limit=connection_limit,
+                             ident='Locero')
+    from werkzeug.serving import make_server as make_werkzeug_server
+    httpd = make_werkzeug_server(host, port, app, threaded=True)
+    httpd.daemon_threads = False  # server_close() waits for running requests
+    return httpd
+
+
+def serve(app, host='127.0.0.1', port=5000, threads=None, connection_limit=DEFAULT_CONNECTION_LIMIT,
+          server='auto', on_shutdown=None):
+    """Serve `app` until SIGINT / SIGTERM.
+
+    `threads` defaults to the stream limit for `connection_limit` plus
+    REQUEST_THREADS. `on_shutdown` is called first on a signal - it has to end
+    long-lived responses (SSE streams), otherwise they hold up the shutdown.
+    """
+    if threads is None:
+        threads = default_threads(default_max_streams(connection_limit))
+    httpd = make_server(app, host, port, threads, connection_limit, server)
+
+    def handle_signal(signum, frame):
+        signal.signal(signal.SIGINT, signal.SIG_DFL)  # A second Ctrl+C kills the process
+        print(f"Shutting down ({signal.Signals(signum).name}), waiting for running requests...")
+        if on_shutdown is not None:
+            on_shutdown()
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    if hasattr(httpd, 'serve_forever'):
+        print(f"Serving on http://{host}:{port} (werkzeug, thread per request)")
+        try:
+            httpd.serve_forever()
+        except SystemExit:
+            pass
+        httpd.server_close()  # Joins the request threads
+    else:
+        print(f"Serving on http://{host}:{port} (waitress, {threads} threads)")
+        # run() returns on SystemExit after waiting (up to 5 s) for the worker threads
+        httpd.run()
+        httpd.close()
+    print("Server stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Production server for the Locero API")
+    parser.add_argument('--app', choices=['api', 'dashboard'], default='api',
+                        help="api: REST API (api/app.py), dashboard: legacy dashboard (app.py)")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--connection-limit', type=int,
+                        default=int(os.environ.get('CONNECTION_LIMIT', DEFAULT_CONNECTION_LIMIT)),
+                        help="maximum open connections (waitress)")
+    parser.add_argument('--max-streams', type=int, default=os.environ.get('MAX_STREAMS'),
+                        help="maximum open SSE streams, further ones get 503 (default: half of --connection-limit)")
+    parser.add_argument('--threads', type=int, default=os.environ.get('THREADS'),
+                        help=f"worker threads (waitress; default: --max-streams + {REQUEST_THREADS})")
+    parser.add_argument('--server', choices=['auto', 'waitress', 'werkzeug'], default='auto')
+    args = parser.parse_args()
+
+    max_streams = args.max_streams or default_max_streams(args.connection_limit)
+    threads = args.threads or default_threads(max_streams)
+    if threads <= max_streams:
+        parser.error(f"--threads ({threads}) must be larger than --max-streams ({max_streams}), "
+                     "otherwise open streams leave no thread for other requests")
+
+    if args.app == 'api':
+        # Importing the API initializes the database and starts the data retriever
+        from api.app import app, shutdown, stream_limit
+        stream_limit.limit = max_streams
+        on_shutdown = shutdown
+        print(f"SSE streams limited to {max_streams} ({threads - max_streams} threads left for other requests)")
+    else:
+        from app import app
+        on_shutdown = None
+    serve(app, args.host, args.port, threads, args.connection_limit, args.server, on_shutdown)
+
+
+if __name__ == '__main__':
+    main()
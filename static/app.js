@@ -1807,7 +1807,9 @@ function startDataUpdates() {
     updateFirefightersOnly();
     updateAlertsOnly();
     
-    // Update firefighters every 1.5 seconds
+    // Update firefighters every 1.5 seconds. This page's /api/firefighters is a proxy of the
+    // simulator API (app.py), which has no roster stream - /api/firefighters/stream with field
+    // deltas is served by the API backend (api/app.py) for the React frontend only
     setInterval(updateFirefightersOnly, 1500);
     
     // Update alerts every 5 seconds
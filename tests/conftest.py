@@ -0,0 +1,64 @@
+import sys
+import os
+import io
+import json
+from contextlib import redirect_stdout
+
+# Add parent directory to Python path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.models import Base
+from backend.alert_rules import RuleTable
+
+RULES = {
+    'rules': [
+        {'alert_type': 'high_heart_rate', 'field': 'heart_rate', 'op': '>', 'value': 180},
+        {'alert_type': 'low_battery', 'field': 'battery_level', 'op': '<', 'value': 20}
+    ],
+    'overrides': {'team': {}, 'role': {}},
+    'cooldowns': {
+        'default': {'firefighter': 180, 'global': 30},
+        'types': {'man_down': {'firefighter': 10, 'global': 0}}
+    },
+    'correlation': {'beacon_offline': {'window': 300}},
+    'stationary': {'motion_threshold_m': 5, 'man_down_seconds': 60}
+}
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on an empty SQLite database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def rule_table(tmp_path):
+    """Rule table with fixed cooldowns and correlation windows (RULES)"""
+    path = tmp_path / 'alert_rules.json'
+    path.write_text(json.dumps(RULES), encoding='utf-8')
+    return RuleTable(str(path))
+
+
+@pytest.fixture(scope='session')
+def api_app(tmp_path_factory):
+    """The api/app.py module on a throwaway database, without the data retriever thread
+    (as benchmarks/api_setup.py sets it up)"""
+    import backend.database as database
+    from backend.data_retriever import DataRetriever
+    with pytest.MonkeyPatch.context() as patch:
+        engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('api') / 'api.db'}")
+        patch.setattr(database, 'engine', engine)
+        patch.setattr(database, 'SessionLocal', sessionmaker(autocommit=False, autoflush=False, bind=engine))
+        patch.setattr(DataRetriever, 'start', lambda self: None)
+        with redirect_stdout(io.StringIO()):
+            import api.app as app_module
+        yield app_module
+        engine.dispose()
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+import pytest
+from backend.alert_archive import archive_alerts, page_token, parse_page_token, query_alert_history
+from backend.models import Alert, AlertArchive
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def add_alerts(db, count, acknowledged=(), same_timestamp=False, first=1):
+    """Alerts first..first+count-1, one second apart (newest has the highest id)"""
+    db.add_all([
+        Alert(id=i, firefighter_id=1, alert_type='high_heart_rate', severity='warning', message='Tętno',
+              timestamp=START if same_timestamp else START + timedelta(seconds=i), acknowledged=i in acknowledged)
+        for i in range(first, first + count)
+    ])
+    db.commit()
+
+
+def active_ids(db):
+    return [alert.id for alert in db.query(Alert).order_by(Alert.id)]
+
+
+def archived_ids(db):
+    return [alert.id for alert in db.query(AlertArchive).order_by(AlertArchive.id)]
+
+
+def test_keeps_newest_unacknowledged(db):
+    add_alerts(db, 13, acknowledged={3, 11, 12})
+    assert archive_alerts(db, keep=4) == (9, 6)
+    assert active_ids(db) == [8, 9, 10, 13]
+    assert archived_ids(db) == [1, 2, 3, 4, 5, 6, 7, 11, 12]
+    archived = db.get(AlertArchive, 3)
+    assert archived.acknowledged and archived.message == 'Tętno' and archived.timestamp == START + timedelta(seconds=3)
+
+
+def test_nothing_to_archive(db):
+    assert archive_alerts(db, keep=4) == (0, 0)
+    add_alerts(db, 4)
+    assert archive_alerts(db, keep=4) == (0, 0)
+    assert active_ids(db) == [1, 2, 3, 4]
+
+
+def test_row_with_highest_id_stays(db):
+    add_alerts(db, 3, acknowledged={1, 2, 3})
+    assert archive_alerts(db, keep=4) == (2, 0)
+    assert active_ids(db) == [3]
+
+
+def test_equal_timestamps_are_ordered_by_id(db):
+    add_alerts(db, 5, same_timestamp=True)
+    assert archive_alerts(db, keep=2) == (3, 3)
+    assert active_ids(db) == [4, 5]
+
+
+def test_backlog_is_moved_in_batches(db):
+    add_alerts(db, 10, acknowledged=set(range(1, 11)))
+    assert archive_alerts(db, keep=4, batch_size=2, max_batches=2) == (4, 0)
+    assert archived_ids(db) == [1, 2, 3, 4]
+    assert archive_alerts(db, keep=4, batch_size=2, max_batches=10) == (5, 0)
+    assert active_ids(db) == [10]
+
+
+def test_history_spans_both_tables(db):
+    add_alerts(db, 8, acknowledged={2})
+    archive_alerts(db, keep=3)
+    history = query_alert_history(db)
+    assert [row.id for row in history] == [8, 7, 6, 5, 4, 3, 2, 1]
+    assert [row.id for row in query_alert_history(db, active_only=True)] == [8, 7, 6]
+    assert [row.id for row in query_alert_history(db, acknowledged=True)] == [2]
+    assert [row.id for row in query_alert_history(db, after_id=5, max_id=7)] == [7, 6]
+    assert [row.id for row in query_alert_history(db, firefighter_id=None)] == []
+    assert [row.id for row in query_alert_history(db, since=START + timedelta(seconds=6))] == [8, 7]
+
+
+def read_pages(db, limit, on_page=None):
+    """Walk the history page by page as /api/alerts/all does; returns the pages' ids"""
+    pages, token = [], None
+    while True:
+        rows = query_alert_history(db, before=parse_page_token(token) if token else None, limit=limit + 1)
+        pages.append([row.id for row in rows[:limit]])
+        if on_page:
+            on_page()
+        if len(rows) <= limit:
+            return pages
+        token = page_token(rows[limit - 1])
+
+
+def test_page_token_round_trip():
+    alert = Alert(id=42, timestamp=datetime(2024, 5, 1, 12, 0, 0, 123456))
+    token = page_token(alert)
+    assert token == '2024-05-01T12:00:00.123456_42'
+    assert parse_page_token(token) == (alert.timestamp, 42)
+    assert parse_page_token('2024-05-01T12:00:00_7') == (datetime(2024, 5, 1, 12), 7)
+
+
+@pytest.mark.parametrize('token', ['', '42', 'abc_1', '2024-05-01T12:00:00_', '2024-05-01T12:00:00_x'])
+def test_invalid_page_token(token):
+    with pytest.raises(ValueError):
+        parse_page_token(token)
+
+
+def test_pages_cover_the_history_without_gaps(db):
+    add_alerts(db, 23, acknowledged={2, 5, 9})
+    archive_alerts(db, keep=6)
+    pages = read_pages(db, 5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert sum(pages, []) == list(range(23, 0, -1))
+
+
+def test_pages_split_equal_timestamps(db):
+    add_alerts(db, 12, same_timestamp=True)
+    archive_alerts(db, keep=4)
+    pages = read_pages(db, 5)
+    assert sum(pages, []) == list(range(12, 0, -1))
+
+
+def test_new_alerts_do_not_shift_pages(db):
+    add_alerts(db, 10)
+    added = []
+
+    def insert_newer():
+        add_alerts(db, 1, first=100 + len(added))
+        added.append(1)
+
+    pages = read_pages(db, 4, on_page=insert_newer)
+    assert sum(pages, []) == list(range(10, 0, -1))
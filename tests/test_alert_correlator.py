@@ -0,0 +1,147 @@
+import json
+from datetime import datetime, timedelta
+from backend.alert_correlator import AlertCorrelator, aggregate_message
+from backend.models import Alert
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+ALERT_TYPES = {'beacon_offline': {'severity': 'warning', 'description': 'Beacon offline'}}
+KEY = ('beacon_offline', 2)
+
+
+class AlertFactory:
+    """create_alert callback recording the calls, as DataRetriever._create_alert builds aggregates"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, db, firefighter_id, alert_type, floor=None, members=None):
+        self.calls.append((alert_type, floor, members))
+        alert = Alert(firefighter_id=firefighter_id, alert_type=alert_type, severity='warning',
+                      message=alert_type, timestamp=NOW)
+        if members is not None:
+            alert.floor = floor
+            alert.member_count = len(members)
+            alert.affected_ids = json.dumps(sorted(members))
+        db.add(alert)
+        return alert
+
+
+def correlator(rule_table):
+    return AlertCorrelator(rule_table, ALERT_TYPES)
+
+
+def test_first_hit_creates_an_aggregate(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    assert alert_correlator.apply(db, {KEY: {1, 2}}, create_alert, NOW) == ([], [])
+    alert = db.query(Alert).one()
+    assert (alert.floor, alert.member_count, json.loads(alert.affected_ids)) == (2, 2, [1, 2])
+    assert alert_correlator.groups[KEY].alert_id == alert.id
+
+
+def test_changes_within_the_window_update_in_place(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    alert_correlator.apply(db, {KEY: {1, 2}}, create_alert, NOW)
+    alert = db.query(Alert).one()
+
+    # Same members - no write
+    assert alert_correlator.apply(db, {KEY: {1, 2}}, create_alert, NOW + timedelta(seconds=60)) == ([], [])
+    # A member recovered, another went offline
+    updated, closed = alert_correlator.apply(db, {KEY: {2, 3}}, create_alert, NOW + timedelta(seconds=120))
+    assert (updated, closed) == ([alert.id], [])
+    db.refresh(alert)
+    assert json.loads(alert.affected_ids) == [2, 3]
+    assert alert.message == aggregate_message('Beacon offline', 2, 2)
+    assert len(create_alert.calls) == 1
+    assert db.query(Alert).count() == 1
+
+
+def test_window_counts_from_the_last_hit(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    alert_correlator.apply(db, {KEY: {1}}, create_alert, NOW)
+    alert_correlator.apply(db, {KEY: {1}}, create_alert, NOW + timedelta(seconds=250))
+    alert_correlator.apply(db, {KEY: {1, 2}}, create_alert, NOW + timedelta(seconds=500))
+    assert len(create_alert.calls) == 1
+
+    # No hit for longer than the window (300 s) - a new aggregate is opened
+    alert_correlator.apply(db, {KEY: {1, 2, 3}}, create_alert, NOW + timedelta(seconds=801))
+    assert len(create_alert.calls) == 2
+    assert create_alert.calls[-1] == ('beacon_offline', 2, {1, 2, 3})
+
+
+def test_expired_aggregate_is_closed_before_a_new_one_opens(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    alert_correlator.apply(db, {KEY: {1}}, create_alert, NOW)
+    old = db.query(Alert).one()
+
+    updated, closed = alert_correlator.apply(db, {KEY: {1, 2}}, create_alert, NOW + timedelta(seconds=301))
+    assert updated == []
+    assert closed == [old]
+    assert old.acknowledged
+    assert len(create_alert.calls) == 2
+    open_alerts = db.query(Alert).filter(Alert.acknowledged == False).all()
+    assert [alert.id for alert in open_alerts] == [alert_correlator.groups[KEY].alert_id]
+
+
+def test_acknowledged_aggregate_is_replaced(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    alert_correlator.apply(db, {KEY: {1}}, create_alert, NOW)
+    db.query(Alert).one().acknowledged = True
+    db.flush()
+    alert_correlator.apply(db, {KEY: {1, 2}}, create_alert, NOW + timedelta(seconds=10))
+    assert len(create_alert.calls) == 2
+    assert alert_correlator.groups[KEY].members == {1, 2}
+
+
+def test_empty_set_closes_and_missing_key_keeps(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    other = ('beacon_offline', 3)
+    alert_correlator.apply(db, {KEY: {1}, other: {5}}, create_alert, NOW)
+
+    updated, closed = alert_correlator.apply(db, {KEY: set()}, create_alert, NOW + timedelta(seconds=10))
+    assert updated == []
+    assert [alert.floor for alert in closed] == [2]
+    assert closed[0].acknowledged
+    assert KEY not in alert_correlator.groups
+    assert other in alert_correlator.groups
+
+    # Closing again is a no-op
+    assert alert_correlator.apply(db, {KEY: set()}, create_alert, NOW + timedelta(seconds=20)) == ([], [])
+
+
+def test_uncorrelated_type_creates_plain_alerts(db, rule_table):
+    create_alert = AlertFactory()
+    alert_correlator = correlator(rule_table)
+    alert_correlator.apply(db, {('high_co', 1): {1, 2}}, create_alert, NOW)
+    assert create_alert.calls == [('high_co', None, None), ('high_co', None, None)]
+    assert alert_correlator.groups == {}
+
+
+def test_rebuild_reopens_unacknowledged_aggregates(db, rule_table):
+    db.add_all([
+        Alert(alert_type='beacon_offline', severity='warning', message='old', timestamp=NOW - timedelta(minutes=5),
+              floor=2, member_count=1, affected_ids='[1]'),
+        Alert(alert_type='beacon_offline', severity='warning', message='new', timestamp=NOW,
+              floor=2, member_count=2, affected_ids='[1, 4]'),
+        Alert(alert_type='beacon_offline', severity='warning', message='closed', timestamp=NOW,
+              floor=3, member_count=1, affected_ids='[7]', acknowledged=True),
+        Alert(alert_type='high_co', severity='warning', message='plain', timestamp=NOW),
+    ])
+    db.commit()
+    alert_correlator = correlator(rule_table)
+    alert_correlator.rebuild(db, NOW)
+    assert list(alert_correlator.groups) == [KEY]
+    group = alert_correlator.groups[KEY]
+    assert group.members == {1, 4}
+    assert db.get(Alert, group.alert_id).message == 'new'
+
+    # The rebuilt group is updated in place
+    create_alert = AlertFactory()
+    updated, _ = alert_correlator.apply(db, {KEY: {4}}, create_alert, NOW + timedelta(seconds=10))
+    assert updated == [group.alert_id]
+    assert create_alert.calls == []
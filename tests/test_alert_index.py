@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from backend.alert_index import AlertIndex
+from backend.models import Alert
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def alert(firefighter_id, alert_type, seconds_ago=0, acknowledged=False):
+    return Alert(firefighter_id=firefighter_id, alert_type=alert_type, severity='warning', message=alert_type,
+                 timestamp=NOW - timedelta(seconds=seconds_ago), acknowledged=acknowledged)
+
+
+def test_empty_index_allows_everything(rule_table):
+    index = AlertIndex(rule_table)
+    assert index.allows(1, 'high_heart_rate', NOW)
+    assert index.unacknowledged == 0
+
+
+def test_firefighter_cooldown(rule_table):
+    index = AlertIndex(rule_table)
+    index.record(alert(1, 'high_heart_rate'))
+    assert not index.allows(1, 'high_heart_rate', NOW + timedelta(seconds=179))
+    assert index.allows(1, 'high_heart_rate', NOW + timedelta(seconds=181))
+    assert index.allows(1, 'low_battery', NOW + timedelta(seconds=1))  # Other types are independent
+
+
+def test_global_cooldown_per_type(rule_table):
+    index = AlertIndex(rule_table)
+    index.record(alert(1, 'high_heart_rate'))
+    assert not index.allows(2, 'high_heart_rate', NOW + timedelta(seconds=29))
+    assert index.allows(2, 'high_heart_rate', NOW + timedelta(seconds=31))
+
+
+def test_per_type_cooldowns_from_rule_file(rule_table):
+    index = AlertIndex(rule_table)
+    index.record(alert(1, 'man_down'))
+    assert index.allows(2, 'man_down', NOW)  # global: 0
+    assert not index.allows(1, 'man_down', NOW + timedelta(seconds=9))
+    assert index.allows(1, 'man_down', NOW + timedelta(seconds=11))
+
+
+def test_acknowledge_ends_cooldown(rule_table):
+    index = AlertIndex(rule_table)
+    created = alert(1, 'high_heart_rate')
+    index.record(created)
+    assert index.unacknowledged == 1
+    index.acknowledge(created)
+    assert index.unacknowledged == 0
+    assert index.allows(1, 'high_heart_rate', NOW + timedelta(seconds=1))
+    assert index.acknowledged_since_archive
+
+
+def test_acknowledging_an_older_alert_keeps_the_newer_cooldown(rule_table):
+    index = AlertIndex(rule_table)
+    older = alert(1, 'high_heart_rate', seconds_ago=200)
+    index.record(older)
+    index.record(alert(1, 'high_heart_rate'))
+    index.acknowledge(older)
+    assert not index.allows(1, 'high_heart_rate', NOW + timedelta(seconds=1))
+    assert index.unacknowledged == 1
+
+
+def test_rebuild_from_database(db, rule_table):
+    db.add_all([
+        alert(1, 'high_heart_rate', seconds_ago=10),
+        alert(1, 'high_heart_rate', seconds_ago=500),
+        alert(2, 'low_battery', seconds_ago=10, acknowledged=True),
+        alert(None, 'beacon_offline', seconds_ago=10),
+    ])
+    db.commit()
+    index = AlertIndex(rule_table)
+    index.rebuild(db)
+    assert index.unacknowledged == 3
+    assert index.last_fired[(1, 'high_heart_rate')] == NOW - timedelta(seconds=10)
+    assert not index.allows(1, 'high_heart_rate', NOW)
+    assert index.allows(2, 'low_battery', NOW)  # Acknowledged alerts hold no cooldown
+
+
+def test_acknowledging_one_of_two_same_type_alerts_keeps_the_global_cooldown(rule_table):
+    index = AlertIndex(rule_table)
+    first = alert(1, 'high_heart_rate', seconds_ago=5)
+    index.record(first)
+    index.record(alert(2, 'high_heart_rate', seconds_ago=10))
+    index.acknowledge(first)
+    assert index.allows(1, 'low_battery', NOW)
+    assert not index.allows(3, 'high_heart_rate', NOW + timedelta(seconds=19))  # Firefighter 2's alert still blocks
+    assert index.allows(3, 'high_heart_rate', NOW + timedelta(seconds=21))
+    assert index.last_fired_by_type['high_heart_rate'] == NOW - timedelta(seconds=10)
@@ -0,0 +1,36 @@
+import json
+import os
+import pytest
+from backend.alert_rules import RuleTable
+from conftest import RULES
+
+
+def write_rules(path, **changes):
+    path.write_text(json.dumps(dict(RULES, **changes)), encoding='utf-8')
+    return str(path)
+
+
+def test_overrides_are_loaded(tmp_path):
+    path = write_rules(tmp_path / 'rules.json', overrides={'team': {'RIT': {'high_heart_rate': 190}}, 'role': {}})
+    assert RuleTable(path).overrides['team'] == {'RIT': {'high_heart_rate': 190}}
+
+
+@pytest.mark.parametrize('overrides', [
+    {'team': {'RIT': {'unknown_type': 190}}},
+    {'role': {'dowódca': {'high_heart_rate': 'wysokie'}}},
+    {'role': {'dowódca': 190}},
+    {'squad': {}},
+])
+def test_invalid_overrides(tmp_path, overrides):
+    with pytest.raises(ValueError):
+        RuleTable(write_rules(tmp_path / 'rules.json', overrides=overrides))
+
+
+def test_reload_keeps_the_table_on_errors(tmp_path):
+    path = write_rules(tmp_path / 'rules.json')
+    rule_table = RuleTable(path)
+    write_rules(tmp_path / 'rules.json', overrides={'team': {'RIT': {'high_heart_rate': None}}})
+    os.utime(path, (0, 0))  # A different mtime, however fast the rewrite was
+    assert not rule_table.reload_if_changed()
+    assert rule_table.overrides == {'team': {}, 'role': {}}
+    assert rule_table.version == 1
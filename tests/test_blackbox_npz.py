@@ -0,0 +1,102 @@
+import io
+from datetime import datetime, timedelta
+import numpy as np
+from backend.alert_archive import archive_alerts
+from backend.blackbox import BlackboxExport
+from backend.blackbox_npz import BlackboxArchive, build_arrays, write_npz, MISSING_INT, SYSTEM_FIREFIGHTER_ID
+from backend.models import Alert, Beacon, Firefighter, Position, Vitals
+
+START = datetime(2024, 5, 1, 10, 0, 0)
+SAMPLES = 10
+
+
+def at(minutes):
+    return START + timedelta(minutes=minutes)
+
+
+def seed(db):
+    db.add_all([Firefighter(id=1, name='Jan Kowalski', badge_number='FF-001', team='RIT'),
+                Firefighter(id=2, name='Anna Nowak', badge_number='FF-002')])
+    db.add(Beacon(id=1, beacon_id='B-1', name='Klatka A', latitude=52.0, longitude=21.0, floor=0))
+    for ff_id in (1, 2):
+        for i in range(SAMPLES):
+            db.add(Position(firefighter_id=ff_id, latitude=52.0 + i, longitude=21.0, floor=i % 3, timestamp=at(i)))
+            db.add(Vitals(firefighter_id=ff_id, heart_rate=100 + i, temperature=36.6, oxygen_level=98.0,
+                          co_level=1.0, battery_level=90.0 - i, scba_pressure=300.0 - 10 * i, timestamp=at(i)))
+    db.add(Vitals(firefighter_id=2, heart_rate=None, temperature=None, timestamp=at(SAMPLES)))
+    db.add_all([
+        Alert(firefighter_id=1, alert_type='high_heart_rate', severity='warning', message='Tętno', timestamp=at(2),
+              acknowledged=True),
+        Alert(firefighter_id=1, alert_type='low_battery', severity='warning', message='Bateria', timestamp=at(5)),
+        Alert(firefighter_id=None, alert_type='beacon_offline', severity='warning', message='Beacony - piętro 1: 2',
+              timestamp=at(7), floor=1, member_count=2, affected_ids='[3, 4]'),
+    ])
+    db.commit()
+    archive_alerts(db, keep=5)  # The acknowledged alert goes to the archive
+
+
+def round_trip(export):
+    file = io.BytesIO()
+    write_npz(export, file)
+    file.seek(0)
+    return BlackboxArchive(file)
+
+
+def test_round_trip(db):
+    seed(db)
+    archive = round_trip(BlackboxExport(db, chunk_rows=3))
+    assert [ff['name'] for ff in archive.firefighters] == ['Jan Kowalski', 'Anna Nowak']
+    assert archive.beacons[0]['beacon_id'] == 'B-1'
+    assert archive.statistics['total_positions'] == 2 * SAMPLES
+    assert archive.statistics['total_vitals'] == 2 * SAMPLES + 1
+    assert archive.statistics['total_alerts'] == 3
+
+    positions = archive.table('positions')
+    assert positions['firefighter_id'].tolist() == [1] * SAMPLES + [2] * SAMPLES
+    # Chunks are read newest first but stored in time order
+    assert positions['timestamp'][:SAMPLES].tolist() == [at(i) for i in range(SAMPLES)]
+    assert positions['latitude'][:SAMPLES].tolist() == [52.0 + i for i in range(SAMPLES)]
+    assert positions['floor'][:3].tolist() == [0, 1, 2]
+
+    vitals = archive.table('vitals', firefighter_id=2)
+    assert vitals['heart_rate'][-1] == MISSING_INT
+    assert np.isnan(vitals['temperature'][-1])
+    assert vitals['scba_pressure'][:2].tolist() == [300.0, 290.0]
+
+    alerts = archive.table('alerts')
+    assert alerts['firefighter_id'].tolist() == [SYSTEM_FIREFIGHTER_ID, 1, 1]
+    assert alerts['alert_type'].tolist() == ['beacon_offline', 'high_heart_rate', 'low_battery']
+    assert alerts['acknowledged'].tolist() == [False, True, False]
+    assert alerts['affected_ids'][0] == '[3, 4]'
+    assert alerts['floor'].tolist() == [1, MISSING_INT, MISSING_INT]
+
+
+def test_reader_filters(db):
+    seed(db)
+    archive = BlackboxArchive(build_arrays(BlackboxExport(db)))
+    vitals = archive.table('vitals', firefighter_id=1, since=at(2), until=at(5).isoformat(),
+                           columns=['timestamp', 'heart_rate'])
+    assert set(vitals) == {'timestamp', 'heart_rate', 'firefighter_id'}
+    assert vitals['heart_rate'].tolist() == [103, 104, 105]  # since < timestamp <= until
+    assert archive.table('vitals', since=np.datetime64(at(8)))['firefighter_id'].tolist() == [1, 2, 2]
+    assert archive.table('alerts', firefighter_id=SYSTEM_FIREFIGHTER_ID)['message'].tolist() == \
+        ['Beacony - piętro 1: 2']
+    missing = archive.table('positions', firefighter_id=9)
+    assert len(missing['id']) == 0 and len(missing['firefighter_id']) == 0
+
+
+def test_export_filters(db):
+    seed(db)
+    archive = round_trip(BlackboxExport(db, firefighter_ids=[2], since=at(3), until=at(6)))
+    assert [ff['id'] for ff in archive.firefighters] == [2]
+    positions = archive.table('positions')
+    assert positions['firefighter_id'].tolist() == [2, 2, 2]
+    assert positions['timestamp'].tolist() == [at(4), at(5), at(6)]
+    assert archive.table('alerts')['alert_type'].tolist() == []  # The system alert is at 10:07
+
+
+def test_empty_database(db):
+    archive = round_trip(BlackboxExport(db))
+    assert archive.firefighters == []
+    assert len(archive.table('vitals')['heart_rate']) == 0
+    assert len(archive.table('alerts', since=START)['message']) == 0
@@ -0,0 +1,157 @@
+import gzip
+import os
+import zlib
+import pytest
+from flask import Flask, Response, jsonify, url_for
+from backend import compression
+from backend.compression import init_compression, serve_precompressed_static, MIN_SIZE, STATIC_MAX_AGE
+
+BIG = {'firefighters': [{'id': i, 'name': f'Strażak {i}'} for i in range(200)]}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_compression(app)
+
+    @app.route('/big')
+    def big():
+        response = jsonify(BIG)
+        response.set_etag('v1')
+        return response
+
+    @app.route('/small')
+    def small():
+        return jsonify({'id': 1})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{{"line": {i}}}\n' for i in range(100)), mimetype='application/x-ndjson')
+
+    @app.route('/events')
+    def events():
+        return Response(iter(['data: {}\n\n'] * 100), mimetype='text/event-stream')
+
+    @app.route('/image')
+    def image():
+        return Response(b'\x89PNG' * 1000, mimetype='image/png')
+
+    return app.test_client()
+
+
+def identity_body(client):
+    return client.get('/big', headers={'Accept-Encoding': 'identity'}).data
+
+
+def test_gzip_when_accepted(client):
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.data) == identity_body(client)
+    assert response.headers['ETag'] == 'W/"v1"'  # The compressed body must not share a strong ETag
+
+
+def test_identity_without_accept_encoding(client):
+    response = client.get('/big')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert response.get_json() == BIG
+    assert response.headers['ETag'] == '"v1"'
+    assert 'Content-Encoding' not in client.get('/big', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_incompressible_types_and_events_are_left_alone(client):
+    assert 'Content-Encoding' not in client.get('/image', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/events', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_streamed_responses_are_compressed_per_chunk(client):
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    decompressor = zlib.decompressobj(31)
+    chunks = iter(response.response)
+    # Each chunk is flushed, so it can be decoded as it arrives
+    assert decompressor.decompress(next(chunks)) == b'{"line": 0}\n'
+    rest = b''.join(decompressor.decompress(chunk) for chunk in chunks)
+    assert rest.count(b'\n') == 99
+    response.close()
+
+
+def test_brotli_preferred_over_gzip(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == identity_body(client)
+    assert client.get('/big', headers={'Accept-Encoding': 'gzip, br;q=0.5'}).headers['Content-Encoding'] == 'gzip'
+
+
+def test_gzip_for_brotli_clients_without_the_package(client, monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert client.get('/big', headers={'Accept-Encoding': 'br, gzip'}).headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in client.get('/big', headers={'Accept-Encoding': 'br'}).headers
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    static = tmp_path / 'static'  # Flask serves the folder under /<folder name>
+    static.mkdir()
+    (static / 'app.js').write_text('console.log("Strażak");\n' * 200, encoding='utf-8')
+    (static / 'tiny.css').write_text('body { margin: 0 }', encoding='utf-8')
+    return static
+
+
+@pytest.fixture
+def static_app(static_dir):
+    app = Flask(__name__, static_folder=str(static_dir))
+    serve_precompressed_static(app)
+    return app
+
+
+def test_precompressed_static_assets(static_app):
+    client = static_app.test_client()
+    with static_app.test_request_context():
+        url = url_for('static', filename='app.js')
+    assert '?v=' in url
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype in ('application/javascript', 'text/javascript')
+    assert 'Accept-Encoding' in response.vary
+    assert response.headers['Cache-Control'] == f'public, max-age={STATIC_MAX_AGE}, immutable'
+    assert gzip.decompress(response.data) == client.get(url).data
+
+    plain = client.get('/static/app.js')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Cache-Control'] == 'no-cache'
+    assert client.get('/static/app.js', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    tiny = client.get('/static/tiny.css', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in tiny.headers
+    assert client.get('/static/missing.js').status_code == 404
+
+
+def test_precompressed_static_brotli(static_app):
+    brotli = pytest.importorskip('brotli')
+    response = static_app.test_client().get('/static/app.js', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data).startswith(b'console.log')
+
+
+def test_changed_static_file_gets_a_new_version(static_app, static_dir):
+    with static_app.test_request_context():
+        before = url_for('static', filename='app.js')
+    path = static_dir / 'app.js'
+    path.write_text('console.log("nowa wersja");\n' * 200, encoding='utf-8')
+    os.utime(path, (0, path.stat().st_mtime + 10))  # A different mtime, however fast the rewrite was
+    with static_app.test_request_context():
+        after = url_for('static', filename='app.js')
+    assert before != after
+    assert b'nowa wersja' in static_app.test_client().get(after).data
@@ -0,0 +1,85 @@
+import numpy as np
+from backend.downsample import lttb_indices, lttb_select, rdp_indices, rdp_select
+
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), rng.normal(100, 10, n)
+
+
+def test_keeps_endpoints_and_requested_count():
+    x, y = series(1000)
+    for points in (3, 4, 10, 100, 999):
+        indices = lttb_indices(x, y, points)
+        assert len(indices) == points
+        assert indices[0] == 0 and indices[-1] == 999
+        assert np.all(np.diff(indices) > 0)
+
+
+def test_one_point_per_bucket():
+    x, y = series(102)
+    # 100 samples between the endpoints in 10 buckets of 10
+    indices = lttb_indices(x, y, 12)
+    assert [int(i - 1) // 10 for i in indices[1:-1]] == list(range(10))
+
+
+def test_small_inputs_are_returned_unchanged():
+    x, y = series(50)
+    assert lttb_indices(x, y, 50).tolist() == list(range(50))
+    assert lttb_indices(x, y, 80).tolist() == list(range(50))
+    assert lttb_indices(x[:3], y[:3], 2).tolist() == [0, 1, 2]
+    assert lttb_indices(x[:0], y[:0], 10).tolist() == []
+
+
+def test_too_few_points_are_raised_to_the_minimum():
+    x, y = series(100)
+    assert len(lttb_indices(x, y, 1)) == 3
+
+
+def test_peaks_survive():
+    x = np.arange(500, dtype=float)
+    y = np.full(500, 80.0)
+    y[137] = 200.0
+    y[311] = 20.0
+    indices = lttb_indices(x, y, 20)
+    assert 137 in indices and 311 in indices
+
+
+def test_missing_values():
+    x, y = series(200)
+    y[10:60] = np.nan
+    indices = lttb_indices(x, y, 20)
+    assert len(indices) == 20 and indices[-1] == 199
+    assert len(lttb_indices(x, np.full(200, np.nan), 20)) == 20
+
+
+def test_select_returns_ids():
+    samples = [(1000 + i, float(i), 50.0 if i != 42 else 150.0) for i in range(300)]
+    samples[7] = (1007, 7.0, None)
+    ids = lttb_select(samples, 10)
+    assert len(ids) == 10
+    assert ids[0] == 1000 and ids[-1] == 1299 and 1042 in ids
+    assert lttb_select(samples[:5], 10) == [1000, 1001, 1002, 1003, 1004]
+
+
+def test_rdp_keeps_corners_of_a_path():
+    # Out along x, back along y, then returning towards the start - neither axis is monotonic
+    x = np.concatenate([np.linspace(0, 10, 100), np.full(100, 10.0), np.linspace(10, 0, 100)])
+    y = np.concatenate([np.zeros(100), np.linspace(0, 10, 100), np.full(100, 10.0)])
+    indices = rdp_indices(x, y, 4)
+    assert indices.tolist() == [0, 99, 199, 299]  # Each corner is sampled twice, the first one is kept
+    assert len(rdp_indices(x, y, 30)) == 30
+
+
+def test_rdp_closed_loop_and_small_inputs():
+    angle = np.linspace(0, 2 * np.pi, 200)
+    indices = rdp_indices(np.cos(angle), np.sin(angle), 10)
+    assert len(indices) == 10 and indices[0] == 0 and indices[-1] == 199
+    assert np.all(np.diff(indices) > 0)
+    assert rdp_indices(np.arange(3.0), np.arange(3.0), 2).tolist() == [0, 1, 2]
+
+
+def test_rdp_select_returns_ids():
+    samples = [(500 + i, float(i), 0.0 if i != 20 else 5.0) for i in range(50)]
+    assert rdp_select(samples, 3) == [500, 520, 549]
+    assert rdp_select(samples[:4], 10) == [500, 501, 502, 503]
@@ -0,0 +1,98 @@
+from backend.event_bus import EventBus, StreamLimit, format_event, parse_last_event_id
+
+
+def test_since_resumes_after_an_id():
+    bus = EventBus()
+    for i in range(5):
+        bus.publish('alert-created', {'id': i})
+    events, missed = bus.since(3)
+    assert not missed
+    assert [event[0] for event in events] == [4, 5]
+    assert events[0][1:] == ('alert-created', '{"id":3}', {'id': 3})
+    assert bus.since(5) == ([], False)
+
+
+def test_missed_when_the_id_left_the_buffer():
+    bus = EventBus(capacity=3)
+    for i in range(6):
+        bus.publish('alert-created', {'id': i})
+    events, missed = bus.since(1)
+    assert missed
+    assert [event[0] for event in events] == [4, 5, 6]
+    assert not bus.since(3)[1]  # 4 is the oldest buffered event - nothing lost
+
+
+def test_stream_resumes_from_last_event_id():
+    bus = EventBus()
+    for i in range(3):
+        bus.publish('alert-created', {'id': i})
+    stream = bus.stream(last_id=1)
+    assert next(stream) == "retry: 3000\n\n"
+    assert next(stream) == 'id: 2\nevent: alert-created\ndata: {"id":1}\n\n'
+    assert next(stream) == 'id: 3\nevent: alert-created\ndata: {"id":2}\n\n'
+    bus.publish('alert-acknowledged', {'id': 0})
+    assert next(stream).startswith('id: 4\nevent: alert-acknowledged\n')
+    stream.close()
+
+
+def test_stream_resets_after_missed_events():
+    bus = EventBus(capacity=2)
+    for i in range(4):
+        bus.publish('alert-created', {'id': i})
+    stream = bus.stream(last_id=1)
+    next(stream)
+    assert next(stream) == "event: reset\ndata: {}\n\n"
+    assert next(stream).startswith('id: 3\n')
+
+    # An id from before a server restart
+    stream = bus.stream(last_id=99)
+    next(stream)
+    assert next(stream) == "event: reset\ndata: {}\n\n"
+
+
+def test_stream_sends_heartbeats_while_idle():
+    bus = EventBus()
+    bus.publish('alert-created', {'id': 0})
+    stream = bus.stream(heartbeat=0.01)  # Starts at the current end
+    next(stream)
+    assert next(stream) == ": heartbeat\n\n"
+    assert next(stream) == ": heartbeat\n\n"
+    bus.close()
+    assert list(stream) == []  # Ends once the bus is closed
+
+
+def test_format_and_parse():
+    assert format_event(7, 'snapshot', {'a': 1}) == 'id: 7\nevent: snapshot\ndata: {"a":1}\n\n'
+    assert format_event(None, 'replay-frame', []) == 'event: replay-frame\ndata: []\n\n'
+    assert parse_last_event_id('12') == 12
+    assert parse_last_event_id(None) is None
+    assert parse_last_event_id('abc') is None
+
+
+def test_stream_limit():
+    limit = StreamLimit(2)
+    assert limit.acquire() and limit.acquire()
+    assert not limit.acquire()
+    limit.release()
+    assert limit.acquire()
+    assert limit.to_dict() == {'open': 2, 'limit': 2, 'rejected': 1}
+
+
+def test_full_stream_limit_answers_503(api_app, monkeypatch):
+    monkeypatch.setattr(api_app, 'stream_limit', StreamLimit(1))
+    client = api_app.app.test_client()
+    first = client.get('/api/alerts/stream', buffered=False)
+    assert first.status_code == 200
+    assert first.mimetype == 'text/event-stream'
+
+    rejected = client.get('/api/firefighters/stream')
+    assert rejected.status_code == 503
+    assert rejected.headers['Retry-After'] == '10'
+    assert rejected.get_json() == {'error': 'Too many open streams'}
+    assert client.get('/api/alerts').status_code == 200  # Other requests are still served
+
+    first.close()  # Client disconnected - the slot is free again
+    second = client.get('/api/alerts/stream', buffered=False)
+    assert second.status_code == 200
+    second.close()
+    assert api_app.stream_limit.to_dict() == {'open': 0, 'limit': 1, 'rejected': 1}
@@ -0,0 +1,40 @@
+from datetime import datetime
+import pytest
+from backend.fieldsets import parse_fields, POSITION_FIELDS, VITALS_FIELDS
+from backend.models import Firefighter, Vitals
+
+
+def test_absent_parameter_selects_everything():
+    assert parse_fields(None) is None
+    assert parse_fields('') is None
+
+
+def test_id_is_always_included_in_canonical_order():
+    fields = parse_fields('team, name,,name')
+    assert fields.firefighter == ['id', 'name', 'team']
+    assert fields.position is None and fields.vitals is None
+    assert fields.columns == ['id', 'name', 'team']
+
+
+def test_whole_and_partial_blocks():
+    fields = parse_fields('vitals.scba_pressure,position,vitals.battery_level')
+    assert fields.firefighter == ['id', 'position', 'vitals']
+    assert fields.position == list(POSITION_FIELDS)
+    assert fields.vitals == ['battery_level', 'scba_pressure']
+    assert fields.columns == ['id']
+    assert parse_fields('vitals.heart_rate,vitals').vitals == list(VITALS_FIELDS)
+
+
+@pytest.mark.parametrize('value', ['password', 'vitals.pulse', 'name.first', 'badge_number,foo', 'position.', '.floor'])
+def test_unknown_fields(value):
+    with pytest.raises(ValueError):
+        parse_fields(value)
+
+
+def test_to_dict_limits_the_response():
+    fields = parse_fields('name,on_mission,vitals.battery_level,position')
+    firefighter = Firefighter(id=3, name='Anna Nowak', team=None, on_mission=None)
+    vitals = Vitals(heart_rate=120, battery_level=55.0, timestamp=datetime(2024, 5, 1))
+    assert fields.to_dict(firefighter, None, vitals) == {
+        'id': 3, 'name': 'Anna Nowak', 'on_mission': False, 'position': None, 'vitals': {'battery_level': 55.0}
+    }
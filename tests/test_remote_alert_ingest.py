@@ -0,0 +1,80 @@
+from datetime import datetime
+from backend.data_retriever import DataRetriever, SIMULATOR_ALERT_SOURCE
+from backend.models import Alert, AlertArchive, Firefighter
+
+
+def retriever(db):
+    db.add(Firefighter(id=1, name='Jan Kowalski', badge_number='FF-001'))
+    db.commit()
+    data_retriever = DataRetriever()
+    data_retriever.firefighter_map = {'TAG-001': 1}
+    return data_retriever
+
+
+def test_alerts_are_inserted_once(db):
+    data_retriever = retriever(db)
+    sim_alerts = [
+        {'id': 'a1', 'alert_type': 'high_heart_rate', 'tag_id': 'TAG-001'},
+        {'id': 'a2', 'type': 'low_battery', 'firefighter_id': 'TAG-001'},
+    ]
+    inserted = data_retriever._ingest_remote_alerts(db, sim_alerts)
+    db.commit()
+    assert len(inserted) == 2
+    assert data_retriever.alert_index.unacknowledged == 2
+
+    # The simulator keeps reporting the same alerts
+    assert len(data_retriever._ingest_remote_alerts(db, sim_alerts + [{'id': 'a3', 'alert_type': 'high_co'}])) == 1
+    db.commit()
+    assert data_retriever._ingest_remote_alerts(db, sim_alerts) == []
+    rows = db.query(Alert).order_by(Alert.id).all()
+    assert [row.remote_id for row in rows] == ['a1', 'a2', 'a3']
+    assert all(row.source == SIMULATOR_ALERT_SOURCE for row in rows)
+    assert rows[0].firefighter_id == 1
+    assert rows[2].firefighter_id is None
+    assert data_retriever.alert_index.unacknowledged == 3
+
+
+def test_archived_alerts_are_not_reinserted(db):
+    data_retriever = retriever(db)
+    db.add(AlertArchive(id=100, alert_type='high_heart_rate', severity='warning', timestamp=datetime(2024, 5, 1),
+                        source=SIMULATOR_ALERT_SOURCE, remote_id='a1'))
+    db.commit()
+    inserted = data_retriever._ingest_remote_alerts(db, [
+        {'id': 'a1', 'alert_type': 'high_heart_rate', 'tag_id': 'TAG-001'},
+        {'id': 'a2', 'alert_type': 'high_heart_rate', 'tag_id': 'TAG-001'},
+    ])
+    db.commit()
+    assert len(inserted) == 1
+    assert [row.remote_id for row in db.query(Alert)] == ['a2']
+
+
+def test_alerts_without_id_are_keyed_by_tag_type_and_timestamp(db):
+    data_retriever = retriever(db)
+    sim_alerts = [
+        {'alert_type': 'high_heart_rate', 'tag_id': 'TAG-001', 'timestamp': '2024-05-01T12:00:00'},
+        {'tag_id': 'TAG-001', 'id': 'x'},  # No type - skipped
+        'not an alert',
+    ]
+    assert len(data_retriever._ingest_remote_alerts(db, sim_alerts)) == 1
+    db.commit()
+    assert data_retriever._ingest_remote_alerts(db, sim_alerts) == []
+    assert db.query(Alert).one().remote_id == 'TAG-001:high_heart_rate:2024-05-01T12:00:00'
+
+
+def test_alerts_without_id_and_timestamp_are_ingested_and_counted(db, capsys):
+    data_retriever = retriever(db)
+    sos = {'alert_type': 'sos_pressed', 'tag_id': 'TAG-001'}
+    # Reported twice in one cycle - stored once
+    assert len(data_retriever._ingest_remote_alerts(db, [sos, dict(sos)])) == 1
+    db.commit()
+    alert = db.query(Alert).one()
+    assert (alert.firefighter_id, alert.alert_type) == (1, 'sos_pressed')
+    assert alert.remote_id.startswith('unkeyed:')
+    assert data_retriever.unkeyed_alerts == 2
+    assert 'without id and timestamp' in capsys.readouterr().out
+
+    # Still reported in the next cycle - the unacknowledged alert is recent, nothing is added
+    assert data_retriever._ingest_remote_alerts(db, [sos]) == []
+    # Another firefighter's alert of the same type is not held back
+    assert len(data_retriever._ingest_remote_alerts(db, [{'alert_type': 'sos_pressed', 'tag_id': 'TAG-002'}])) == 1
+    assert data_retriever.unkeyed_alerts == 4
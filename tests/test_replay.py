@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+import pytest
+from backend import replay
+from backend.models import Alert, Firefighter, Position, Vitals
+from backend.replay import ReplayClock, ReplaySession
+
+START = datetime(2024, 5, 1, 10, 0, 0)
+END = START + timedelta(hours=1)
+
+
+class FakeTime:
+    """Stands in for the `time` module of backend/replay.py; advance() moves the wall clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def wall(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(replay, 'time', fake)
+    return fake
+
+
+def test_paused_clock_stands_still(wall):
+    clock = ReplayClock(START, END)
+    wall.advance(60)
+    assert clock.time() == START
+    assert not clock.playing
+
+
+def test_clock_runs_at_speed(wall):
+    clock = ReplayClock(START, END)
+    clock.play()
+    wall.advance(10)
+    assert clock.time() == START + timedelta(seconds=10)
+    clock.set_speed(50)
+    wall.advance(10)
+    assert clock.time() == START + timedelta(seconds=510)
+    clock.pause()
+    wall.advance(10)
+    assert clock.time() == START + timedelta(seconds=510)
+    assert clock.to_dict() == {'time': clock.time(), 'start': START, 'end': END, 'speed': 50, 'playing': False}
+
+
+def test_seek_is_clamped_and_keeps_playing(wall):
+    clock = ReplayClock(START, END)
+    clock.seek(START - timedelta(hours=1))
+    assert clock.time() == START
+    clock.seek(END + timedelta(hours=1))
+    assert clock.time() == END
+
+    clock.play()  # At the end - starts over
+    assert clock.time() == START
+    clock.seek(START + timedelta(minutes=30))
+    wall.advance(5)
+    assert clock.time() == START + timedelta(minutes=30, seconds=5)
+    assert clock.playing
+
+
+def test_clock_stops_at_the_end(wall):
+    clock = ReplayClock(START, END, speed=50)
+    clock.play()
+    wall.advance(3600 / 50 + 10)
+    assert clock.time() == END
+    assert not clock.playing
+    assert clock.anchor is None
+    wall.advance(10)
+    assert clock.time() == END
+
+
+def seed(db):
+    db.add_all([Firefighter(id=1, name='Jan Kowalski', badge_number='FF-001', team='RIT', on_mission=True),
+                Firefighter(id=2, name='Anna Nowak', badge_number='FF-002')])
+    for i in range(7):
+        timestamp = START + timedelta(minutes=10 * i)
+        db.add(Position(firefighter_id=1, latitude=52.0, longitude=21.0, floor=i, timestamp=timestamp))
+        db.add(Vitals(firefighter_id=1, heart_rate=100 + i, battery_level=90.0, timestamp=timestamp))
+    db.add(Vitals(firefighter_id=2, heart_rate=80, timestamp=START + timedelta(minutes=30)))
+    db.add_all([
+        Alert(firefighter_id=1, alert_type='high_heart_rate', severity='warning', message='Tętno',
+              timestamp=START + timedelta(minutes=15)),
+        Alert(firefighter_id=None, alert_type='beacon_offline', severity='warning', message='Beacony',
+              timestamp=START + timedelta(minutes=45), floor=2, affected_ids='[1, 2]', member_count=2),
+    ])
+    db.commit()
+
+
+def test_session_from_database(db, wall):
+    seed(db)
+    session = ReplaySession.from_database(db)
+    assert (session.clock.start, session.clock.end) == (START, END)
+
+    roster = session.roster_at(START + timedelta(minutes=25))
+    assert roster[0]['position']['floor'] == 2
+    assert roster[0]['vitals']['heart_rate'] == 102
+    assert roster[0]['team'] == 'RIT' and roster[1]['team'] == ''
+    assert roster[1]['position'] is None and roster[1]['vitals'] is None
+    assert session.roster_at(START + timedelta(minutes=30))[1]['vitals']['heart_rate'] == 80
+
+    assert session.alerts_at(START) == []
+    alerts = session.alerts_at(END)
+    assert [alert['alert_type'] for alert in alerts] == ['beacon_offline', 'high_heart_rate']
+    assert alerts[0]['firefighter_id'] is None and alerts[0]['affected_ids'] == [1, 2]
+    assert alerts[1]['firefighter_id'] == 1 and alerts[1]['floor'] is None
+    assert len(session.alerts_at(END, limit=1)) == 1
+
+
+def test_session_range_follows_the_filters(db, wall):
+    seed(db)
+    since, until = START + timedelta(minutes=5), START + timedelta(minutes=40)
+    session = ReplaySession.from_database(db, firefighter_ids=[1], since=since, until=until)
+    assert (session.clock.start, session.clock.end) == (since, until)
+    assert [ff['id'] for ff in session.firefighters] == [1]
+    assert session.roster_at(since)[0]['position'] is None  # Rows at or before `since` are not loaded
+
+
+def test_empty_range_is_rejected(db):
+    with pytest.raises(ValueError):
+        ReplaySession.from_database(db)
+
+
+def test_control(db, wall):
+    seed(db)
+    session = ReplaySession.from_database(db)
+    session.control('seek', at=START + timedelta(minutes=20))
+    session.control('speed', speed=10)
+    session.control('play')
+    wall.advance(6)
+    assert session.time() == START + timedelta(minutes=21)
+    assert session.version == 3
+    frame = session.frame()
+    assert frame['clock']['playing'] and frame['firefighters'][0]['vitals']['heart_rate'] == 102
+
+    for action, kwargs in (('rewind', {}), ('seek', {}), ('speed', {}), ('speed', {'speed': 0}),
+                           ('speed', {'speed': 51})):
+        with pytest.raises(ValueError):
+            session.control(action, **kwargs)
+    assert session.version == 3
@@ -0,0 +1,93 @@
+import json
+from backend.roster_stream import RosterStream, diff_entry
+
+
+def entry(floor, heart_rate=90, team='Zastęp 1'):
+    return {'name': 'Jan', 'team': team, 'position': {'floor': floor, 'x': 1.0}, 'vitals': {'heart_rate': heart_rate}}
+
+
+def parse(chunk):
+    lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+
+def test_diff_entry():
+    old = {'id': 1, 'name': 'Jan', 'vitals': {'heart_rate': 90, 'battery_level': 80}}
+    new = {'id': 1, 'name': 'Jan', 'vitals': {'heart_rate': 95, 'battery_level': 80}, 'team': 'RIT'}
+    assert diff_entry(old, new) == {'vitals': {'heart_rate': 95}, 'team': 'RIT'}
+    assert diff_entry(old, old) == {}
+    assert diff_entry({'position': None}, {'position': {'floor': 1}}) == {'position': {'floor': 1}}
+
+
+def test_unchanged_update_publishes_nothing():
+    roster = RosterStream()
+    roster.update(1, entry(0))
+    assert roster.publish() == 1
+    roster.update(1, entry(0))
+    assert roster.publish() is None
+
+
+def test_changes_are_merged_until_published():
+    roster = RosterStream()
+    roster.update(1, entry(0))
+    roster.publish()
+    roster.update(1, {'vitals': {'heart_rate': 100}})
+    roster.update(1, {'position': {'floor': 0, 'x': 2.0}})
+    roster.update(1, {'vitals': {'heart_rate': 110}})
+    event_id = roster.publish()
+    events, missed = roster.events.since(event_id - 1)
+    assert not missed
+    assert events[0][1] == 'roster-delta'
+    assert events[0][3] == {'firefighters': [{'id': 1, 'vitals': {'heart_rate': 110}, 'position': {'x': 2.0}}]}
+    assert roster.entries[1]['position'] == {'floor': 0, 'x': 2.0}
+
+
+def test_snapshot_filters_by_floor_and_team():
+    roster = RosterStream()
+    roster.update(1, entry(0))
+    roster.update(2, entry(1))
+    roster.update(3, entry(1, team='RIT'))
+    event_id = roster.publish()
+    assert roster.snapshot() == (event_id, list(roster.entries.values()))
+    assert [e['id'] for e in roster.snapshot(floor=1)[1]] == [2, 3]
+    assert [e['id'] for e in roster.snapshot(floor=1, team='RIT')[1]] == [3]
+
+
+def test_filtered_view_enter_and_leave():
+    roster = RosterStream()
+    roster.update(1, entry(0))
+    roster.update(2, entry(1))
+    roster.publish()
+    visible = {e['id'] for e in roster.snapshot(floor=1)[1]}
+
+    # Firefighter 1 goes up to floor 1, firefighter 2 leaves it
+    roster.update(1, {'position': {'floor': 1, 'x': 1.0}})
+    roster.update(2, {'position': {'floor': 2, 'x': 1.0}})
+    changes = roster.changes.values()
+    assert roster._filter(list(changes), 1, None, visible) == [roster.entries[1], {'id': 2, 'removed': True}]
+    assert visible == {1}
+
+    # Further changes of a visible firefighter are sent as deltas
+    roster.update(1, {'vitals': {'heart_rate': 120}})
+    assert roster._filter([{'id': 1, 'vitals': {'heart_rate': 120}}], 1, None, visible) == \
+        [{'id': 1, 'vitals': {'heart_rate': 120}}]
+
+
+def test_filtered_stream_sends_snapshot_then_deltas():
+    roster = RosterStream()
+    roster.update(1, entry(0))
+    roster.update(2, entry(1))
+    roster.publish()
+    stream = roster.stream(floor=1)
+    assert next(stream).startswith('retry:')
+    event, data = parse(next(stream))
+    assert event == 'snapshot' and [e['id'] for e in data['firefighters']] == [2]
+
+    roster.update(1, {'vitals': {'heart_rate': 100}})  # Outside the view - filtered out
+    roster.publish()
+    roster.update(2, {'vitals': {'heart_rate': 130}})
+    roster.publish()
+    event, data = parse(next(stream))
+    assert event == 'roster-delta'
+    assert data == {'firefighters': [{'id': 2, 'vitals': {'heart_rate': 130}}]}
+    stream.close()
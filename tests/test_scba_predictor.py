@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+import pytest
+from backend.scba_predictor import ScbaPredictor, LOW_AIR_MINUTES, RATE_WARMUP_S
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def at(seconds):
+    return START + timedelta(seconds=seconds)
+
+
+def breathe(predictor, firefighter_id, pressure, seconds, rate_bar_s=1.0, step=5, start=0):
+    """Samples every `step` s for `seconds`, pressure falling at a steady rate; returns the last pressure"""
+    for t in range(0, seconds + 1, step):
+        predictor.update(firefighter_id, pressure - rate_bar_s * t, at(start + t))
+    return pressure - rate_bar_s * seconds
+
+
+def test_no_prediction_before_warm_up():
+    predictor = ScbaPredictor()
+    predictor.update(1, 300, at(0))
+    predictor.update(1, 298, at(RATE_WARMUP_S - 1))
+    assert predictor.predictions(at(RATE_WARMUP_S - 1))[1] == {
+        'minutes_to_reserve': None, 'minutes_to_empty': None, 'consumption_bar_per_min': None
+    }
+    assert predictor.low_air(now=at(RATE_WARMUP_S - 1)) == []
+
+    # The first sample stays the reference, so the first rate spans the whole warm-up
+    predictor.update(1, 290, at(RATE_WARMUP_S))
+    assert predictor.predictions(at(RATE_WARMUP_S))[1]['consumption_bar_per_min'] == 60.0
+
+
+def test_steady_consumption():
+    predictor = ScbaPredictor()
+    breathe(predictor, 1, 300, 60, rate_bar_s=0.5)  # 270 bar left, 30 bar/min
+    prediction = predictor.predictions(at(60))[1]
+    assert prediction['consumption_bar_per_min'] == pytest.approx(30.0)
+    assert prediction['minutes_to_reserve'] == pytest.approx((270 - 50) / 30, abs=0.1)
+    assert prediction['minutes_to_empty'] == pytest.approx(270 / 30, abs=0.1)
+    # Time keeps running between samples
+    assert predictor.predictions(at(120))[1]['minutes_to_reserve'] == pytest.approx((270 - 50) / 30 - 1, abs=0.1)
+
+
+def test_no_consumption_has_no_time_limit():
+    predictor = ScbaPredictor()
+    breathe(predictor, 1, 300, 60, rate_bar_s=0)
+    assert predictor.predictions(at(60))[1]['minutes_to_reserve'] is None
+    assert predictor.low_air(now=at(60)) == []
+
+
+def test_refill_restarts_the_estimate():
+    predictor = ScbaPredictor()
+    breathe(predictor, 1, 150, 60, rate_bar_s=1.0)
+    predictor.update(1, 300, at(65))  # New cylinder
+    assert predictor.predictions(at(65))[1]['consumption_bar_per_min'] is None
+
+    breathe(predictor, 1, 300, 60, rate_bar_s=0.25, start=65)
+    # Only the new cylinder's consumption counts
+    assert predictor.predictions(at(125))[1]['consumption_bar_per_min'] == pytest.approx(15.0)
+
+
+def test_small_pressure_rise_is_not_a_refill():
+    predictor = ScbaPredictor()
+    breathe(predictor, 1, 300, 60, rate_bar_s=0.5)
+    predictor.update(1, 280, at(65))  # Sensor noise: +10 bar
+    assert predictor.predictions(at(65))[1]['consumption_bar_per_min'] is not None
+
+
+def test_low_air_threshold():
+    predictor = ScbaPredictor()
+    breathe(predictor, 1, 300, 60, rate_bar_s=1.0)  # 240 bar at 60 bar/min: ~3 min to reserve
+    breathe(predictor, 2, 300, 60, rate_bar_s=0.1)  # 294 bar at 6 bar/min: ~40 min to reserve
+    breathe(predictor, 3, 100, 60, rate_bar_s=1.0)  # 40 bar - below reserve, left to scba_critical
+    assert predictor.low_air(LOW_AIR_MINUTES, now=at(60)) == [1]
+    assert predictor.low_air(2, now=at(60)) == []
+    assert sorted(predictor.low_air(60, now=at(60))) == [1, 2]
+
+
+def test_invalid_and_out_of_order_samples_are_ignored():
+    predictor = ScbaPredictor()
+    breathe(predictor, 1, 300, 60, rate_bar_s=0.5)
+    rate = predictor.predictions(at(60))[1]['consumption_bar_per_min']
+    for value in (None, 'n/a', float('nan')):
+        predictor.update(1, value, at(65))
+    predictor.update(1, 100, at(30))  # Older than the last sample
+    assert predictor.predictions(at(60))[1]['consumption_bar_per_min'] == rate
+    assert predictor.pressure[0] == 270
+
+
+def test_capacity_grows():
+    predictor = ScbaPredictor(capacity=2)
+    for firefighter_id in range(1, 6):
+        breathe(predictor, firefighter_id, 300, 30, rate_bar_s=firefighter_id / 10)
+    predictions = predictor.predictions(at(30))
+    assert sorted(predictions) == [1, 2, 3, 4, 5]
+    assert predictions[5]['consumption_bar_per_min'] == pytest.approx(30.0)